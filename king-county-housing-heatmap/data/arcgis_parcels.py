@@ -0,0 +1,192 @@
+"""Concurrent parcel-centroid fetcher for ArcGIS REST query endpoints.
+
+Shared by the King County (fetch_parcels.py) and Snohomish County
+(fetch_coords_snohomish.py) fetchers. Batches of parcel IDs are queried
+from a bounded thread pool over one shared session:
+
+- Batch size adapts: a 413/414 response (request or URL too large) halves
+  the batch size for all later batches and splits the failed batch in two.
+- Each completed batch is appended to a JSONL checkpoint, so an
+  interrupted run resumes with only the unfinished IDs.
+- Requests go through a token bucket, so concurrency doesn't turn into a
+  burst against the county server.
+"""
+
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from centroids import ring_centroids
+from osrm_client import TokenBucket
+
+MAX_WORKERS = 4
+RATE_LIMIT = 4.0  # requests/sec across all workers
+MIN_BATCH_SIZE = 5
+MAX_RETRIES = 4
+TOO_LARGE_STATUSES = (413, 414)
+
+
+class BatchTooLarge(Exception):
+    """The server rejected a batch because the request/URL was too large."""
+
+
+def query_parcel_batch(session, api_url, key_field, ids, bucket=None):
+    """Query the ArcGIS API for a batch of IDs, return list of (id, lat, lng).
+
+    Raises BatchTooLarge on a 413/414 response and the last request error
+    once retries are exhausted.
+    """
+    id_list = ",".join(f"'{i}'" for i in ids)
+    params = {
+        "where": f"{key_field} IN ({id_list})",
+        "outFields": key_field,
+        "outSR": 4326,
+        "returnGeometry": "true",
+        "f": "json",
+    }
+
+    for attempt in range(MAX_RETRIES):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            resp = session.get(api_url, params=params, timeout=60)
+            if resp.status_code in TOO_LARGE_STATUSES:
+                raise BatchTooLarge(f"HTTP {resp.status_code} for {len(ids)} IDs")
+            resp.raise_for_status()
+            data = resp.json()
+        except (requests.RequestException, json.JSONDecodeError) as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            wait_s = random.uniform(0, 2 ** (attempt + 1))
+            reason = f"HTTP {e.response.status_code}" if isinstance(e, requests.HTTPError) else e
+            print(f"  Retry {attempt + 1}/{MAX_RETRIES} after {wait_s:.1f}s: {reason}")
+            time.sleep(wait_s)
+            continue
+
+        if "error" in data:
+            print(f"API error: {data['error']}")
+            return []
+
+        features = [
+            f for f in data.get("features", [])
+            if f.get("geometry") and f["geometry"].get("rings")
+        ]
+        lats, lngs = ring_centroids([f["geometry"]["rings"] for f in features])
+        return [
+            (f["attributes"][key_field], lat, lng)
+            for f, lat, lng in zip(features, lats.tolist(), lngs.tolist())
+        ]
+
+
+def load_checkpoint(path):
+    """Return (coords, done_ids) recorded in a JSONL checkpoint file.
+
+    A partial last line from an interrupted write is cut off the file, so
+    the next run's appends start on a fresh line.
+    """
+    coords, done = [], set()
+    if not path or not os.path.exists(path):
+        return coords, done
+    complete = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            coords.extend(tuple(c) for c in entry["found"])
+            done.update(entry["ids"])
+            complete += len(line)
+    if complete < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(complete)
+    return coords, done
+
+
+def fetch_parcel_coords(
+    ids,
+    api_url,
+    key_field,
+    batch_size,
+    checkpoint_path=None,
+    max_workers=MAX_WORKERS,
+    rate_limit=RATE_LIMIT,
+):
+    """Fetch centroids for `ids`; return (coords, failed_ids).
+
+    coords is a list of (id, lat, lng). Progress is checkpointed to
+    checkpoint_path (if given) and resumed from it on the next call.
+    """
+    coords, done = load_checkpoint(checkpoint_path)
+    remaining = deque(i for i in ids if i not in done)
+    if done:
+        print(f"Resuming from checkpoint: {len(done)} IDs done, {len(remaining)} remaining")
+
+    bucket = TokenBucket(rate_limit, burst=max_workers)
+    retry_batches = deque()
+    n_batches = 0
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def next_batch():
+        if retry_batches:
+            return retry_batches.popleft()
+        return [remaining.popleft() for _ in range(min(batch_size, len(remaining)))]
+
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = {}
+            while True:
+                while len(in_flight) < max_workers and (retry_batches or remaining):
+                    batch = next_batch()
+                    future = pool.submit(query_parcel_batch, session, api_url, key_field, batch, bucket)
+                    in_flight[future] = batch
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except BatchTooLarge as e:
+                        if len(batch) <= MIN_BATCH_SIZE:
+                            print(f"  Batch of {len(batch)} still too large ({e}), giving up on it")
+                            continue
+                        half = len(batch) // 2
+                        batch_size = min(batch_size, max(MIN_BATCH_SIZE, half))
+                        print(f"  {e}; batch size now {batch_size}")
+                        retry_batches.extend([batch[:half], batch[half:]])
+                        continue
+                    except (requests.RequestException, json.JSONDecodeError) as e:
+                        print(f"  Batch of {len(batch)} failed: {e}")
+                        continue
+
+                    coords.extend(results)
+                    if checkpoint:
+                        checkpoint.write(json.dumps({"ids": batch, "found": results}) + "\n")
+                        checkpoint.flush()
+
+                    n_batches += 1
+                    if n_batches % 10 == 0 or n_batches == 1:
+                        print(f"Batch {n_batches} ({len(coords)} coords so far, {len(remaining)} IDs queued)")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+        session.close()
+
+    # Not found by the API, or in a batch that kept failing (retried next run)
+    found = {c[0] for c in coords}
+    failed = [i for i in ids if i not in found]
+    return coords, failed
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Check NumPy ring centroids against shapely and compare their speed.
+
+Usage: python data/bench_centroids.py [n_features]   (default: 50000)
+"""
+
+import sys
+import time
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon, shape
+
+from centroids import ring_centroids
+
+
+def make_features(n, seed=42):
+    """Random parcel-sized ArcGIS features: simple, with a hole, or two parts.
+
+    Outer rings wind clockwise and holes counter-clockwise, as ArcGIS does.
+    """
+    rng = np.random.default_rng(seed)
+
+    def ring(cx, cy, radius, k, clockwise):
+        # Jittered but increasing angles keep the ring simple (star-shaped)
+        angles = (np.arange(k) + rng.uniform(0, 0.8, k)) * 2 * np.pi / k
+        if clockwise:
+            angles = angles[::-1]
+        r = radius * rng.uniform(0.6, 1.0, k)
+        pts = np.column_stack([cx + r * np.cos(angles), cy + r * np.sin(angles)])
+        return np.vstack([pts, pts[:1]]).tolist()
+
+    features = []
+    for _ in range(n):
+        cx, cy = rng.uniform(-122.6, -121.5), rng.uniform(47.0, 48.35)
+        k = int(rng.integers(4, 24))
+        kind = rng.random()
+        rings = [ring(cx, cy, 3e-4, k, clockwise=True)]
+        if kind < 0.1:
+            rings.append(ring(cx, cy, 1e-4, 6, clockwise=False))  # hole
+        elif kind < 0.2:
+            rings.append(ring(cx + 1e-3, cy, 2e-4, k, clockwise=True))  # second part
+        features.append(rings)
+    return features
+
+
+def shapely_centroid(rings):
+    """Reference centroid treating clockwise rings as parts, others as holes."""
+    parts = []
+    for r in rings:
+        if Polygon(r).exterior.is_ccw:
+            parts[-1] = Polygon(parts[-1].exterior, list(parts[-1].interiors) + [r])
+        else:
+            parts.append(Polygon(r))
+    c = MultiPolygon(parts).centroid
+    return c.y, c.x
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    features = make_features(n)
+
+    t0 = time.perf_counter()
+    lats, lngs = ring_centroids(features)
+    t_numpy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for rings in features:
+        shape({"type": "Polygon", "coordinates": rings}).centroid
+    t_shapely = time.perf_counter() - t0
+
+    ref = np.array([shapely_centroid(r) for r in features])
+    err_m = np.hypot(lats - ref[:, 0], (lngs - ref[:, 1]) * np.cos(np.radians(47.6))) * 111_320
+    print(f"{n:,} features")
+    print(f"  numpy:   {t_numpy:.2f}s")
+    print(f"  shapely: {t_shapely:.2f}s (one Polygon per feature, as before)")
+    print(f"  speedup: {t_shapely / t_numpy:.1f}x")
+    print(f"  max deviation from shapely reference: {err_m.max():.2e} m")
+    assert err_m.max() < 1e-3
+
+
+if __name__ == "__main__":
+    main()
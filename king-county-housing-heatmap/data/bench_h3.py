@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmark batched H3 assignment against the old per-row DataFrame.apply path.
+
+Usage: python data/bench_h3.py [n_rows ...]   (default: 100000 1000000)
+"""
+
+import sys
+import time
+
+import h3
+import numpy as np
+import pandas as pd
+
+from h3_index import assign_cells
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def make_sales(n, seed=42):
+    """Random sales inside the pipeline's geo bounds, ~30% repeat parcels."""
+    rng = np.random.default_rng(seed)
+    n_parcels = max(1, int(n * 0.7))
+    lats = rng.uniform(47.0, 48.35, n_parcels)
+    lngs = rng.uniform(-122.6, -121.5, n_parcels)
+    pick = rng.integers(0, n_parcels, n)
+    return pd.DataFrame({"lat": lats[pick], "lng": lngs[pick]})
+
+
+def apply_path(df):
+    h3_cells = df.apply(lambda r: h3.latlng_to_cell(r["lat"], r["lng"], 8), axis=1)
+    parents = h3_cells.apply(lambda c: h3.cell_to_parent(c, 7))
+    return h3_cells.values, parents.values
+
+
+def batched_path(df):
+    return assign_cells(df["lat"].values, df["lng"].values)
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        df = make_sales(n)
+        print(f"\n{n:,} rows")
+
+        t0 = time.perf_counter()
+        cells_b, parents_b = batched_path(df)
+        t_batched = time.perf_counter() - t0
+        print(f"  batched: {t_batched:.2f}s")
+
+        t0 = time.perf_counter()
+        cells_a, parents_a = apply_path(df)
+        t_apply = time.perf_counter() - t0
+        print(f"  apply:   {t_apply:.2f}s")
+
+        assert (cells_a == cells_b).all() and (parents_a == parents_b).all()
+        print(f"  speedup: {t_apply / t_batched:.1f}x (outputs identical)")
+
+
+if __name__ == "__main__":
+    main()
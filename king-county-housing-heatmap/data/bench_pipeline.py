@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Time each process_data stage end to end on synthetic raw inputs.
+
+Usage: python data/bench_pipeline.py [n_sales ...] [--binary] [--shards] [--out FILE]
+       (default: 10000 100000 1000000; 5000000 also works given a few GB of RAM)
+
+Inputs come from synth_raw.py, generated into raw/synth/<n_sales>/ on first
+use and reused after. Each size runs process_data.main() in a fresh process
+with its raw and output paths pointed at that directory, so frontend/public
+is untouched and peak RSS is per size. The building Parquet cache is removed
+first, so load_building_data is always timed cold. Drive times come from the
+synthetic routes cache, which covers every hex: no OSRM or network access.
+Stage timings are read from the run report (see run_report.py); --out saves
+every report as JSON to compare across commits.
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+
+import process_data
+from synth_raw import SYNTH_DIR, generate_raw, read_meta
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RAW_INPUTS = ["KC_SALES_CSV", "KC_COORDS_CSV", "KC_BLDG_CSV", "KC_BLDG_CACHE", "SN_SALES_CSV", "SN_COORDS_CSV"]
+OUTPUTS = ["OUTPUT_JSON", "OUTPUT_BIN", "HEX_SUMMARY_JSON", "PRICE_SKETCH_JSON", "RUN_REPORT_HISTORY"]
+
+
+def run_process_data(raw_dir, args):
+    """Run process_data.main() on `raw_dir` (in a worker process); return its run report."""
+    out_dir = os.path.join(raw_dir, "out")
+    os.makedirs(out_dir, exist_ok=True)
+    process_data.RAW_DIR = raw_dir
+    for name in RAW_INPUTS:
+        setattr(process_data, name, os.path.join(raw_dir, os.path.basename(getattr(process_data, name))))
+    for name in OUTPUTS:
+        setattr(process_data, name, os.path.join(out_dir, os.path.basename(getattr(process_data, name))))
+    process_data.SHARD_DIR = os.path.join(out_dir, "shards")
+
+    report_path = os.path.join(out_dir, "process_report.json")
+    sys.argv = ["process_data.py", *args, "--report", report_path]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        process_data.main()
+    with open(report_path) as f:
+        return json.load(f)
+
+
+def bench_size(n, args, seed=42):
+    raw_dir = os.path.join(SYNTH_DIR, str(n))
+    meta = read_meta(raw_dir)
+    if meta is None or meta["seed"] != seed:
+        print(f"Generating {n:,} synthetic sales in {raw_dir}...")
+        generate_raw(n, raw_dir, seed=seed)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(raw_dir, os.path.basename(process_data.KC_BLDG_CACHE)))
+
+    print(f"Running process_data on {n:,} sales...")
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_process_data, (raw_dir, args))
+
+
+def print_table(reports):
+    sizes = list(reports)
+    stages = []
+    for report in reports.values():
+        stages += [s["stage"] for s in report["stages"] if s["stage"] not in stages]
+
+    print(f"\nWall seconds per stage (CPU seconds in parentheses)")
+    print(f"{'stage':<24}" + "".join(f"{n:>20,}" for n in sizes))
+    for stage in stages:
+        cells = []
+        for n in sizes:
+            record = next((s for s in reports[n]["stages"] if s["stage"] == stage), None)
+            cells.append("" if record is None else f"{record['wall_s']:.2f} ({record['cpu_s']:.2f})")
+        print(f"{stage:<24}" + "".join(f"{c:>20}" for c in cells))
+    print(f"{'total':<24}" + "".join(
+        f"{r['wall_s']:.2f} ({r['cpu_s']:.2f})".rjust(20) for r in reports.values()
+    ))
+    if all("peak_rss_mb" in r for r in reports.values()):
+        print(f"{'peak RSS MB':<24}" + "".join(f"{r['peak_rss_mb']:>20.0f}" for r in reports.values()))
+    print(f"{'sales/s':<24}" + "".join(f"{n / r['wall_s']:>20,.0f}" for n, r in reports.items()))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="synthetic sales per run")
+    parser.add_argument("--binary", action="store_true", help="also time write_sales_bin")
+    parser.add_argument("--shards", action="store_true", help="also time write_sales_shards")
+    parser.add_argument("--out", help="write the run reports, keyed by size, to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    extra = [flag for flag, on in (("--binary", args.binary), ("--shards", args.shards)) if on]
+    reports = {n: bench_size(n, extra) for n in args.sizes}
+    print_table(reports)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({str(n): r for n, r in reports.items()}, f, indent=2)
+        print(f"\nReports written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
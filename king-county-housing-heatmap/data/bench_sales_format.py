@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compare size and parse time of sales_data.json vs the sales_data.bin artifact.
+
+Usage: python data/bench_sales_format.py [n_rows ...]   (default: 100000 500000)
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from h3_index import assign_cells
+from sales_export import read_sales_bin, write_sales_bin, write_sales_json
+
+DEFAULT_SIZES = [100_000, 500_000]
+GYM_NAMES = ["Edgeworks Bellevue", "SBP Fremont", "Momentum SODO", "Uplift Shoreline"]
+
+
+def make_sales_frame(n, seed=42):
+    """Synthetic merged sales frame shaped like process_data's output stage."""
+    rng = np.random.default_rng(seed)
+    lat = np.round(rng.uniform(47.0, 48.35, n), 6)
+    lng = np.round(rng.uniform(-122.6, -121.5, n), 6)
+    cells, _ = assign_cells(lat, lng)
+    dates = np.datetime64("2025-01-01") + rng.integers(0, 365, n).astype("timedelta64[D]")
+
+    def sparse(values, frac_missing):
+        values = values.astype(np.float64)
+        values[rng.random(n) < frac_missing] = np.nan
+        return values
+
+    return pd.DataFrame({
+        "lat": lat,
+        "lng": lng,
+        "price": rng.integers(50_000, 3_000_000, n),
+        "date": np.datetime_as_string(dates),
+        "county": rng.choice(["King", "Snohomish"], n, p=[0.75, 0.25]),
+        "h3": cells,
+        "beds": sparse(rng.integers(1, 7, n), 0.1),
+        "baths": sparse(rng.choice([1, 1.5, 1.75, 2, 2.5, 3.25], n), 0.1),
+        "sqft": sparse(rng.integers(500, 6000, n), 0.1),
+        "yrBuilt": sparse(rng.integers(1900, 2025, n), 0.1),
+        "driveGym": sparse(rng.integers(3, 60, n), 0.02),
+        "driveOffice": sparse(rng.integers(5, 90, n), 0.02),
+        "nearestGymName": rng.choice(GYM_NAMES, n),
+    })
+
+
+def gzip_size(path):
+    with open(path, "rb") as f:
+        return len(gzip.compress(f.read(), compresslevel=6))
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    stats = {"count": 0}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "sales_data.json")
+        bin_path = os.path.join(tmp, "sales_data.bin")
+
+        for n in sizes:
+            df = make_sales_frame(n)
+            print(f"\n{n:,} sales")
+
+            t0 = time.perf_counter()
+            write_sales_json(df, json_path, "bench", stats)
+            t_write_json = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            write_sales_bin(df, bin_path, "bench", stats)
+            t_write_bin = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            with open(json_path) as f:
+                parsed = json.load(f)
+            t_parse_json = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            _, decoded = read_sales_bin(bin_path)
+            t_parse_bin = time.perf_counter() - t0
+
+            assert len(parsed["sales"]) == len(decoded) == n
+            assert np.allclose(decoded["lat"], df["lat"], atol=1e-9)
+            assert (decoded["date"] == df["date"]).all()
+
+            for label, path, t_write, t_parse in [
+                ("json", json_path, t_write_json, t_parse_json),
+                ("bin", bin_path, t_write_bin, t_parse_bin),
+            ]:
+                size_mb = os.path.getsize(path) / 1024 / 1024
+                gz_mb = gzip_size(path) / 1024 / 1024
+                print(
+                    f"  {label:4s} {size_mb:7.1f} MB ({gz_mb:5.1f} MB gzip)  "
+                    f"write {t_write:5.2f}s  parse {t_parse:5.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()
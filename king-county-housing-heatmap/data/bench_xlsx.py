@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compare Snohomish AllSales ingestion: pd.read_excel vs cold/warm Parquet cache.
+
+Cold = streaming the needed columns out of the workbook and writing the
+Parquet cache; warm = reading the date window back from that cache.
+
+Usage: python data/bench_xlsx.py [n_rows ...]   (default: 20000 100000)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from fetch_sales_snohomish import SHEET_NAME, convert_sheet, filter_sales
+
+DEFAULT_SIZES = [20_000, 100_000]
+N_EXTRA_COLUMNS = 20  # the real sheet carries many columns the pipeline ignores
+
+
+def make_workbook(path, n, seed=42):
+    """Synthetic 5-year sales workbook shaped like the assessor's file."""
+    rng = np.random.default_rng(seed)
+    start = datetime.now() - timedelta(days=5 * 365)
+    days = rng.integers(0, 5 * 365, n)
+    extra = [f"Field_{i}" for i in range(N_EXTRA_COLUMNS)]
+
+    wb = Workbook(write_only=True)
+    wb.create_sheet("Disclaimer").append(["For informational purposes only."])
+    ws = wb.create_sheet(SHEET_NAME)
+    ws.append([
+        "Parcel_Id", "Sale_Date", "Sale_Price", "Prop_Class", "Bedrooms",
+        "Yr_Blt", "Total_SqFt", *extra,
+    ])
+    for i in range(n):
+        ws.append([
+            int(rng.integers(10**13, 10**14)),
+            start + timedelta(days=int(days[i])),
+            int(rng.integers(0, 3_000_000)),
+            int(rng.choice([111, 112, 121, 141, 300, 910])),
+            int(rng.integers(0, 6)),
+            int(rng.integers(1900, 2025)),
+            int(rng.integers(0, 6000)),
+            *rng.integers(0, 1000, N_EXTRA_COLUMNS).tolist(),
+        ])
+    wb.save(path)
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    since = datetime.now() - timedelta(days=365)
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx_path = os.path.join(tmp, "sales.xlsx")
+        cache_path = os.path.join(tmp, "sales.parquet")
+
+        for n in sizes:
+            make_workbook(xlsx_path, n)
+            print(f"\n{n:,} rows ({os.path.getsize(xlsx_path) / 1024 / 1024:.1f} MB xlsx)")
+
+            t0 = time.perf_counter()
+            baseline = pd.read_excel(
+                xlsx_path, sheet_name=SHEET_NAME, dtype={"Parcel_Id": str, "Prop_Class": str},
+            )
+            t_excel = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            convert_sheet(xlsx_path, cache_path)
+            t_cold = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            window = pd.read_parquet(cache_path, filters=[("Sale_Date", ">=", pd.Timestamp(since))])
+            t_warm = time.perf_counter() - t0
+
+            expected = filter_sales(baseline, since)
+            actual = filter_sales(window, since)
+            pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+
+            print(f"  read_excel   {t_excel:6.2f}s")
+            print(f"  cold cache   {t_cold:6.2f}s  ({t_excel / t_cold:.1f}x)")
+            print(f"  warm cache   {t_warm:6.3f}s  ({t_excel / t_warm:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
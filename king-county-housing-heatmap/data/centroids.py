@@ -0,0 +1,76 @@
+"""Bulk polygon centroids from raw ArcGIS ``rings`` arrays.
+
+All vertices of all features are concatenated into flat NumPy arrays and
+the area-weighted shoelace centroid is accumulated per feature with
+np.bincount, so no shapely object is built per parcel.
+
+ArcGIS rings wind clockwise for outer boundaries and counter-clockwise for
+holes, so summing the signed shoelace terms of every ring in a feature
+handles holes and multipart parcels alike. Coordinates are shifted to each
+feature's first vertex first to avoid cancellation at lat/lng magnitudes.
+Zero-area features (degenerate slivers) fall back to the vertex mean.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+
+def ring_centroids(features_rings):
+    """Return (lats, lngs) centroid arrays for a list of ArcGIS `rings` lists.
+
+    Each element is the `geometry["rings"]` of one feature: a list of rings,
+    each a list of [x, y] (lng, lat) vertices.
+    """
+    n = len(features_rings)
+    if n == 0:
+        return np.array([]), np.array([])
+
+    ring_sizes = [len(ring) for feat in features_rings for ring in feat]
+    ring_feature = np.repeat(np.arange(n), [len(feat) for feat in features_rings])
+    n_vertices = sum(ring_sizes)
+    flat = np.fromiter(
+        chain.from_iterable(chain.from_iterable(chain.from_iterable(features_rings))),
+        dtype=np.float64,
+    )
+    if len(flat) == 2 * n_vertices:
+        xy = flat.reshape(-1, 2)
+    else:  # vertices carry z/m values; keep x, y only
+        xy = np.array(
+            [pt[:2] for feat in features_rings for ring in feat for pt in ring],
+            dtype=np.float64,
+        )
+    vertex_feature = np.repeat(ring_feature, ring_sizes)
+
+    # Shift each feature to its first vertex for numerical stability
+    first_vertex = np.searchsorted(vertex_feature, np.arange(n))
+    origin = xy[first_vertex]
+    xy = xy - origin[vertex_feature]
+    x, y = xy[:, 0], xy[:, 1]
+
+    # Edges i -> i+1 within each ring, plus a closing edge from each ring's
+    # last vertex back to its first (zero-length when the ring is closed)
+    ring_end = np.cumsum(ring_sizes) - 1
+    ring_start = ring_end - np.asarray(ring_sizes) + 1
+    valid = np.ones(len(x) - 1, dtype=bool)
+    valid[ring_end[:-1]] = False
+    src_idx = np.concatenate([np.arange(len(x) - 1)[valid], ring_end])
+    dst_idx = np.concatenate([np.arange(1, len(x))[valid], ring_start])
+    x0, y0, x1, y1 = x[src_idx], y[src_idx], x[dst_idx], y[dst_idx]
+    edge_feature = vertex_feature[src_idx]
+
+    cross = x0 * y1 - x1 * y0
+    area2 = np.bincount(edge_feature, weights=cross, minlength=n)
+    cx = np.bincount(edge_feature, weights=(x0 + x1) * cross, minlength=n)
+    cy = np.bincount(edge_feature, weights=(y0 + y1) * cross, minlength=n)
+
+    counts = np.bincount(vertex_feature, minlength=n)
+    mean_x = np.bincount(vertex_feature, weights=x, minlength=n) / counts
+    mean_y = np.bincount(vertex_feature, weights=y, minlength=n) / counts
+
+    scale = np.abs(xy).max() if len(xy) else 0.0
+    degenerate = np.abs(area2) <= 1e-12 * max(scale, 1e-300) ** 2
+    safe_area = np.where(degenerate, 1.0, area2)
+    lng = np.where(degenerate, mean_x, cx / (3 * safe_area)) + origin[:, 0]
+    lat = np.where(degenerate, mean_y, cy / (3 * safe_area)) + origin[:, 1]
+    return lat, lng
@@ -0,0 +1,197 @@
+"""Conditional, resumable downloads for the assessor ZIP/XLSX sources.
+
+Every file fetched through fetch() is recorded in raw/downloads_manifest.json
+with its URL, ETag, Last-Modified and SHA-256. Later runs send a conditional
+GET (If-None-Match / If-Modified-Since): when the server answers 304 the
+refresh costs a single request. Interrupted downloads keep their ``.part``
+file and resume with a Range request (guarded by If-Range so a changed file
+restarts from scratch; a .part the server cannot resume, answered with
+416, is discarded and downloaded again). When the server is unreachable,
+a copy already on disk is kept.
+
+The manifest also records the inputs each derived output was built from
+(output_is_current / record_output), so scripts can skip work when neither
+the source file nor their parameters changed.
+
+The fetch steps run in parallel (see run_pipeline), so every
+read-modify-write of the manifest holds an exclusive lock on
+downloads_manifest.json.lock and saves through a per-process temp file.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, saves are still atomic
+    fcntl = None
+
+RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
+MANIFEST_PATH = os.path.join(RAW_DIR, "downloads_manifest.json")
+CHUNK_BYTES = 1024 * 1024
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"files": {}, "outputs": {}}
+    with open(MANIFEST_PATH) as f:
+        manifest = json.load(f)
+    manifest.setdefault("files", {})
+    manifest.setdefault("outputs", {})
+    return manifest
+
+
+def save_manifest(manifest):
+    os.makedirs(RAW_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=RAW_DIR, prefix="downloads_manifest.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, MANIFEST_PATH)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def updating_manifest():
+    """Load the manifest under an exclusive lock; save it when the block exits."""
+    os.makedirs(RAW_DIR, exist_ok=True)
+    with open(MANIFEST_PATH + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_manifest()
+        yield manifest
+        save_manifest(manifest)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fetch(url, dest_path, timeout=120):
+    """Make dest_path an up-to-date copy of url; return True if its content changed.
+
+    A 304 Not Modified (or a re-download with an identical hash) returns
+    False. Files present on disk but missing from the manifest are
+    re-fetched once so their validators and hash can be recorded. If the
+    server can't be reached and dest_path already holds a copy of url, a
+    warning is printed and that copy is kept (returns False), so the
+    pipeline still runs from local data while offline.
+    """
+    try:
+        return _download(url, dest_path, timeout)
+    except requests.RequestException as exc:
+        entry = load_manifest()["files"].get(os.path.basename(dest_path), {})
+        if not os.path.exists(dest_path) or entry.get("url", url) != url:
+            raise
+        print(f"WARNING: could not refresh {url} ({exc}); keeping cached {dest_path}")
+        return False
+
+
+def _download(url, dest_path, timeout):
+    manifest = load_manifest()
+    key = os.path.basename(dest_path)
+    entry = manifest["files"].get(key, {})
+    have_file = os.path.exists(dest_path) and entry.get("url") == url
+    part_path = dest_path + ".part"
+
+    headers = {}
+    if have_file:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    partial = manifest.get("partial", {}).get(key, {})
+    validator = partial.get("etag") or partial.get("last_modified")
+    if offset and partial.get("url") == url and validator:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    else:
+        offset = 0
+
+    resp = requests.get(url, headers=headers, stream=True, timeout=timeout)
+    if resp.status_code == 416 and "Range" in headers:
+        # The .part is already complete (e.g. a crash before the rename) or
+        # longer than the file: nothing left to resume, so start over
+        resp.close()
+        print(f"Saved partial download cannot be resumed (HTTP 416), restarting: {url}")
+        os.remove(part_path)
+        del headers["Range"], headers["If-Range"]
+        offset = 0
+        resp = requests.get(url, headers=headers, stream=True, timeout=timeout)
+
+    with resp:
+        if resp.status_code == 304:
+            print(f"Not modified since last download: {dest_path}")
+            return False
+        resp.raise_for_status()
+
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        resuming = resp.status_code == 206
+        if resuming:
+            print(f"Resuming download at {offset / 1024 / 1024:.1f} MB: {url}")
+        else:
+            print(f"Downloading {url}...")
+            offset = 0
+
+        # Remember validators so an interrupted download can resume
+        with updating_manifest() as manifest:
+            manifest.setdefault("partial", {})[key] = {
+                "url": url, "etag": etag, "last_modified": last_modified,
+            }
+
+        size = offset
+        with open(part_path, "ab" if resuming else "wb") as f:
+            for block in resp.iter_content(chunk_size=CHUNK_BYTES):
+                f.write(block)
+                size += len(block)
+
+    sha = file_sha256(part_path)
+    os.replace(part_path, dest_path)
+    changed = sha != entry.get("sha256")
+    with updating_manifest() as manifest:
+        manifest.setdefault("partial", {}).pop(key, None)
+        manifest["files"][key] = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "sha256": sha,
+            "size": size,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    print(f"Downloaded {size / 1024 / 1024:.1f} MB ({'changed' if changed else 'unchanged content'})")
+    return changed
+
+
+def source_hash(path):
+    """SHA-256 recorded for a downloaded file (computed if not in the manifest)."""
+    entry = load_manifest()["files"].get(os.path.basename(path))
+    return entry["sha256"] if entry else file_sha256(path)
+
+
+def output_is_current(output_path, inputs):
+    """True if output_path exists and was last built from exactly `inputs`."""
+    if not os.path.exists(output_path):
+        return False
+    recorded = load_manifest()["outputs"].get(os.path.basename(output_path))
+    return recorded == inputs
+
+
+def record_output(output_path, inputs):
+    """Record the inputs (JSON-serializable dict) output_path was built from."""
+    with updating_manifest() as manifest:
+        manifest["outputs"][os.path.basename(output_path)] = inputs
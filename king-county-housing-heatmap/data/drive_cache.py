@@ -0,0 +1,92 @@
+"""Persistent SQLite cache of OSRM drive durations by origin cell and POI.
+
+Durations are stored one row per (cell, POI) pair. The POI part of the key
+is a hash of the POI's name and coordinates, so adding a POI or moving one
+only leaves that POI's column missing; every other cached pair stays valid
+and only the missing pairs are re-routed. Unroutable pairs are stored as
+NULL so they are not retried on every run.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def poi_key(poi):
+    """Stable cache key for a POI; changes when its name or location changes."""
+    payload = json.dumps([poi["name"], round(poi["lat"], 6), round(poi["lng"], 6)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class DriveTimeCache:
+    """Durations (seconds) keyed by (H3 cell, POI key) in a SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS durations (
+                cell TEXT NOT NULL,
+                poi TEXT NOT NULL,
+                seconds REAL,
+                routed_at REAL NOT NULL,
+                PRIMARY KEY (cell, poi)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, cells, pois):
+        """Return (durations, known) arrays of shape [len(cells) x len(pois)].
+
+        `cells` must be unique. durations is NaN where unknown or unroutable;
+        known marks pairs present in the cache.
+        """
+        keys = [poi_key(p) for p in pois]
+        durations = np.full((len(cells), len(pois)), np.nan)
+        known = np.zeros((len(cells), len(pois)), dtype=bool)
+        if len(cells) == 0 or not keys:
+            return durations, known
+
+        placeholders = ",".join("?" * len(keys))
+        rows = pd.read_sql_query(
+            f"SELECT cell, poi, seconds FROM durations WHERE poi IN ({placeholders})",
+            self.conn,
+            params=keys,
+        )
+        cell_idx = pd.Index(cells).get_indexer(rows["cell"])
+        poi_idx = pd.Index(keys).get_indexer(rows["poi"])
+        hit = cell_idx >= 0
+        seconds = rows["seconds"].to_numpy(dtype=np.float64)
+        durations[cell_idx[hit], poi_idx[hit]] = seconds[hit]
+        known[cell_idx[hit], poi_idx[hit]] = True
+        return durations, known
+
+    def store(self, cells, pois, durations):
+        """Insert or replace the [len(cells) x len(pois)] durations (NaN -> NULL)."""
+        keys = [poi_key(p) for p in pois]
+        now = time.time()
+        rows = [
+            (cell, key, None if np.isnan(sec) else float(sec), now)
+            for cell, row in zip(cells, durations)
+            for key, sec in zip(keys, row)
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO durations (cell, poi, seconds, routed_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
@@ -4,7 +4,7 @@
 import os
 import zipfile
 
-import requests
+import downloads
 
 BUILDINGS_URL = "https://aqua.kingcounty.gov/extranet/assessor/Residential%20Building.zip"
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
@@ -15,15 +15,8 @@ def download_buildings_zip():
     os.makedirs(RAW_DIR, exist_ok=True)
     zip_path = os.path.join(RAW_DIR, "Residential_Building.zip")
 
-    if os.path.exists(zip_path):
-        print(f"Using cached ZIP: {zip_path}")
-    else:
-        print(f"Downloading building data from {BUILDINGS_URL}...")
-        resp = requests.get(BUILDINGS_URL, timeout=120)
-        resp.raise_for_status()
-        with open(zip_path, "wb") as f:
-            f.write(resp.content)
-        print(f"Downloaded {len(resp.content) / 1024 / 1024:.1f} MB")
+    downloads.fetch(BUILDINGS_URL, zip_path)
+    inputs = {"source": downloads.source_hash(zip_path)}
 
     with zipfile.ZipFile(zip_path) as zf:
         csv_names = [n for n in zf.namelist() if n.endswith(".csv")]
@@ -32,9 +25,13 @@ def download_buildings_zip():
             (n for n in csv_names if "resbldg" in n.lower() or "bldg" in n.lower()),
             csv_names[0],
         )
+        extracted_path = os.path.join(RAW_DIR, bldg_csv)
+        if downloads.output_is_current(extracted_path, inputs):
+            print(f"Buildings unchanged since last run, keeping {extracted_path}")
+            return extracted_path
         print(f"Extracting: {bldg_csv}")
         zf.extract(bldg_csv, RAW_DIR)
-        extracted_path = os.path.join(RAW_DIR, bldg_csv)
+        downloads.record_output(extracted_path, inputs)
         print(f"Extracted to: {extracted_path}")
         return extracted_path
 
@@ -2,108 +2,95 @@
 """Fetch parcel centroid coordinates from Snohomish County ArcGIS REST API.
 
 Same pattern as fetch_parcels.py (King County), adapted for the Snohomish
-County parcel service which uses PARCEL_ID as the key field.
+County parcel service which uses PARCEL_ID as the key field. Set
+SN_PARCEL_API to point at a different (e.g. local stub) endpoint. Parcels
+already in the shared parcel index are not re-queried (see --refresh-days).
+--history also covers every parcel in the sales store.
 """
 
-import json
+import argparse
 import os
-import time
 
 import pandas as pd
-import requests
-from shapely.geometry import shape
 
-PARCEL_API = (
+from arcgis_parcels import MAX_WORKERS, fetch_parcel_coords
+from parcel_index import ParcelIndex
+import sales_store
+
+PARCEL_API = os.environ.get(
+    "SN_PARCEL_API",
     "https://gis.snoco.org/sas/rest/services/"
-    "SAS_Services/SAS_Parcels/MapServer/0/query"
+    "SAS_Services/SAS_Parcels/MapServer/0/query",
 )
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
+STORE_COUNTY = "snohomish"
+COUNTY = "Snohomish"
 SALES_CSV = os.path.join(RAW_DIR, "filtered_sales_snohomish.csv")
 OUTPUT_CSV = os.path.join(RAW_DIR, "parcel_coords_snohomish.csv")
+CHECKPOINT_PATH = os.path.join(RAW_DIR, "parcel_coords_snohomish.checkpoint.jsonl")
 BATCH_SIZE = 50  # Smaller batches -- Snohomish IDs are longer (14 chars)
-RATE_LIMIT_DELAY = 0.5
 
 
-def load_unique_parcel_ids():
-    """Load unique PARCEL_IDs from filtered Snohomish sales data."""
-    df = pd.read_csv(SALES_CSV, dtype={"PARCEL_ID": str})
-    ids = df["PARCEL_ID"].unique().tolist()
+def load_unique_parcel_ids(history=False):
+    """Load unique PARCEL_IDs from filtered Snohomish sales data.
+
+    With history=True, every parcel in the sales store is added, so
+    historical windows (process_data.py --since/--until) have coordinates
+    too. Parcels already in the parcel index are not re-queried either way.
+    """
+    ids = []
+    if not history or os.path.exists(SALES_CSV):
+        df = pd.read_csv(SALES_CSV, dtype={"PARCEL_ID": str})
+        ids = df["PARCEL_ID"].unique().tolist()
+    if history:
+        store_ids = sales_store.store_parcel_ids(STORE_COUNTY, "PARCEL_ID")
+        print(f"Parcels in the sales store: {len(store_ids)}")
+        ids = list(dict.fromkeys(ids + store_ids))
     print(f"Unique parcels to geocode: {len(ids)}")
     return ids
 
 
-def query_parcel_batch(parcel_ids):
-    """Query Snohomish ArcGIS API for a batch of PARCEL_IDs."""
-    id_list = ",".join(f"'{pid}'" for pid in parcel_ids)
-    where_clause = f"PARCEL_ID IN ({id_list})"
-
-    params = {
-        "where": where_clause,
-        "outFields": "PARCEL_ID",
-        "outSR": 4326,
-        "returnGeometry": "true",
-        "f": "json",
-    }
-
-    for attempt in range(4):
-        try:
-            resp = requests.get(PARCEL_API, params=params, timeout=60)
-            resp.raise_for_status()
-            data = resp.json()
-
-            if "error" in data:
-                print(f"API error: {data['error']}")
-                return []
-
-            results = []
-            for feature in data.get("features", []):
-                pid = feature["attributes"]["PARCEL_ID"]
-                geom = feature.get("geometry")
-                if geom and "rings" in geom:
-                    poly = shape({"type": "Polygon", "coordinates": geom["rings"]})
-                    centroid = poly.centroid
-                    results.append((pid, centroid.y, centroid.x))
-            return results
-
-        except (requests.RequestException, json.JSONDecodeError) as e:
-            wait = 2 ** (attempt + 1)
-            print(f"  Retry {attempt + 1}/4 after {wait}s: {e}")
-            time.sleep(wait)
-
-    return []
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--refresh-days", type=float, default=None,
+        help="re-fetch parcels whose stored coordinates are older than this",
+    )
+    parser.add_argument(
+        "--history", action="store_true",
+        help="also geocode every parcel in the sales store (for process_data.py --since/--until)",
+    )
+    return parser.parse_args()
 
 
 def main():
-    parcel_ids = load_unique_parcel_ids()
-    all_coords = []
-    failed_ids = []
-
-    total_batches = (len(parcel_ids) + BATCH_SIZE - 1) // BATCH_SIZE
-    print(f"Fetching coordinates in {total_batches} batches of {BATCH_SIZE}...")
-
-    for i in range(0, len(parcel_ids), BATCH_SIZE):
-        batch = parcel_ids[i : i + BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-
-        if batch_num % 10 == 0 or batch_num == 1:
-            print(f"Batch {batch_num}/{total_batches} ({len(all_coords)} coords so far)")
-
-        results = query_parcel_batch(batch)
-        found_ids = {r[0] for r in results}
-        all_coords.extend(results)
-
-        for pid in batch:
-            if pid not in found_ids:
-                failed_ids.append(pid)
-
-        time.sleep(RATE_LIMIT_DELAY)
-
-    df = pd.DataFrame(all_coords, columns=["PARCEL_ID", "lat", "lng"])
+    args = parse_args()
+    parcel_ids = load_unique_parcel_ids(args.history)
+
+    with ParcelIndex() as index:
+        to_fetch = index.ids_to_fetch(COUNTY, parcel_ids, args.refresh_days)
+        print(f"Already in parcel index: {len(parcel_ids) - len(to_fetch)}, to fetch: {len(to_fetch)}")
+
+        if to_fetch:
+            print(f"Fetching coordinates in batches of up to {BATCH_SIZE} ({MAX_WORKERS} workers)...")
+            fetched, _ = fetch_parcel_coords(
+                to_fetch, PARCEL_API, "PARCEL_ID", BATCH_SIZE, checkpoint_path=CHECKPOINT_PATH
+            )
+            index.upsert(COUNTY, fetched)
+            if os.path.exists(CHECKPOINT_PATH):
+                os.remove(CHECKPOINT_PATH)
+
+        known = index.lookup(COUNTY, parcel_ids)
+
+    # Save results
+    df = known[["parcel_id", "lat", "lng"]].rename(columns={"parcel_id": "PARCEL_ID"})
     df.to_csv(OUTPUT_CSV, index=False)
+    found = set(df["PARCEL_ID"])
+    failed_ids = [i for i in parcel_ids if i not in found]
 
-    match_rate = len(all_coords) / len(parcel_ids) * 100 if parcel_ids else 0
+    match_rate = len(df) / len(parcel_ids) * 100 if parcel_ids else 0
     print(f"\nResults:")
-    print(f"  Matched: {len(all_coords)} / {len(parcel_ids)} ({match_rate:.1f}%)")
+    print(f"  Matched: {len(df)} / {len(parcel_ids)} ({match_rate:.1f}%)")
     print(f"  Failed: {len(failed_ids)}")
     print(f"  Saved to: {OUTPUT_CSV}")
 
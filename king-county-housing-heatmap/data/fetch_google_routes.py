@@ -2,168 +2,291 @@
 """Fetch traffic-aware drive times from Google Maps Distance Matrix API.
 
 Reads routing centroids (res-7 hex centers) and computes drive times to
-Microsoft Building 43 and all climbing gyms. Results are cached so re-runs
-skip already-computed hexes.
+every POI category in the registry (frontend/src/data/pois.json): the
+specific destinations plus the --top-k straight-line-nearest POIs of each
+"nearest" category. Hexes routed to the same destinations are batched
+together. Results are cached per hex and category, so re-runs skip
+already-computed hexes and a new category only routes its own POIs.
+
+Each hex is routed at every departure slot in routes_cache.SLOTS (weekday
+AM/midday/PM, weekend) to build a time-of-day profile. Slots are filled in
+--slots order, one after another, and --budget caps the API elements a run
+spends; re-running continues where the previous run stopped.
+
+Requests run concurrently (GOOGLE_MAPS_MAX_IN_FLIGHT, default 4) under a
+shared GOOGLE_MAPS_QPS limit (default 5 requests/sec); each finished batch
+is appended to the cache journal (see routes_cache).
 
 Requires GOOGLE_MAPS_API_KEY environment variable.
 """
 
+import argparse
 import json
 import os
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
 
 import googlemaps
+import numpy as np
+
+from osrm_client import TokenBucket
+from poi_filter import TOP_K_NEAREST, print_top_k_report
+from poi_registry import category_minutes, load_registry, output_fields, route_candidates
+from routes_cache import SLOTS, RoutesCache
 
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 CENTROIDS_PATH = os.path.join(RAW_DIR, "routing_centroids.json")
-CACHE_PATH = os.path.join(RAW_DIR, "google_routes_cache.json")
-
-# POIs (must match frontend/src/data/pois.js and process_data.py)
-CLIMBING_GYMS = [
-    {"name": "Edgeworks Bellevue", "lat": 47.6195, "lng": -122.1302},
-    {"name": "Edgeworks Seattle", "lat": 47.6680, "lng": -122.3953},
-    {"name": "Vertical World Seattle", "lat": 47.6610, "lng": -122.3865},
-    {"name": "Vertical World North", "lat": 47.8688, "lng": -122.2981},
-    {"name": "Uplift Shoreline", "lat": 47.7548, "lng": -122.3143},
-    {"name": "Momentum SODO", "lat": 47.5781, "lng": -122.3348},
-    {"name": "SBP Poplar", "lat": 47.5936, "lng": -122.3109},
-    {"name": "SBP Fremont", "lat": 47.6502, "lng": -122.3418},
-]
-MICROSOFT_B43 = {"name": "Microsoft Building 43", "lat": 47.6395, "lng": -122.1344}
-
-# All destinations: gyms first, then office
-ALL_DESTINATIONS = [(g["lat"], g["lng"]) for g in CLIMBING_GYMS] + [
-    (MICROSOFT_B43["lat"], MICROSOFT_B43["lng"])
-]
-GYM_COUNT = len(CLIMBING_GYMS)
-
-BATCH_SIZE = 10  # max origins per request (10 * 9 destinations = 90 elements < 100 limit)
-
-
-def next_tuesday_8am_pacific():
-    """Return next Tuesday at 8 AM Pacific as a datetime for departure_time."""
+CACHE_PATH = os.path.join(RAW_DIR, "google_routes_cache.npz")
+
+MAX_ELEMENTS = 100  # origins x destinations per request
+MAX_ORIGINS = 25  # origins per request
+MAX_IN_FLIGHT = int(os.environ.get("GOOGLE_MAPS_MAX_IN_FLIGHT", "4"))
+GOOGLE_QPS = float(os.environ.get("GOOGLE_MAPS_QPS", "5"))  # requests/sec across all workers
+
+
+def next_departure(slot):
+    """Return the next departure datetime for a time-of-day slot (see SLOTS)."""
+    weekday, hour = SLOTS[slot]
     # Pacific time is UTC-8 (PST) or UTC-7 (PDT)
     # Use a fixed UTC offset for simplicity; Google handles DST internally
     pacific = timezone(timedelta(hours=-8))
     now = datetime.now(pacific)
-    days_until_tuesday = (1 - now.weekday()) % 7
-    if days_until_tuesday == 0:
-        days_until_tuesday = 7  # next week if today is Tuesday
-    next_tue = now + timedelta(days=days_until_tuesday)
-    return next_tue.replace(hour=8, minute=0, second=0, microsecond=0)
+    days_until = (weekday - now.weekday()) % 7
+    if days_until == 0:
+        days_until = 7  # next week if today is that weekday
+    departure = now + timedelta(days=days_until)
+    return departure.replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+def fetch_matrices(client, matrix_requests, max_in_flight=MAX_IN_FLIGHT, rate=GOOGLE_QPS):
+    """Run distance_matrix requests concurrently under a QPS limit.
+
+    `client` is a googlemaps.Client (or anything with the same
+    distance_matrix signature) and matrix_requests a list of
+    (origins, destinations, departure). Yields (index, result) as requests
+    complete; result is None if the request failed.
+    """
+    bucket = TokenBucket(rate, burst=max_in_flight)
+
+    def request(origins, destinations, departure):
+        bucket.acquire()
+        return client.distance_matrix(
+            origins=origins,
+            destinations=destinations,
+            mode="driving",
+            departure_time=departure,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        futures = {
+            pool.submit(request, *matrix_request): i
+            for i, matrix_request in enumerate(matrix_requests)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                yield i, future.result()
+            except Exception as e:
+                print(f"  Batch {i + 1} ERROR: {e}")
+                yield i, None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--top-k", type=int, default=TOP_K_NEAREST,
+        help="route each hex only to the K straight-line-nearest POIs of each nearest "
+        "category (0 = all)",
+    )
+    parser.add_argument(
+        "--validate", action="store_true",
+        help="route every POI and report how often the top-K pre-filter misses the fastest",
+    )
+    parser.add_argument(
+        "--slots", default=",".join(SLOTS),
+        help=f"comma-separated departure slots to fill, in priority order (default: all of {', '.join(SLOTS)})",
+    )
+    parser.add_argument(
+        "--budget", type=int, default=None,
+        help="stop after planning this many API elements (default: no limit)",
+    )
+    args = parser.parse_args()
+    args.slots = [slot.strip() for slot in args.slots.split(",") if slot.strip()]
+    unknown = [slot for slot in args.slots if slot not in SLOTS]
+    if unknown:
+        parser.error(f"unknown slot(s): {', '.join(unknown)}")
+    return args
+
+
+def group_by_candidates(hex_ids, route_mask):
+    """Group hexes routed to the same POI columns: {column indices: [hex ids]}."""
+    groups = {}
+    for hex_id, row in zip(hex_ids, route_mask):
+        groups.setdefault(tuple(np.flatnonzero(row)), []).append(hex_id)
+    return groups
 
 
 def main():
+    args = parse_args()
     api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
     if not api_key:
         print("ERROR: Set GOOGLE_MAPS_API_KEY environment variable")
         sys.exit(1)
 
-    gmaps = googlemaps.Client(key=api_key)
+    gmaps = googlemaps.Client(key=api_key, queries_per_second=max(1, int(GOOGLE_QPS)))
+    categories = load_registry()
 
     # Load centroids
     with open(CENTROIDS_PATH) as f:
         centroids = json.load(f)
     print(f"Routing centroids loaded: {len(centroids)}")
 
-    # Load existing cache
-    if os.path.exists(CACHE_PATH):
-        with open(CACHE_PATH) as f:
-            cache = json.load(f)
+    with RoutesCache(CACHE_PATH, output_fields(categories)) as cache:
         print(f"Existing cache entries: {len(cache)}")
-    else:
-        cache = {}
-
-    # Filter to only hexes not yet cached
-    to_process = {k: v for k, v in centroids.items() if k not in cache}
-    print(f"Hexes to process: {len(to_process)} (skipping {len(centroids) - len(to_process)} cached)")
-
-    if not to_process:
+        route_hexes(gmaps, cache, centroids, categories, args.slots, args)
+
+
+def plan_batches(hex_ids, route_mask):
+    """Split hexes by their POI columns into Distance Matrix-sized batches."""
+    rows = route_mask.any(axis=1)
+    groups = group_by_candidates(
+        [h for h, keep in zip(hex_ids, rows) if keep], route_mask[rows]
+    )
+    batches = []
+    for cols, group_hex_ids in groups.items():
+        batch_size = min(MAX_ORIGINS, MAX_ELEMENTS // len(cols))
+        for b in range(0, len(group_hex_ids), batch_size):
+            batches.append((cols, group_hex_ids[b : b + batch_size]))
+    return batches
+
+
+def route_hexes(gmaps, cache, centroids, categories, slots, args):
+    """Route every centroid hex missing a category at a slot and record it in `cache`.
+
+    Slots are filled in order, each completely before the next, until
+    args.budget API elements have been planned; a re-run picks up where
+    the budget stopped.
+    """
+    # Only route hexes missing some category at some slot
+    all_hex_ids = list(centroids)
+    routed = {
+        slot: np.column_stack(
+            [cache.routed(all_hex_ids, cat["column"], slot) for cat in categories]
+        )
+        for slot in slots
+    }
+    todo = ~np.all([r.all(axis=1) for r in routed.values()], axis=0)
+    hex_ids = [h for h, t in zip(all_hex_ids, todo) if t]
+    routed = {slot: r[todo] for slot, r in routed.items()}
+    print(f"Hexes to process: {len(hex_ids)} (skipping {len(all_hex_ids) - len(hex_ids)} cached)")
+
+    if not hex_ids:
         print("Nothing to do, all hexes cached.")
         return
 
-    departure = next_tuesday_8am_pacific()
-    print(f"Departure time: {departure}")
-
-    hex_ids = list(to_process.keys())
-    total_batches = (len(hex_ids) + BATCH_SIZE - 1) // BATCH_SIZE
-    total_elements = len(hex_ids) * len(ALL_DESTINATIONS)
-    est_cost = total_elements / 1000 * 10  # $10 per 1000 elements (traffic-aware)
-    print(f"Total API elements: {total_elements} (est. cost: ${est_cost:.2f})")
-    print(f"Batches: {total_batches} of {BATCH_SIZE} origins each")
+    # Pick the POIs each hex is routed to at each slot: the candidates of
+    # every category it is missing (all POIs of those categories when validating)
+    lats = [centroids[h]["lat"] for h in hex_ids]
+    lngs = [centroids[h]["lng"] for h in hex_ids]
+    pois, category_cols, candidates = route_candidates(categories, lats, lngs, args.top_k)
+    batches = []
+    planned = 0
+    wanted = 0
+    for slot in slots:
+        route_mask = np.zeros((len(hex_ids), len(pois)), dtype=bool)
+        for i, (cols, mask) in enumerate(zip(category_cols, candidates)):
+            missing = ~routed[slot][:, i]
+            route_mask[:, cols] |= (np.ones_like(mask) if args.validate else mask) & missing[:, None]
+        n_hexes = int(route_mask.any(axis=1).sum())
+        slot_elements = int(route_mask.sum())
+        wanted += slot_elements
+        print(f"  {slot}: {n_hexes} hexes, {slot_elements} elements")
+        for cols, batch_hex_ids in plan_batches(hex_ids, route_mask):
+            elements = len(cols) * len(batch_hex_ids)
+            if args.budget is not None and planned + elements > args.budget:
+                break
+            batches.append((slot, cols, batch_hex_ids))
+            planned += elements
+        if planned < wanted:
+            break  # later slots wait until this one is complete
+
+    total_batches = len(batches)
+    est_cost = planned / 1000 * 10  # $10 per 1000 elements (traffic-aware)
+    print(f"Total API elements: {planned} (est. cost: ${est_cost:.2f})")
+    if planned < wanted:
+        print(f"  Budget of {args.budget} elements reached; {wanted - planned} left for later runs")
+    print(f"Batches: {total_batches}")
     print()
 
     processed = 0
     errors = 0
-
-    for batch_start in range(0, len(hex_ids), BATCH_SIZE):
-        batch_hex_ids = hex_ids[batch_start : batch_start + BATCH_SIZE]
-        batch_num = batch_start // BATCH_SIZE + 1
-
-        origins = [(to_process[h]["lat"], to_process[h]["lng"]) for h in batch_hex_ids]
-
-        try:
-            result = gmaps.distance_matrix(
-                origins=origins,
-                destinations=ALL_DESTINATIONS,
-                mode="driving",
-                departure_time=departure,
-            )
-
-            for i, hex_id in enumerate(batch_hex_ids):
-                row = result["rows"][i]
-                elements = row["elements"]
-
-                # Find nearest gym (min duration among first GYM_COUNT destinations)
-                best_gym_minutes = None
-                best_gym_name = None
-                for j in range(GYM_COUNT):
-                    el = elements[j]
-                    if el["status"] == "OK":
-                        minutes = round(el["duration_in_traffic"]["value"] / 60)
-                        if best_gym_minutes is None or minutes < best_gym_minutes:
-                            best_gym_minutes = minutes
-                            best_gym_name = CLIMBING_GYMS[j]["name"]
-
-                # Office is the last destination
-                office_el = elements[-1]
-                office_minutes = None
-                if office_el["status"] == "OK":
-                    office_minutes = round(office_el["duration_in_traffic"]["value"] / 60)
-
-                cache[hex_id] = {
-                    "nearestGymMinutes": best_gym_minutes,
-                    "nearestGymName": best_gym_name,
-                    "officeMinutes": office_minutes,
-                }
-                processed += 1
-
-        except Exception as e:
-            print(f"  Batch {batch_num} ERROR: {e}")
+    row_of = {h: i for i, h in enumerate(hex_ids)}
+    seconds = {slot: np.full((len(hex_ids), len(pois)), np.nan) for slot in slots}
+    departures = {slot: next_departure(slot) for slot in slots}
+    for slot in dict.fromkeys(slot for slot, _, _ in batches):
+        print(f"Departure time ({slot}): {departures[slot]}")
+    matrix_requests = [
+        (
+            [(centroids[h]["lat"], centroids[h]["lng"]) for h in batch_hex_ids],
+            [(pois[c]["lat"], pois[c]["lng"]) for c in cols],
+            departures[slot],
+        )
+        for slot, cols, batch_hex_ids in batches
+    ]
+
+    results = fetch_matrices(gmaps, matrix_requests)
+    for done, (batch_idx, result) in enumerate(results, 1):
+        if result is None:
             errors += 1
-            time.sleep(2)
             continue
-
-        # Save cache after each batch (incremental)
-        with open(CACHE_PATH, "w") as f:
-            json.dump(cache, f)
-
-        if batch_num % 5 == 0 or batch_num == 1 or batch_num == total_batches:
-            print(f"  Batch {batch_num}/{total_batches} -- {processed} hexes done")
-
-        # Rate limit: ~10 requests/sec is safe, but be conservative
-        time.sleep(0.5)
-
-    print(f"\nDone! Processed: {processed}, Errors: {errors}")
+        slot, cols, batch_hex_ids = batches[batch_idx]
+
+        updates = {}
+        for hex_id, row in zip(batch_hex_ids, result["rows"]):
+            r = row_of[hex_id]
+            for el, c in zip(row["elements"], cols):
+                if el["status"] == "OK":
+                    seconds[slot][r, c] = el["duration_in_traffic"]["value"]
+
+            # Reduce each category this hex was missing at this slot
+            entry = {}
+            for i, (cat, cat_cols, mask) in enumerate(zip(categories, category_cols, candidates)):
+                if routed[slot][r, i]:
+                    continue
+                cat_seconds = seconds[slot][r : r + 1, cat_cols]
+                if not args.validate:
+                    cat_seconds = np.where(mask[r : r + 1], cat_seconds, np.nan)
+                reduced = category_minutes(cat, cat_seconds)
+                minutes = reduced[cat["column"]][0]
+                entry[cat["column"]] = None if np.isnan(minutes) else int(minutes)
+                if cat.get("nameColumn") in reduced:
+                    entry[cat["nameColumn"]] = reduced[cat["nameColumn"]][0]
+            updates[hex_id] = entry
+            processed += 1
+
+        # Journal this batch (one append); fold into the snapshot now and then
+        cache.append(updates, slot)
+        cache.maybe_compact()
+
+        if done % 5 == 0 or done == 1 or done == total_batches:
+            print(f"  Batch {done}/{total_batches} -- {processed} hex-slots done")
+
+    print(f"\nDone! Processed: {processed} hex-slots, Errors: {errors}")
     print(f"Total cache entries: {len(cache)}")
 
+    if args.validate:
+        for slot in slots:
+            for cat, cols, mask in zip(categories, category_cols, candidates):
+                if cat["kind"] == "nearest":
+                    print_top_k_report(seconds[slot][:, cols], mask, args.top_k, label=f"{cat['id']} {slot}")
+
     # Sanity check: print a few results
-    sample_keys = list(cache.keys())[:3]
-    for k in sample_keys:
-        entry = cache[k]
-        print(f"  {k}: gym={entry['nearestGymMinutes']}min ({entry['nearestGymName']}), office={entry['officeMinutes']}min")
+    for k in hex_ids[:3]:
+        for slot in slots:
+            entry = cache.get(k, slot)
+            times = ", ".join(f"{cat['id']}={entry.get(cat['column'])}min" for cat in categories)
+            print(f"  {k} {slot}: {times}")
 
 
 if __name__ == "__main__":
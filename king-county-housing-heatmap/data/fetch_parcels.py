@@ -5,112 +5,99 @@ Troubleshooting:
 - If the FeatureServer endpoint 403s, try the MapServer variant:
   change FeatureServer/0/query to MapServer/0/query
 - If PIN field name differs, check the API response and adjust outFields
-- If URL is too long with 100 PINs, reduce BATCH_SIZE to 50
-- If rate limited, increase RATE_LIMIT_DELAY to 1.0 or 2.0
+- URL-too-long (413/414) responses shrink the batch size automatically
+- If rate limited, lower arcgis_parcels.RATE_LIMIT or MAX_WORKERS
+- An interrupted run resumes from raw/parcel_coords.checkpoint.jsonl
+- Only parcels missing from raw/parcel_index.sqlite are queried; pass
+  --refresh-days N to also re-fetch coordinates older than N days
+- Set KC_PARCEL_API to point at a different (e.g. local stub) endpoint
+- After fetch_sales.py --history, pass --history to also geocode every
+  parcel in the sales store, or older windows lose most of their sales
 """
 
-import json
+import argparse
 import os
-import time
 
 import pandas as pd
-import requests
-from shapely.geometry import shape
 
-PARCEL_API = (
+from arcgis_parcels import MAX_WORKERS, fetch_parcel_coords
+from parcel_index import ParcelIndex
+import sales_store
+
+PARCEL_API = os.environ.get(
+    "KC_PARCEL_API",
     "https://gisdata.kingcounty.gov/arcgis/rest/services/"
-    "OpenDataPortal/property__parcel_area/FeatureServer/439/query"
+    "OpenDataPortal/property__parcel_area/FeatureServer/439/query",
 )
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
+STORE_COUNTY = "king"
+COUNTY = "King"
 SALES_CSV = os.path.join(RAW_DIR, "filtered_sales.csv")
 OUTPUT_CSV = os.path.join(RAW_DIR, "parcel_coords.csv")
-BATCH_SIZE = 100  # PINs per API request (conservative to avoid URL length limits)
-RATE_LIMIT_DELAY = 0.5  # seconds between requests
-
-
-def load_unique_pins():
-    """Load unique PINs from filtered sales data."""
-    df = pd.read_csv(SALES_CSV, dtype={"PIN": str, "Major": str, "Minor": str})
-    pins = df["PIN"].unique().tolist()
-    print(f"Unique parcels to geocode: {len(pins)}")
-    return pins
-
-
-def query_parcel_batch(pins):
-    """Query ArcGIS API for a batch of PINs, return list of (PIN, lat, lng)."""
-    # Build WHERE clause: PIN IN ('0123456789', '0123456790', ...)
-    pin_list = ",".join(f"'{p}'" for p in pins)
-    where_clause = f"PIN IN ({pin_list})"
-
-    params = {
-        "where": where_clause,
-        "outFields": "PIN",
-        "outSR": 4326,
-        "returnGeometry": "true",
-        "f": "json",
-    }
-
-    for attempt in range(4):
-        try:
-            resp = requests.get(PARCEL_API, params=params, timeout=60)
-            resp.raise_for_status()
-            data = resp.json()
-
-            if "error" in data:
-                print(f"API error: {data['error']}")
-                return []
-
-            results = []
-            for feature in data.get("features", []):
-                pin = feature["attributes"]["PIN"]
-                geom = feature.get("geometry")
-                if geom and "rings" in geom:
-                    # Build a polygon and compute centroid
-                    poly = shape({"type": "Polygon", "coordinates": geom["rings"]})
-                    centroid = poly.centroid
-                    results.append((pin, centroid.y, centroid.x))
-            return results
-
-        except (requests.RequestException, json.JSONDecodeError) as e:
-            wait = 2 ** (attempt + 1)
-            print(f"  Retry {attempt + 1}/4 after {wait}s: {e}")
-            time.sleep(wait)
-
-    return []
+CHECKPOINT_PATH = os.path.join(RAW_DIR, "parcel_coords.checkpoint.jsonl")
+BATCH_SIZE = 100  # starting PINs per API request (shrinks on URL length errors)
+
+
+def load_unique_pins(history=False):
+    """Load unique PINs from filtered sales data.
+
+    With history=True, every parcel in the sales store is added, so
+    historical windows (process_data.py --since/--until) have coordinates
+    too. Parcels already in the parcel index are not re-queried either way.
+    """
+    ids = []
+    if not history or os.path.exists(SALES_CSV):
+        df = pd.read_csv(SALES_CSV, dtype={"PIN": str, "Major": str, "Minor": str})
+        ids = df["PIN"].unique().tolist()
+    if history:
+        store_ids = sales_store.store_parcel_ids(STORE_COUNTY, "PIN")
+        print(f"Parcels in the sales store: {len(store_ids)}")
+        ids = list(dict.fromkeys(ids + store_ids))
+    print(f"Unique parcels to geocode: {len(ids)}")
+    return ids
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--refresh-days", type=float, default=None,
+        help="re-fetch parcels whose stored coordinates are older than this",
+    )
+    parser.add_argument(
+        "--history", action="store_true",
+        help="also geocode every parcel in the sales store (for process_data.py --since/--until)",
+    )
+    return parser.parse_args()
 
 
 def main():
-    pins = load_unique_pins()
-    all_coords = []
-    failed_pins = []
-
-    total_batches = (len(pins) + BATCH_SIZE - 1) // BATCH_SIZE
-    print(f"Fetching coordinates in {total_batches} batches of {BATCH_SIZE}...")
-
-    for i in range(0, len(pins), BATCH_SIZE):
-        batch = pins[i : i + BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-
-        if batch_num % 10 == 0 or batch_num == 1:
-            print(f"Batch {batch_num}/{total_batches} ({len(all_coords)} coords so far)")
+    args = parse_args()
+    pins = load_unique_pins(args.history)
 
-        results = query_parcel_batch(batch)
-        found_pins = {r[0] for r in results}
-        all_coords.extend(results)
+    with ParcelIndex() as index:
+        to_fetch = index.ids_to_fetch(COUNTY, pins, args.refresh_days)
+        print(f"Already in parcel index: {len(pins) - len(to_fetch)}, to fetch: {len(to_fetch)}")
 
-        for pin in batch:
-            if pin not in found_pins:
-                failed_pins.append(pin)
+        if to_fetch:
+            print(f"Fetching coordinates in batches of up to {BATCH_SIZE} ({MAX_WORKERS} workers)...")
+            fetched, _ = fetch_parcel_coords(
+                to_fetch, PARCEL_API, "PIN", BATCH_SIZE, checkpoint_path=CHECKPOINT_PATH
+            )
+            index.upsert(COUNTY, fetched)
+            if os.path.exists(CHECKPOINT_PATH):
+                os.remove(CHECKPOINT_PATH)
 
-        time.sleep(RATE_LIMIT_DELAY)
+        known = index.lookup(COUNTY, pins)
 
     # Save results
-    df = pd.DataFrame(all_coords, columns=["PIN", "lat", "lng"])
+    df = known[["parcel_id", "lat", "lng"]].rename(columns={"parcel_id": "PIN"})
     df.to_csv(OUTPUT_CSV, index=False)
+    found = set(df["PIN"])
+    failed_pins = [i for i in pins if i not in found]
 
-    match_rate = len(all_coords) / len(pins) * 100
+    match_rate = len(df) / len(pins) * 100 if pins else 0
     print(f"\nResults:")
-    print(f"  Matched: {len(all_coords)} / {len(pins)} ({match_rate:.1f}%)")
+    print(f"  Matched: {len(df)} / {len(pins)} ({match_rate:.1f}%)")
     print(f"  Failed: {len(failed_pins)}")
     print(f"  Saved to: {OUTPUT_CSV}")
 
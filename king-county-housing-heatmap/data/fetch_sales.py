@@ -1,88 +1,140 @@
 #!/usr/bin/env python3
-"""Download and filter King County real property sales data."""
+"""Download and filter King County real property sales data.
 
-import io
+By default keeps the last 365 days in filtered_sales.csv. With --history,
+every year of sales goes into the month-partitioned sales store instead
+(see sales_store), rewriting only the months whose sales changed.
+
+The rolling CSV is rebuilt when the downloaded file changes or a new
+calendar month starts, not daily: while the source is unchanged its 365-day
+window can start up to a month early. Delete filtered_sales.csv to
+refilter now.
+"""
+
+import argparse
 import os
 import zipfile
+from collections import Counter
 from datetime import datetime, timedelta
 
 import pandas as pd
-import requests
+import downloads
+import sales_store
 
+STORE_COUNTY = "king"
 SALES_URL = "https://aqua.kingcounty.gov/extranet/assessor/Real%20Property%20Sales.zip"
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 OUTPUT_CSV = os.path.join(RAW_DIR, "filtered_sales.csv")
+WINDOW_DAYS = 365  # rolling window kept in OUTPUT_CSV
+CHUNK_ROWS = 250_000  # CSV rows parsed per chunk
+DATE_COLUMNS = ["DocumentDate", "SaleDate", "DocumentDt"]
+PRICE_COL = "SalePrice"
 
 
 def download_sales_zip():
-    """Download and extract RPSALE CSV from King County Assessor."""
+    """Refresh the Real Property Sales ZIP (conditional GET); return its path."""
     os.makedirs(RAW_DIR, exist_ok=True)
     zip_path = os.path.join(RAW_DIR, "Real_Property_Sales.zip")
+    downloads.fetch(SALES_URL, zip_path)
+    return zip_path
 
-    if os.path.exists(zip_path):
-        print(f"Using cached ZIP: {zip_path}")
-    else:
-        print(f"Downloading sales data from {SALES_URL}...")
-        resp = requests.get(SALES_URL, timeout=120)
-        resp.raise_for_status()
-        with open(zip_path, "wb") as f:
-            f.write(resp.content)
-        print(f"Downloaded {len(resp.content) / 1024 / 1024:.1f} MB")
 
+def find_sales_csv(zf):
+    """Return the name of the RPSale CSV inside the ZIP (name may vary)."""
+    csv_names = [n for n in zf.namelist() if n.endswith(".csv")]
+    print(f"Files in ZIP: {csv_names}")
+    return next(
+        (n for n in csv_names if "rpsale" in n.lower() or "sale" in n.lower()),
+        csv_names[0],
+    )
+
+
+def read_filtered_sales(zip_path, cutoff):
+    """Stream the RPSale CSV in chunks and keep only filtered sales.
+
+    A `cutoff` of None keeps every dated sale (historical mode).
+
+    Only the needed columns are parsed, and each chunk is filtered before
+    the next is read, so peak memory scales with the filtered output rather
+    than the full multi-decade history.
+    """
     with zipfile.ZipFile(zip_path) as zf:
-        csv_names = [n for n in zf.namelist() if n.endswith(".csv")]
-        print(f"Files in ZIP: {csv_names}")
-        # Find the RPSale CSV (name may vary)
-        sale_csv = next(
-            (n for n in csv_names if "rpsale" in n.lower() or "sale" in n.lower()),
-            csv_names[0],
-        )
-        print(f"Extracting: {sale_csv}")
+        sale_csv = find_sales_csv(zf)
+        print(f"Reading: {sale_csv}")
         with zf.open(sale_csv) as f:
-            df = pd.read_csv(f, dtype={"Major": str, "Minor": str}, encoding="latin-1")
-    return df
-
+            columns = pd.read_csv(f, nrows=0, encoding="latin-1").columns.tolist()
+        print(f"Columns: {columns}")
+
+        # Parse sale date - try multiple column name variants
+        date_col = next((c for c in DATE_COLUMNS if c in columns), None)
+        if date_col is None:
+            raise ValueError(f"No date column found. Columns: {columns}")
+        usecols = ["Major", "Minor", date_col, PRICE_COL]
+        if "PropertyType" in columns:
+            usecols.append("PropertyType")
+
+        counts = Counter()
+        type_counts = pd.Series(dtype="int64")
+        kept = []
+        with zf.open(sale_csv) as f:
+            reader = pd.read_csv(
+                f,
+                usecols=usecols,
+                dtype={"Major": str, "Minor": str, "PropertyType": str},
+                encoding="latin-1",
+                chunksize=CHUNK_ROWS,
+            )
+            for chunk in reader:
+                if "PropertyType" in chunk.columns:
+                    type_counts = type_counts.add(chunk["PropertyType"].value_counts(), fill_value=0)
+                kept.append(filter_sales(chunk, date_col, cutoff, counts))
+
+    print(f"Total records: {counts['total']}")
+    if len(type_counts):
+        top = type_counts.astype("int64").sort_values(ascending=False).head(20)
+        print(f"\nPropertyType value counts:\n{top}")
+    print(f"After price > $0 filter: {counts['price_positive']}")
+    print(f"After price range filter ($50K-$10M): {counts['price_range']}")
+    if cutoff is not None:
+        print(f"After date filter (>= {cutoff.date()}): {counts['date']}")
+    else:
+        print(f"With a valid sale date: {counts['date']}")
 
-def filter_sales(df):
-    """Filter to recent residential sales with valid prices."""
-    print(f"Total records: {len(df)}")
+    return pd.concat(kept, ignore_index=True)
 
-    # Print column names for debugging
-    print(f"Columns: {list(df.columns)}")
 
-    # Print unique PropertyType values to understand the codes
-    if "PropertyType" in df.columns:
-        print(f"\nPropertyType value counts:\n{df['PropertyType'].value_counts().head(20)}")
+def parse_sale_dates(values):
+    """Parse dates with the assessor's usual MM/DD/YYYY format, falling back
+    to (much slower) mixed-format parsing only for rows that don't match."""
+    dates = pd.to_datetime(values, format="%m/%d/%Y", errors="coerce")
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], format="mixed", errors="coerce")
+    return dates
 
-    # Parse sale date - try multiple column name variants
-    date_col = None
-    for col in ["DocumentDate", "SaleDate", "DocumentDt"]:
-        if col in df.columns:
-            date_col = col
-            break
-    if date_col is None:
-        raise ValueError(f"No date column found. Columns: {list(df.columns)}")
 
-    df["sale_date"] = pd.to_datetime(df[date_col], format="mixed", errors="coerce")
+def filter_sales(df, date_col, cutoff, counts):
+    """Filter one chunk to sales since `cutoff` (None = all) with valid prices; update counts.
 
-    # Filter: last 12 months
-    one_year_ago = datetime.now() - timedelta(days=365)
-    df = df[df["sale_date"] >= one_year_ago]
-    print(f"After date filter (>= {one_year_ago.date()}): {len(df)}")
+    Cheap numeric price filters run before the (slow) date parsing.
+    """
+    counts["total"] += len(df)
 
     # Filter: sale price > 0 (exclude non-arm's-length transfers)
-    price_col = "SalePrice"
-    df = df[df[price_col] > 0]
-    print(f"After price > $0 filter: {len(df)}")
+    df = df[df[PRICE_COL] > 0]
+    counts["price_positive"] += len(df)
 
     # Filter: reasonable residential prices ($50K - $10M)
-    df = df[(df[price_col] >= 50000) & (df[price_col] <= 10000000)]
-    print(f"After price range filter ($50K-$10M): {len(df)}")
+    df = df[(df[PRICE_COL] >= 50000) & (df[PRICE_COL] <= 10000000)]
+    counts["price_range"] += len(df)
 
-    # Filter: residential property types
-    if "PropertyType" in df.columns:
-        residential_types = df["PropertyType"].value_counts()
-        print(f"\nAll PropertyType values in filtered data:\n{residential_types}")
+    # Filter: last 12 months (or any valid date in historical mode)
+    df = df.assign(sale_date=parse_sale_dates(df[date_col]))
+    if cutoff is not None:
+        df = df[df["sale_date"] >= cutoff]
+    else:
+        df = df[df["sale_date"].notna()]
+    counts["date"] += len(df)
 
     # Pad Major/Minor to standard widths (6 and 4 chars)
     df["Major"] = df["Major"].str.strip().str.zfill(6)
@@ -90,17 +142,59 @@ def filter_sales(df):
     df["PIN"] = df["Major"] + df["Minor"]
 
     # Select output columns
-    output = df[["PIN", "Major", "Minor", "sale_date", price_col]].copy()
+    output = df[["PIN", "Major", "Minor", "sale_date", PRICE_COL]].copy()
     output.columns = ["PIN", "Major", "Minor", "date", "price"]
     output["date"] = output["date"].dt.strftime("%Y-%m-%d")
 
     return output
 
 
+def update_history(zip_path):
+    """Ingest every year of sales into the month-partitioned store."""
+    store_dir = sales_store.county_dir(STORE_COUNTY)
+    inputs = {"source": downloads.source_hash(zip_path)}
+    if downloads.output_is_current(store_dir, inputs):
+        print(f"Sales unchanged since last run, keeping {store_dir}")
+        return
+    filtered = read_filtered_sales(zip_path, None)
+    written, unchanged, removed = sales_store.write_partitions(STORE_COUNTY, filtered)
+    downloads.record_output(store_dir, inputs)
+    months = sales_store.store_months(STORE_COUNTY)
+    print(f"\nStored {len(filtered)} sales in {len(months)} monthly partitions ({months[0]} to {months[-1]})")
+    print(f"Partitions written: {len(written)}, unchanged: {len(unchanged)}, removed: {len(removed)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--history", action="store_true",
+        help="store all years of sales as monthly partitions instead of the last 365 days",
+    )
+    return parser.parse_args()
+
+
 def main():
-    df = download_sales_zip()
-    filtered = filter_sales(df)
+    args = parse_args()
+    zip_path = download_sales_zip()
+    if args.history:
+        update_history(zip_path)
+        return
+    now = datetime.now()
+    one_year_ago = now - timedelta(days=WINDOW_DAYS)
+    # Keyed on the month rather than the cutoff date, which changes daily:
+    # an unchanged source is re-filtered once a month, not on every run, so
+    # the window may hold up to a month of extra older sales (see docstring)
+    inputs = {
+        "source": downloads.source_hash(zip_path),
+        "window_days": WINDOW_DAYS,
+        "month": now.strftime("%Y-%m"),
+    }
+    if downloads.output_is_current(OUTPUT_CSV, inputs):
+        print(f"Sales unchanged since last run, keeping {OUTPUT_CSV}")
+        return
+    filtered = read_filtered_sales(zip_path, one_year_ago)
     filtered.to_csv(OUTPUT_CSV, index=False)
+    downloads.record_output(OUTPUT_CSV, inputs)
     print(f"\nSaved {len(filtered)} filtered sales to {OUTPUT_CSV}")
     print(f"Price range: ${filtered['price'].min():,.0f} - ${filtered['price'].max():,.0f}")
     print(f"Median price: ${filtered['price'].median():,.0f}")
@@ -6,47 +6,122 @@ The file has two sheets: "Disclaimer" (skip) and "AllSales" (the data).
 
 Key columns in AllSales:
   Parcel_Id, Sale_Date, Sale_Price, Prop_Class, Bedrooms, Yr_Blt, Total_SqFt
+
+By default keeps the last 365 days in filtered_sales_snohomish.csv. With
+--history, all sales go into the month-partitioned sales store instead (see
+sales_store); months that have rolled out of the 5-year file are kept.
+
+The rolling CSV is rebuilt when the downloaded file changes or a new
+calendar month starts, not daily: while the source is unchanged its 365-day
+window can start up to a month early. Delete filtered_sales_snohomish.csv to
+refilter now.
 """
 
+import argparse
 import os
 from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
-import requests
+import downloads
+import sales_store
+from openpyxl import load_workbook
 
+STORE_COUNTY = "snohomish"
 SALES_URL = "https://snohomishcountywa.gov/DocumentCenter/View/109438"
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 EXCEL_PATH = os.path.join(RAW_DIR, "Snohomish_All_Sales.xlsx")
 OUTPUT_CSV = os.path.join(RAW_DIR, "filtered_sales_snohomish.csv")
+WINDOW_DAYS = 365  # rolling window kept in OUTPUT_CSV
+CACHE_PATH = os.path.join(RAW_DIR, "Snohomish_All_Sales.parquet")  # AllSales columns, keyed on the workbook hash
+
+SHEET_NAME = "AllSales"
+TEXT_COLUMNS = ["Parcel_Id", "Prop_Class"]
+NUMERIC_COLUMNS = ["Sale_Price", "Bedrooms", "Yr_Blt", "Total_SqFt"]
+SOURCE_COLUMNS = ["Parcel_Id", "Sale_Date"] + NUMERIC_COLUMNS + ["Prop_Class"]
 
 
 def download_excel():
-    """Download the Snohomish County 5-year sales Excel file."""
+    """Refresh the Snohomish County 5-year sales Excel file (conditional GET)."""
     os.makedirs(RAW_DIR, exist_ok=True)
+    downloads.fetch(SALES_URL, EXCEL_PATH)
+    return EXCEL_PATH
+
+
+def cell_text(value):
+    """Render an ID-like cell as read_excel(dtype=str) would (123.0 -> "123")."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def read_sheet_columns(path, sheet_name=SHEET_NAME, columns=SOURCE_COLUMNS):
+    """Stream the sheet row by row, keeping only `columns` (those present).
+
+    openpyxl's read-only mode parses the sheet XML incrementally instead of
+    building a cell object for every column of every row, which is where
+    most of pd.read_excel's time goes.
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = list(next(rows))
+        keep = [(c, header.index(c)) for c in columns if c in header]
+        values = {c: [] for c, _ in keep}
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            for c, i in keep:
+                values[c].append(row[i] if i < len(row) else None)
+    finally:
+        wb.close()
+
+    df = pd.DataFrame(values)
+    for c in TEXT_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].map(cell_text).astype(object)
+    for c in NUMERIC_COLUMNS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    if "Sale_Date" in df.columns:
+        df["Sale_Date"] = pd.to_datetime(df["Sale_Date"], format="mixed", errors="coerce")
+    return df
+
+
+def convert_sheet(excel_path, cache_path):
+    """One-time conversion of the needed AllSales columns to Parquet."""
+    df = read_sheet_columns(excel_path)
+    tmp_path = cache_path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+    return df
+
+
+def read_excel(path, since=None, cache_path=CACHE_PATH):
+    """Read AllSales rows on/after `since`, converting the workbook once.
 
-    if os.path.exists(EXCEL_PATH):
-        print(f"Using cached Excel: {EXCEL_PATH}")
+    The Parquet cache is rebuilt only when the workbook's hash changes;
+    later runs read just the needed columns and the date window from it.
+    """
+    inputs = {"source": downloads.source_hash(path)}
+    if downloads.output_is_current(cache_path, inputs):
+        print(f"Reading cached AllSales columns: {cache_path}")
     else:
-        print(f"Downloading sales data from {SALES_URL}...")
-        resp = requests.get(SALES_URL, timeout=120)
-        resp.raise_for_status()
-        with open(EXCEL_PATH, "wb") as f:
-            f.write(resp.content)
-        print(f"Downloaded {len(resp.content) / 1024 / 1024:.1f} MB")
-
-    df = pd.read_excel(
-        EXCEL_PATH,
-        sheet_name="AllSales",
-        dtype={"Parcel_Id": str, "Prop_Class": str},
-    )
+        print(f"Converting AllSales sheet to {cache_path}...")
+        convert_sheet(path, cache_path)
+        downloads.record_output(cache_path, inputs)
+
+    filters = [("Sale_Date", ">=", pd.Timestamp(since))] if since is not None else None
+    df = pd.read_parquet(cache_path, filters=filters)
     print(f"Columns: {list(df.columns)}")
-    print(f"Total records: {len(df)}")
+    print(f"Records in date window: {len(df)}")
     return df
 
 
-def filter_sales(df):
-    """Filter to recent residential sales with valid prices."""
+def filter_sales(df, one_year_ago):
+    """Filter to residential sales since `one_year_ago` (None = all) with valid prices."""
     print(f"Columns: {list(df.columns)}")
 
     # Parse sale date
@@ -55,10 +130,13 @@ def filter_sales(df):
     # Parse sale price
     df["sale_price"] = pd.to_numeric(df["Sale_Price"], errors="coerce")
 
-    # Filter: last 12 months
-    one_year_ago = datetime.now() - timedelta(days=365)
-    df = df[df["sale_date"] >= one_year_ago]
-    print(f"After date filter (>= {one_year_ago.date()}): {len(df)}")
+    # Filter: last 12 months (or any valid date in historical mode)
+    if one_year_ago is not None:
+        df = df[df["sale_date"] >= one_year_ago]
+        print(f"After date filter (>= {one_year_ago.date()}): {len(df)}")
+    else:
+        df = df[df["sale_date"].notna()]
+        print(f"With a valid sale date: {len(df)}")
 
     # Filter: price range $50K - $10M
     df = df[df["sale_price"].notna()]
@@ -105,10 +183,56 @@ def filter_sales(df):
     return output
 
 
+def update_history(excel_path):
+    """Ingest all sales in the workbook into the month-partitioned store."""
+    store_dir = sales_store.county_dir(STORE_COUNTY)
+    inputs = {"source": downloads.source_hash(excel_path)}
+    if downloads.output_is_current(store_dir, inputs):
+        print(f"Sales unchanged since last run, keeping {store_dir}")
+        return
+    filtered = filter_sales(read_excel(excel_path), None)
+    # The workbook is a rolling 5-year window: its first month is partial
+    first_full = (pd.Period(filtered["date"].min(), "M") + 1).strftime("%Y-%m")
+    written, unchanged, removed = sales_store.write_partitions(
+        STORE_COUNTY, filtered, keep_before=first_full
+    )
+    downloads.record_output(store_dir, inputs)
+    months = sales_store.store_months(STORE_COUNTY)
+    print(f"\nStored {len(filtered)} sales in {len(months)} monthly partitions ({months[0]} to {months[-1]})")
+    print(f"Partitions written: {len(written)}, unchanged: {len(unchanged)}, removed: {len(removed)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--history", action="store_true",
+        help="store all sales as monthly partitions instead of the last 365 days",
+    )
+    return parser.parse_args()
+
+
 def main():
-    df = download_excel()
-    filtered = filter_sales(df)
+    args = parse_args()
+    excel_path = download_excel()
+    if args.history:
+        update_history(excel_path)
+        return
+    now = datetime.now()
+    one_year_ago = now - timedelta(days=WINDOW_DAYS)
+    # Keyed on the month rather than the cutoff date, which changes daily:
+    # an unchanged source is re-filtered once a month, not on every run, so
+    # the window may hold up to a month of extra older sales (see docstring)
+    inputs = {
+        "source": downloads.source_hash(excel_path),
+        "window_days": WINDOW_DAYS,
+        "month": now.strftime("%Y-%m"),
+    }
+    if downloads.output_is_current(OUTPUT_CSV, inputs):
+        print(f"Sales unchanged since last run, keeping {OUTPUT_CSV}")
+        return
+    filtered = filter_sales(read_excel(excel_path, since=one_year_ago), one_year_ago)
     filtered.to_csv(OUTPUT_CSV, index=False)
+    downloads.record_output(OUTPUT_CSV, inputs)
     print(f"\nSaved {len(filtered)} filtered sales to {OUTPUT_CSV}")
     print(f"Price range: ${filtered['price'].min():,.0f} - ${filtered['price'].max():,.0f}")
     print(f"Median price: ${filtered['price'].median():,.0f}")
@@ -0,0 +1,61 @@
+"""Batched H3 cell assignment for the sales pipeline.
+
+h3-py only exposes scalar functions, so the speedup comes from calling them
+as few times as possible: each distinct coordinate pair is indexed once and
+each distinct res-8 cell has its parent computed once, then the results are
+broadcast back to every row with NumPy fancy indexing.
+"""
+
+import h3
+import numpy as np
+import pandas as pd
+
+CELL_RES = 8
+ROUTING_RES = 7
+
+
+def assign_cells(lats, lngs, res=CELL_RES, parent_res=ROUTING_RES):
+    """Return (cells, parents) object arrays for the given lat/lng arrays.
+
+    Many sales share a parcel centroid (repeat sales, condo parcels), so
+    coordinates are deduplicated before calling h3.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if len(lats) == 0:
+        empty = np.array([], dtype=object)
+        return empty, empty.copy()
+
+    # Pack (lat, lng) into one complex value so np.unique dedupes pairs
+    packed = lats + 1j * lngs
+    uniq, coord_idx = np.unique(packed, return_inverse=True)
+    uniq_cells = np.array(
+        [
+            h3.latlng_to_cell(lat, lng, res)
+            for lat, lng in zip(uniq.real.tolist(), uniq.imag.tolist())
+        ],
+        dtype=object,
+    )
+
+    cells = uniq_cells[coord_idx]
+    parents = parent_cells(uniq_cells, parent_res)[coord_idx]
+    return cells, parents
+
+
+def parent_cells(cells, res):
+    """Return the res-`res` parent of each cell, computing each distinct one once."""
+    cells = np.asarray(cells, dtype=object)
+    codes, distinct = pd.factorize(cells)
+    distinct_parents = np.array(
+        [h3.cell_to_parent(c, res) for c in distinct], dtype=object
+    )
+    return distinct_parents[codes]
+
+
+def cell_centroids(cells):
+    """Return (lats, lngs) float arrays of the centers of the given cells."""
+    centers = [h3.cell_to_latlng(c) for c in cells]
+    if not centers:
+        return np.array([]), np.array([])
+    lats, lngs = zip(*centers)
+    return np.array(lats), np.array(lngs)
@@ -0,0 +1,135 @@
+"""Pre-aggregated per-hex summary tables written alongside the sales.
+
+HexLayer.jsx groups every sale by hex and sorts each group to get the
+median, quartiles, bedroom histogram and sqft/year ranges it shows. These
+tables carry the same statistics per H3 cell at each of SUMMARY_RES, so the
+map can draw aggregates without shipping or sorting every sale.
+
+Each resolution is one columnar JSON file:
+
+    {"generated", "res", "count",
+     "priceQuantiles": [0, 10, 25, 50, 75, 90, 100],
+     "bedBuckets": ["0", "1", "2", "3", "4", "5+"],
+     "columns": {"h3": [...], "count": [...],
+                 "price": [[one value per priceQuantiles entry], ...],
+                 "beds": [[one count per bedBuckets entry], ...],
+                 "sqftMin": [...], "sqftMax": [...],
+                 "yrBuiltMin": [...], "yrBuiltMax": [...],
+                 <drive time fields>: [...]}}
+
+Quantiles interpolate linearly like the frontend's computePercentile.
+Drive minutes are the hex median, names the first one seen; missing
+values are null.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from h3_index import CELL_RES, ROUTING_RES, assign_cells, parent_cells
+
+SUMMARY_RES = (7, 8, 9)
+PRICE_QUANTILES = (0, 10, 25, 50, 75, 90, 100)  # percentiles
+BED_BUCKETS = ("0", "1", "2", "3", "4", "5+")
+RANGE_FIELDS = ("sqft", "yrBuilt")
+
+
+def cells_at_res(df, res):
+    """H3 cell of each sale at `res`, reusing the h3/h3_r7 columns where possible."""
+    if res == CELL_RES:
+        return df["h3"].to_numpy(dtype=object)
+    if res == ROUTING_RES and "h3_r7" in df.columns:
+        return df["h3_r7"].to_numpy(dtype=object)
+    if res < CELL_RES:
+        return parent_cells(df["h3"].to_numpy(dtype=object), res)
+    cells, _ = assign_cells(df["lat"].values, df["lng"].values, res=res, parent_res=CELL_RES)
+    return cells
+
+
+def summarize_hexes(df, cells, extra_fields=()):
+    """Reduce sales to one summary row per distinct cell.
+
+    Returns a dict of per-hex arrays keyed by the column names documented
+    above; extra_fields are (field, kind) pairs as for the sales writers.
+    """
+    codes, hexes = pd.factorize(cells)
+    if (codes < 0).any():  # sales without a cell
+        df, codes = df[codes >= 0], codes[codes >= 0]
+    n = len(hexes)
+    out = {"h3": hexes, "count": np.bincount(codes, minlength=n)}
+
+    prices = pd.Series(df["price"].to_numpy(dtype=np.float64)).groupby(codes)
+    quantiles = prices.quantile([p / 100 for p in PRICE_QUANTILES]).unstack()
+    out["price"] = quantiles.to_numpy()
+
+    beds = pd.to_numeric(df["beds"], errors="coerce").to_numpy(dtype=np.float64)
+    has_beds = ~np.isnan(beds)
+    bucket = np.clip(beds[has_beds], 0, len(BED_BUCKETS) - 1).astype(np.int64)
+    hist = np.bincount(
+        codes[has_beds] * len(BED_BUCKETS) + bucket, minlength=n * len(BED_BUCKETS)
+    )
+    out["beds"] = hist.reshape(n, len(BED_BUCKETS))
+
+    ranges = pd.DataFrame(
+        {f: pd.to_numeric(df[f], errors="coerce").to_numpy() for f in RANGE_FIELDS}
+    ).groupby(codes)
+    lo, hi = ranges.min(), ranges.max()
+    for field in RANGE_FIELDS:
+        out[f"{field}Min"] = lo[field].to_numpy(dtype=np.float64)
+        out[f"{field}Max"] = hi[field].to_numpy(dtype=np.float64)
+
+    for field, kind in extra_fields:
+        if field not in df.columns:
+            continue
+        if kind == "int":
+            values = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=np.float64)
+            out[field] = pd.Series(values).groupby(codes).median().reindex(range(n)).to_numpy()
+        else:
+            grouped = pd.Series(df[field].to_numpy(dtype=object)).groupby(codes)
+            out[field] = grouped.first().reindex(range(n)).to_numpy(dtype=object)
+    return out
+
+
+def _int_list(values):
+    """Round a float array to a list of ints, with None for NaN."""
+    return [None if v != v else int(round(v)) for v in np.asarray(values, dtype=np.float64).tolist()]
+
+
+def write_hex_summary(summary, path, generated, res):
+    """Write one summarize_hexes() result as columnar JSON."""
+    columns = {"h3": [str(h) for h in summary["h3"]], "count": summary["count"].tolist()}
+    columns["price"] = np.rint(summary["price"]).astype(np.int64).tolist()
+    columns["beds"] = summary["beds"].tolist()
+    for name, values in summary.items():
+        if name in columns:
+            continue
+        if values.dtype == object:
+            columns[name] = [None if v is None or v != v else v for v in values.tolist()]
+        else:
+            columns[name] = _int_list(values)
+
+    table = {
+        "generated": generated,
+        "res": res,
+        "count": len(columns["h3"]),
+        "priceQuantiles": list(PRICE_QUANTILES),
+        "bedBuckets": list(BED_BUCKETS),
+        "columns": columns,
+    }
+    with open(path, "w") as f:
+        json.dump(table, f, separators=(",", ":"))
+
+
+def write_hex_summaries(df, path_template, generated, extra_fields=(), resolutions=SUMMARY_RES):
+    """Write a summary table per resolution to path_template.format(res=res).
+
+    Returns the written paths.
+    """
+    paths = []
+    for res in resolutions:
+        summary = summarize_hexes(df, cells_at_res(df, res), extra_fields)
+        path = path_template.format(res=res)
+        write_hex_summary(summary, path, generated, res)
+        paths.append(path)
+    return paths
@@ -0,0 +1,155 @@
+"""Concurrent, rate-limited client for the OSRM table service.
+
+One keep-alive ``requests.Session`` is shared by a small thread pool so that
+several table batches are in flight at once, while a token bucket keeps the
+request rate under the server's limit. Failed requests are retried with
+exponential backoff and full jitter.
+
+The public demo server (router.project-osrm.org) allows roughly one request
+per second; a local ``osrm-routed`` instance can take many more, e.g.
+
+    OSRM_TABLE_URL=http://localhost:5000/table/v1/driving \\
+    OSRM_MAX_IN_FLIGHT=16 OSRM_RATE_LIMIT=0 python data/process_data.py
+
+(a rate limit of 0 disables throttling).
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TABLE_URL = "http://router.project-osrm.org/table/v1/driving"
+
+OSRM_TABLE_URL = os.environ.get("OSRM_TABLE_URL", DEFAULT_TABLE_URL)
+OSRM_MAX_IN_FLIGHT = int(os.environ.get("OSRM_MAX_IN_FLIGHT", "4"))
+OSRM_RATE_LIMIT = float(os.environ.get("OSRM_RATE_LIMIT", "3"))  # requests/sec
+
+
+class OSRMError(Exception):
+    """OSRM answered, but with a non-"Ok" code (not worth retrying)."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second.
+
+    Up to `burst` tokens accumulate while idle. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                time.sleep((1 - self._tokens) / self.rate)
+
+
+class OSRMTableClient:
+    """Fetch OSRM duration matrices for many source batches concurrently."""
+
+    def __init__(
+        self,
+        base_url=OSRM_TABLE_URL,
+        max_in_flight=OSRM_MAX_IN_FLIGHT,
+        rate=OSRM_RATE_LIMIT,
+        burst=None,
+        max_retries=3,
+        backoff=1.0,
+        timeout=30,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst or self.max_in_flight)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def table_url(self, sources, destinations):
+        """Build the table URL for (lat, lng) sources and destinations."""
+        coords = ";".join(f"{lng},{lat}" for lat, lng in list(sources) + list(destinations))
+        n_src = len(sources)
+        src_idx = ";".join(str(i) for i in range(n_src))
+        dst_idx = ";".join(str(i) for i in range(n_src, n_src + len(destinations)))
+        return (
+            f"{self.base_url}/{coords}?sources={src_idx}"
+            f"&destinations={dst_idx}&annotations=duration"
+        )
+
+    def table(self, sources, destinations):
+        """Return the [len(sources) x len(destinations)] duration matrix (seconds).
+
+        Unroutable pairs are None. Raises OSRMError for a non-"Ok" response
+        and the last request error once retries are exhausted.
+        """
+        url = self.table_url(sources, destinations)
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            try:
+                resp = self.session.get(url, timeout=self.timeout)
+                resp.raise_for_status()
+                data = resp.json()
+            except (requests.RequestException, json.JSONDecodeError):
+                if attempt == self.max_retries - 1:
+                    raise
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt + 1)))
+                continue
+
+            if data.get("code") != "Ok":
+                raise OSRMError(data.get("code"))
+            return data["durations"]
+
+    def table_many(self, batches):
+        """Yield (batch_index, durations) as batches complete, in any order.
+
+        batches is a sequence of (sources, destinations) pairs, so batches
+        with different destinations share the pool and the rate limit.
+        durations is None for a batch that failed; the error is printed.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {
+                pool.submit(self.table, sources, destinations): i
+                for i, (sources, destinations) in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    durations = future.result()
+                except (OSRMError, requests.RequestException, json.JSONDecodeError) as e:
+                    reason = e
+                    if isinstance(e, requests.HTTPError) and e.response is not None:
+                        reason = f"HTTP {e.response.status_code}"  # str(e) repeats the URL
+                    print(f"  Batch {i + 1}: OSRM error {reason}")
+                    durations = None
+                yield i, durations
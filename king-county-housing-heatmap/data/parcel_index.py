@@ -0,0 +1,74 @@
+"""Persistent parcel-coordinate index shared by both county fetchers.
+
+Parcel centroids almost never move, so fetch_parcels.py and
+fetch_coords_snohomish.py look parcels up here first and query ArcGIS only
+for IDs that have never been geocoded (or, with --refresh-days, whose
+coordinates are older than the given age). Rows are keyed by
+(county, parcel_id) and carry the time they were fetched.
+"""
+
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), "raw", "parcel_index.sqlite")
+
+
+class ParcelIndex:
+    """Parcel centroids keyed by (county, parcel_id) in a SQLite file."""
+
+    def __init__(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parcels (
+                county TEXT NOT NULL,
+                parcel_id TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (county, parcel_id)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, county, ids):
+        """Return a DataFrame (parcel_id, lat, lng, fetched_at) for known `ids`."""
+        known = pd.read_sql_query(
+            "SELECT parcel_id, lat, lng, fetched_at FROM parcels WHERE county = ?",
+            self.conn,
+            params=[county],
+        )
+        return known[known["parcel_id"].isin(set(ids))].reset_index(drop=True)
+
+    def ids_to_fetch(self, county, ids, refresh_days=None):
+        """IDs with no stored coordinates, plus stale ones if refresh_days is set."""
+        known = self.lookup(county, ids)
+        if refresh_days is not None:
+            cutoff = time.time() - refresh_days * 86400
+            known = known[known["fetched_at"] >= cutoff]
+        have = set(known["parcel_id"])
+        return [i for i in ids if i not in have]
+
+    def upsert(self, county, coords):
+        """Store (parcel_id, lat, lng) tuples fetched just now."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO parcels (county, parcel_id, lat, lng, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(county, pid, lat, lng, now) for pid, lat, lng in coords],
+            )
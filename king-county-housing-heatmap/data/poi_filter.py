@@ -0,0 +1,84 @@
+"""Straight-line pre-filter that picks which POIs each origin is routed to.
+
+For a "nearest" POI category (e.g. climbing gyms) routing every origin to
+every POI wastes most elements: the fastest one is almost always among the
+few closest as the crow flies. nearest_pois() keeps the k nearest POIs per
+origin by haversine distance, and top_k_misses() measures, on fully routed
+origins, how often that would have dropped the POI that is actually
+fastest to drive to.
+
+With only a handful of POIs an exact [origins x POIs] distance matrix plus
+np.argpartition is cheaper than building a KD/ball tree.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+TOP_K_NEAREST = 3  # POIs routed per origin in each nearest category; 0 = all
+
+
+def haversine_km(lats, lngs, poi_lats, poi_lngs):
+    """Great-circle distances [len(lats) x len(poi_lats)] in km."""
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lng1 = np.radians(np.asarray(lngs, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(poi_lats, dtype=np.float64))[None, :]
+    lng2 = np.radians(np.asarray(poi_lngs, dtype=np.float64))[None, :]
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def nearest_pois(lats, lngs, pois, k=TOP_K_NEAREST):
+    """Boolean mask [len(lats) x len(pois)] of each origin's k nearest POIs.
+
+    k <= 0 or k >= len(pois) selects every POI.
+    """
+    n = len(lats)
+    if k <= 0 or k >= len(pois):
+        return np.ones((n, len(pois)), dtype=bool)
+    dist = haversine_km(lats, lngs, [p["lat"] for p in pois], [p["lng"] for p in pois])
+    nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    mask = np.zeros((n, len(pois)), dtype=bool)
+    np.put_along_axis(mask, nearest, True, axis=1)
+    return mask
+
+
+def top_k_misses(durations, mask):
+    """Compare the fastest POI overall with the fastest one inside `mask`.
+
+    durations is [origins x POIs] (NaN = unroutable), fully routed. Returns
+    (evaluated, missed, extra_seconds): the number of origins with any
+    routable POI, how many of them would lose their fastest POI to the
+    pre-filter, and the added duration for each miss (inf where no
+    candidate was routable at all).
+    """
+    routable = ~np.isnan(durations).all(axis=1)
+    durations = durations[routable]
+    mask = mask[routable]
+    best = np.nanmin(durations, axis=1)
+    candidate = np.where(mask, durations, np.nan)
+    has_candidate = ~np.isnan(candidate).all(axis=1)
+    best_candidate = np.full(len(durations), np.inf)
+    best_candidate[has_candidate] = np.nanmin(candidate[has_candidate], axis=1)
+    extra = best_candidate - best
+    missed = extra > 0
+    return int(routable.sum()), int(missed.sum()), extra[missed]
+
+
+def print_top_k_report(durations, mask, k, label="POI"):
+    """Print how often routing only the k nearest POIs misses the fastest one."""
+    evaluated, missed, extra = top_k_misses(durations, mask)
+    print(
+        f"  Top-{k} validation: fastest {label} outside the {k} nearest for "
+        f"{missed}/{evaluated} origins ({missed / max(evaluated, 1) * 100:.1f}%)"
+    )
+    finite = extra[np.isfinite(extra)]
+    if len(finite):
+        print(
+            f"  Added drive time when missed: median {np.median(finite) / 60:.1f} min, "
+            f"max {finite.max() / 60:.1f} min"
+        )
+    if len(finite) < len(extra):
+        print(f"  Origins left with no routable candidate: {len(extra) - len(finite)}")
@@ -0,0 +1,138 @@
+"""POI registry shared by the routing scripts and the frontend.
+
+All points of interest live in frontend/src/data/pois.json, grouped into
+categories. Each category names the sales column its drive time goes to
+and is one of two kinds:
+
+- ``nearest``: minutes to the fastest POI in the category (e.g. any
+  climbing gym), plus the winning POI's name in ``nameColumn`` if given.
+- ``destination``: minutes to a single specific POI (e.g. the office).
+
+Adding a category (grocery, schools, transit, ...) is a config change: the
+routing engine routes only the new POIs, since cached durations are keyed
+per POI.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from drive_cache import poi_key
+from poi_filter import nearest_pois
+
+REGISTRY_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "frontend", "src", "data", "pois.json"
+)
+CATEGORY_KINDS = ("nearest", "destination")
+
+# Google routes cache entries written before the registry used these keys
+LEGACY_ROUTES_KEYS = {
+    "nearestGymMinutes": "driveGym",
+    "officeMinutes": "driveOffice",
+}
+
+
+def load_registry(path=REGISTRY_PATH):
+    """Load and validate the POI categories from the registry file."""
+    with open(path, encoding="utf-8") as f:
+        categories = json.load(f)["categories"]
+
+    columns = set()
+    for cat in categories:
+        cat_id = cat.get("id")
+        if cat.get("kind") not in CATEGORY_KINDS:
+            raise ValueError(f"POI category {cat_id!r}: kind must be one of {CATEGORY_KINDS}")
+        if not cat.get("pois"):
+            raise ValueError(f"POI category {cat_id!r} has no POIs")
+        if cat["kind"] == "destination" and len(cat["pois"]) != 1:
+            raise ValueError(f"Destination category {cat_id!r} must have exactly one POI")
+        if not cat.get("column"):
+            raise ValueError(f"POI category {cat_id!r} has no output column")
+        for col in (cat["column"], cat.get("nameColumn")):
+            if col in columns:
+                raise ValueError(f"Column {col!r} is used by more than one POI category")
+            if col:
+                columns.add(col)
+    return categories
+
+
+def category_pois(categories, cat_id):
+    """POIs of the category with id `cat_id`."""
+    for cat in categories:
+        if cat["id"] == cat_id:
+            return cat["pois"]
+    raise KeyError(cat_id)
+
+
+def output_fields(categories):
+    """(field, kind) pairs for the sales columns the categories produce."""
+    fields = []
+    for cat in categories:
+        fields.append((cat["column"], "int"))
+        if cat.get("nameColumn"):
+            fields.append((cat["nameColumn"], "str"))
+    return fields
+
+
+def output_columns(categories):
+    """Sales column names the categories produce (minutes and names)."""
+    return [field for field, _ in output_fields(categories)]
+
+
+def destination_columns(categories):
+    """Flatten the categories' POIs into unique routing-matrix columns.
+
+    Returns (pois, category_cols): the deduplicated POI list and, per
+    category, an array of the column index of each of its POIs.
+    """
+    pois, index, category_cols = [], {}, []
+    for cat in categories:
+        cols = []
+        for poi in cat["pois"]:
+            key = poi_key(poi)
+            if key not in index:
+                index[key] = len(pois)
+                pois.append(poi)
+            cols.append(index[key])
+        category_cols.append(np.array(cols))
+    return pois, category_cols
+
+
+def route_candidates(categories, lats, lngs, top_k):
+    """Which POIs each origin should be routed to, per category.
+
+    Returns (pois, category_cols, candidates) where candidates[i] is a
+    boolean [origins x len(category i POIs)] mask: the top_k straight-line
+    nearest POIs for nearest categories, everything for destinations.
+    """
+    pois, category_cols = destination_columns(categories)
+    candidates = []
+    for cat in categories:
+        if cat["kind"] == "nearest":
+            candidates.append(nearest_pois(lats, lngs, cat["pois"], top_k))
+        else:
+            candidates.append(np.ones((len(lats), len(cat["pois"])), dtype=bool))
+    return pois, category_cols, candidates
+
+
+def category_minutes(cat, seconds):
+    """Reduce a category's [origins x POIs] durations (NaN = not routed).
+
+    Returns {column: minutes} (rounded, NaN where nothing was routable) and,
+    for nearest categories with a nameColumn, {nameColumn: fastest POI name}.
+    """
+    has_any = ~np.isnan(seconds).all(axis=1)
+    best = np.zeros(len(seconds), dtype=np.int64)
+    best[has_any] = np.nanargmin(seconds[has_any], axis=1)
+    best_seconds = np.take_along_axis(seconds, best[:, None], axis=1)[:, 0]
+    out = {cat["column"]: np.round(best_seconds / 60)}
+    if cat["kind"] == "nearest" and cat.get("nameColumn"):
+        names = np.array([p["name"] for p in cat["pois"]] + [None], dtype=object)
+        out[cat["nameColumn"]] = names[np.where(has_any, best, -1)]
+    return out
+
+
+def normalize_routes_entry(entry):
+    """Rename legacy Google routes cache keys to registry column names."""
+    return {LEGACY_ROUTES_KEYS.get(k, k): v for k, v in entry.items()}
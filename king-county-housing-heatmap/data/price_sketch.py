@@ -0,0 +1,156 @@
+"""Mergeable price quantile sketches per hex and month.
+
+A sketch is a log-bucketed histogram of prices (the DDSketch scheme): a
+price p falls in bin ceil(log_gamma(p)) with gamma = (1 + a) / (1 - a), and
+every bin is reported as 2 * gamma^k / (gamma + 1), so any quantile read
+from the sketch is within relative error a (RELATIVE_ACCURACY) of the
+exact one. Merging is adding counts bin by bin, which is exact: a parent
+hex or a date range gets the same sketch as if it had been built from the
+raw sales. At 1% accuracy, prices from $10k to $100M span under 500 bins
+and a hex-month typically occupies only a handful.
+
+Sketches are built per res-8 hex (the sales' ``h3``) and sale month and
+written as columnar JSON (``price_sketches_r8.json``):
+
+    {"generated", "res", "relativeAccuracy", "gamma", "count",
+     "columns": {"h3": [...], "month": ["2025-03", ...], "n": [...],
+                 "bins": [[first bin, delta, delta, ...], ...],
+                 "counts": [[...], ...]}}
+
+Bins are delta-encoded in ascending order.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from h3_index import CELL_RES
+
+SKETCH_RES = CELL_RES
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+
+
+def price_bins(prices):
+    """Sketch bin of each (positive) price."""
+    return np.ceil(np.log(np.asarray(prices, dtype=np.float64)) / LOG_GAMMA).astype(np.int64)
+
+
+def bin_values(bins):
+    """Representative price of each bin (relative error <= RELATIVE_ACCURACY)."""
+    return 2 * GAMMA ** np.asarray(bins, dtype=np.float64) / (GAMMA + 1)
+
+
+class PriceSketch:
+    """Sparse (bins, counts) histogram; see the module docstring."""
+
+    def __init__(self, bins=(), counts=()):
+        self.bins = np.asarray(bins, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_prices(cls, prices):
+        bins, counts = np.unique(price_bins(prices), return_counts=True)
+        return cls(bins, counts)
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def merge(self, *others):
+        """Return a new sketch holding this sketch's and `others`' prices."""
+        return merge_sketches([self, *others])
+
+    def quantiles(self, qs):
+        """Approximate quantiles (qs in 0-1) of the sketched prices; NaN if empty."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        cum = np.cumsum(self.counts)
+        # Same rank as np.percentile(..., method="lower")
+        ranks = np.floor(qs * (cum[-1] - 1))
+        return bin_values(self.bins[np.searchsorted(cum, ranks, side="right")])
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+
+def merge_sketches(sketches):
+    """Merge any number of sketches into one."""
+    sketches = list(sketches)
+    if not sketches:
+        return PriceSketch()
+    all_bins = np.concatenate([s.bins for s in sketches])
+    all_counts = np.concatenate([s.counts for s in sketches])
+    bins, inverse = np.unique(all_bins, return_inverse=True)
+    return PriceSketch(bins, np.bincount(inverse.reshape(-1), weights=all_counts).astype(np.int64))
+
+
+def build_sketches(cells, months, prices):
+    """Sketch prices per (cell, month) in one vectorized pass.
+
+    Returns a DataFrame with one row per (h3, month), sorted, and columns
+    n, bins and counts (int64 arrays, bins ascending).
+    """
+    cells = np.asarray(cells, dtype=object)
+    months = np.asarray(months, dtype=object)
+    prices = np.asarray(prices, dtype=np.float64)
+    valid = (prices > 0) & pd.notna(cells) & pd.notna(months)
+    if not valid.any():
+        return pd.DataFrame(columns=["h3", "month", "n", "bins", "counts"])
+
+    group, keys = pd.factorize(pd.MultiIndex.from_arrays([cells[valid], months[valid]]))
+    pairs, pair_counts = np.unique(
+        np.stack([group, price_bins(prices[valid])], axis=1), axis=0, return_counts=True
+    )
+    # pairs are sorted by group then bin; split them at each new group
+    starts = np.flatnonzero(np.r_[True, np.diff(pairs[:, 0]) != 0])
+    sketch_keys = keys[pairs[starts, 0]]
+    sketches = pd.DataFrame({
+        "h3": sketch_keys.get_level_values(0),
+        "month": sketch_keys.get_level_values(1),
+        "n": np.add.reduceat(pair_counts, starts),
+        "bins": pd.Series(np.split(pairs[:, 1], starts[1:]), dtype=object),
+        "counts": pd.Series(np.split(pair_counts.astype(np.int64), starts[1:]), dtype=object),
+    })
+    return sketches.sort_values(["h3", "month"], ignore_index=True)
+
+
+def write_price_sketches(df, path, generated, res=SKETCH_RES):
+    """Sketch the sales in `df` per res-`res` hex and month and write them as JSON."""
+    cells = df["h3"] if res == CELL_RES else df[f"h3_r{res}"]
+    months = df["date"].astype(str).str[:7]
+    sketches = build_sketches(cells.to_numpy(dtype=object), months.to_numpy(dtype=object), df["price"])
+    table = {
+        "generated": generated,
+        "res": res,
+        "relativeAccuracy": RELATIVE_ACCURACY,
+        "gamma": GAMMA,
+        "count": len(sketches),
+        "columns": {
+            "h3": sketches["h3"].tolist(),
+            "month": sketches["month"].tolist(),
+            "n": sketches["n"].tolist(),
+            "bins": [np.diff(b, prepend=0).tolist() for b in sketches["bins"]],
+            "counts": [c.tolist() for c in sketches["counts"]],
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(table, f, separators=(",", ":"))
+    return sketches
+
+
+def read_price_sketches(path):
+    """Read a price sketch table as a DataFrame of h3, month and PriceSketch."""
+    with open(path) as f:
+        columns = json.load(f)["columns"]
+    return pd.DataFrame({
+        "h3": columns["h3"],
+        "month": columns["month"],
+        "sketch": [
+            PriceSketch(np.cumsum(bins), counts)
+            for bins, counts in zip(columns["bins"], columns["counts"])
+        ],
+    })
@@ -4,14 +4,33 @@
 Merges King County and Snohomish County sales into a single dataset.
 """
 
+import argparse
 import json
 import os
-import time
 
 import h3
 import numpy as np
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from downloads import file_sha256
+from h3_index import CELL_RES, ROUTING_RES, assign_cells, parent_cells
+from hex_summary import write_hex_summaries
+from poi_filter import TOP_K_NEAREST
+from poi_registry import load_registry, output_columns, output_fields
+from price_sketch import write_price_sketches
+from routes_cache import DEFAULT_SLOT, SLOTS, read_routes_cache, routes_cache_exists
+from routing_engine import category_drive_times
+from run_report import RunReport
+from sales_export import (
+    SHARD_RES,
+    filter_ranges,
+    write_sales_bin,
+    write_sales_json,
+    write_sales_shards,
+)
+from sales_store import read_window
 
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 
@@ -19,134 +38,152 @@ RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 KC_SALES_CSV = os.path.join(RAW_DIR, "filtered_sales.csv")
 KC_COORDS_CSV = os.path.join(RAW_DIR, "parcel_coords.csv")
 KC_BLDG_CSV = os.path.join(RAW_DIR, "EXTR_ResBldg.csv")
+KC_BLDG_CACHE = os.path.join(RAW_DIR, "resbldg.parquet")  # cleaned table, keyed on the CSV's hash
+BLDG_SOURCE_COLUMNS = {
+    "Major", "Minor", "Bedrooms", "BathFullCount", "Bath3qtrCount",
+    "BathHalfCount", "SqFtTotLiving", "YrBuilt",
+}
 
 # Snohomish County files
 SN_SALES_CSV = os.path.join(RAW_DIR, "filtered_sales_snohomish.csv")
 SN_COORDS_CSV = os.path.join(RAW_DIR, "parcel_coords_snohomish.csv")
+# Scripts that geocode every sales-store parcel (--history), by store county
+HISTORY_COORDS_SCRIPTS = {"king": "fetch_parcels.py", "snohomish": "fetch_coords_snohomish.py"}
 
 OUTPUT_JSON = os.path.join(
     os.path.dirname(__file__), "..", "frontend", "public", "sales_data.json"
 )
+OUTPUT_BIN = os.path.join(
+    os.path.dirname(__file__), "..", "frontend", "public", "sales_data.bin"
+)
+HEX_SUMMARY_JSON = os.path.join(
+    os.path.dirname(__file__), "..", "frontend", "public", "hex_summary_r{res}.json"
+)
+SHARD_DIR = os.path.join(os.path.dirname(__file__), "..", "frontend", "public", "shards")
+PRICE_SKETCH_JSON = os.path.join(
+    os.path.dirname(__file__), "..", "frontend", "public", "price_sketches_r8.json"
+)
 
-# Points of interest for drive time computation (must match frontend/src/data/pois.js)
-CLIMBING_GYMS = [
-    {"name": "Edgeworks Bellevue", "lat": 47.6195, "lng": -122.1302},
-    {"name": "Edgeworks Seattle", "lat": 47.6680, "lng": -122.3953},
-    {"name": "Vertical World Seattle", "lat": 47.6610, "lng": -122.3865},
-    {"name": "Vertical World North", "lat": 47.8688, "lng": -122.2981},
-    {"name": "Uplift Shoreline", "lat": 47.7548, "lng": -122.3143},
-    {"name": "Momentum SODO", "lat": 47.5781, "lng": -122.3348},
-    {"name": "SBP Poplar", "lat": 47.5936, "lng": -122.3109},
-    {"name": "SBP Fremont", "lat": 47.6502, "lng": -122.3418},
-]
-MICROSOFT_B43 = {"name": "Microsoft Building 43", "lat": 47.6395, "lng": -122.1344}
-
-OSRM_TABLE_URL = "http://router.project-osrm.org/table/v1/driving"
-DRIVE_BATCH_SIZE = 100
-DRIVE_RATE_DELAY = 0.3
-
-
-def compute_drive_times(merged, only_missing=False):
-    """Compute driving times from each sale to nearest gym and MS Building 43.
-
-    Uses OSRM table API with sales as sources and POIs as destinations.
-    Adds 'driveGym' and 'driveOffice' columns (minutes, rounded).
-    If only_missing=True, only computes for rows where driveGym is NaN.
+# Per-stage wall/CPU time, peak RSS and row counts of the latest run, plus
+# one line per run appended to the history
+RUN_REPORT_JSON = os.path.join(RAW_DIR, "process_report.json")
+RUN_REPORT_HISTORY = os.path.join(RAW_DIR, "process_reports.jsonl")
+
+DRIVE_CELL_RES = ROUTING_RES  # route once per H3 cell at this resolution
+
+
+def routing_cells(merged, res=DRIVE_CELL_RES):
+    """Return the H3 cell at `res` that each sale is routed from."""
+    if res <= CELL_RES and "h3" in merged.columns:
+        return parent_cells(merged["h3"].values, res)
+    cells, _ = assign_cells(merged["lat"].values, merged["lng"].values, res=res, parent_res=res)
+    return cells
+
+
+def compute_drive_times(
+    merged, categories, only_missing=False, res=DRIVE_CELL_RES, top_k=TOP_K_NEAREST, validate=False
+):
+    """Compute driving times from each sale to every POI registry category.
+
+    Sales are grouped by their res-`res` H3 cell; each distinct cell's
+    centroid is routed once with the OSRM table API (all categories' POIs
+    as destinations of one matrix, see routing_engine) and the result is
+    broadcast back to every sale in the cell -- the same scheme as the
+    Google path. Results persist per POI in the OSRM cache, so later runs
+    only route new cells and new or moved POIs/categories.
+    Nearest categories are routed only to each cell's top_k straight-line
+    nearest POIs; validate=True routes them all and reports how often the
+    pre-filter would have missed the fastest one.
+    Adds each category's minutes column (and name column, if any).
+    If only_missing=True, only fills values that are missing (NaN).
     """
-    all_pois = CLIMBING_GYMS + [MICROSOFT_B43]
-    gym_count = len(CLIMBING_GYMS)
-
-    # Destination coords string (POIs): lng,lat;lng,lat;...
-    dest_coords = [f"{p['lng']},{p['lat']}" for p in all_pois]
-    dest_str = ";".join(dest_coords)
-    dest_indices = ";".join(str(i) for i in range(len(all_pois)))
-
-    lats = merged["lat"].values
-    lngs = merged["lng"].values
+    columns = output_columns(categories)
     n = len(merged)
+    existing = merged.reindex(columns=columns)
 
     if only_missing:
-        # Only process rows where driveGym is missing
-        mask = merged["driveGym"].isna().values
-        indices_to_process = np.where(mask)[0]
+        # Only process rows (and categories) with a missing drive time
+        indices_to_process = np.where(existing.isna().any(axis=1).values)[0]
+        categories = [cat for cat in categories if existing[cat["column"]].isna().any()]
+        columns = output_columns(categories)
     else:
         indices_to_process = np.arange(n)
 
-    drive_gym = merged["driveGym"].values.copy() if "driveGym" in merged.columns else np.full(n, np.nan)
-    drive_office = merged["driveOffice"].values.copy() if "driveOffice" in merged.columns else np.full(n, np.nan)
-
-    n_process = len(indices_to_process)
-    total_batches = (n_process + DRIVE_BATCH_SIZE - 1) // DRIVE_BATCH_SIZE
-    print(f"\nComputing OSRM drive times ({n_process} sales, {total_batches} batches)...")
-
-    for b in range(0, n_process, DRIVE_BATCH_SIZE):
-        batch_indices = indices_to_process[b : b + DRIVE_BATCH_SIZE]
-        batch_num = b // DRIVE_BATCH_SIZE + 1
-
-        # Source coords for this batch
-        src_coords = [f"{lngs[i]},{lats[i]}" for i in batch_indices]
-        src_count = len(src_coords)
-
-        # Build coordinate string: sources first, then destinations
-        all_coords = ";".join(src_coords + dest_coords)
-        src_idx_str = ";".join(str(i) for i in range(src_count))
-        dst_idx_str = ";".join(str(i) for i in range(src_count, src_count + len(all_pois)))
-
-        url = f"{OSRM_TABLE_URL}/{all_coords}?sources={src_idx_str}&destinations={dst_idx_str}&annotations=duration"
-
-        for attempt in range(3):
-            try:
-                resp = requests.get(url, timeout=30)
-                resp.raise_for_status()
-                data = resp.json()
-
-                if data.get("code") != "Ok":
-                    print(f"  Batch {batch_num}: OSRM error {data.get('code')}")
-                    break
-
-                durations = data["durations"]  # shape: [src_count x poi_count]
-                for j, row_dur in enumerate(durations):
-                    idx = batch_indices[j]
-                    # Nearest gym: min of first gym_count destinations
-                    gym_times = [row_dur[k] for k in range(gym_count) if row_dur[k] is not None]
-                    if gym_times:
-                        drive_gym[idx] = round(min(gym_times) / 60)
-                    # Office: last destination
-                    if row_dur[-1] is not None:
-                        drive_office[idx] = round(row_dur[-1] / 60)
-                break
-
-            except (requests.RequestException, json.JSONDecodeError) as e:
-                wait = 2 ** (attempt + 1)
-                print(f"  Batch {batch_num} retry {attempt + 1}/3 after {wait}s: {e}")
-                time.sleep(wait)
-
-        if batch_num % 20 == 0 or batch_num == 1:
-            print(f"  Batch {batch_num}/{total_batches}")
-
-        time.sleep(DRIVE_RATE_DELAY)
-
-    merged["driveGym"] = drive_gym
-    merged["driveOffice"] = drive_office
-
-    valid_gym = np.isfinite(drive_gym).sum()
-    valid_office = np.isfinite(drive_office).sum()
-    print(f"  Drive times computed: gym {valid_gym}/{n}, office {valid_office}/{n}")
-    print(f"  Gym range: {np.nanmin(drive_gym):.0f}-{np.nanmax(drive_gym):.0f} min")
-    print(f"  Office range: {np.nanmin(drive_office):.0f}-{np.nanmax(drive_office):.0f} min")
+    cells = routing_cells(merged.iloc[indices_to_process], res)
+    cell_codes, unique_cells = pd.factorize(cells)
+    print(
+        f"\nComputing OSRM drive times ({len(indices_to_process)} sales in "
+        f"{len(unique_cells)} res-{res} cells, {len(categories)} POI categories)..."
+    )
+
+    per_cell = category_drive_times(unique_cells, categories, top_k=top_k, validate=validate)
+
+    # Broadcast per-cell results to sales
+    for col in columns:
+        computed = per_cell[col][cell_codes]
+        values = existing[col].to_numpy(dtype=computed.dtype, copy=True)
+        if only_missing:
+            fill = pd.isna(values[indices_to_process])
+            values[indices_to_process[fill]] = computed[fill]
+        else:
+            values[indices_to_process] = computed
+        merged[col] = values
+
+    for cat in categories:
+        minutes = merged[cat["column"]].to_numpy(dtype=float)
+        valid = np.isfinite(minutes)
+        print(f"  {cat['id']}: {valid.sum()}/{n} sales", end="")
+        if valid.any():
+            print(f", {minutes[valid].min():.0f}-{minutes[valid].max():.0f} min")
+        else:
+            print()
 
     return merged
 
 
-def load_building_data():
-    """Load and deduplicate residential building data (King County only)."""
-    if not os.path.exists(KC_BLDG_CSV):
-        print(f"No building data found at {KC_BLDG_CSV}, skipping enrichment")
-        return None
+def load_routes_cache(path, categories, slot=DEFAULT_SLOT):
+    """Load one departure slot of the Google routes cache as a DataFrame indexed by res-7 hex."""
+    fields = output_fields(categories)
+    return read_routes_cache(path, fields).frame(fields, slot)
+
+
+def load_routes_profile(path, categories):
+    """Drive minutes at every departure slot, as ``<column>_<slot>`` columns by res-7 hex."""
+    profiles = read_routes_cache(path, output_fields(categories))
+    fields = [(cat["column"], "int") for cat in categories]
+    frames = [
+        profiles.frame(fields, slot).add_suffix(f"_{slot}") for slot in SLOTS
+    ]
+    return pd.concat(frames, axis=1)
+
 
+def join_drive_times(merged, cache_df):
+    """Fill the cached drive time columns with one left join on h3_r7.
+
+    Prints hit-rate statistics for both sales and distinct hexes.
+    """
+    merged = merged.drop(columns=list(cache_df.columns), errors="ignore")
+    merged = merged.merge(cache_df, left_on="h3_r7", right_index=True, how="left")
+
+    hit = merged["h3_r7"].isin(cache_df.index)
+    sale_hits = int(hit.sum())
+    hexes = merged["h3_r7"].unique()
+    hex_hits = int(pd.Index(hexes).isin(cache_df.index).sum())
+    n = len(merged)
+    print(f"  Cache hits: {sale_hits}/{n} sales ({sale_hits / max(n, 1) * 100:.1f}%)")
+    print(f"  Hexes covered: {hex_hits}/{len(hexes)} ({hex_hits / max(len(hexes), 1) * 100:.1f}%)")
+    print(f"  Unused cache entries: {len(cache_df) - hex_hits}")
+    incomplete = int((hit & merged[list(cache_df.columns)].isna().any(axis=1)).sum())
+    if incomplete:
+        print(f"  Cached hexes missing a drive time: {incomplete} sales")
+    return merged
+
+
+def read_building_csv(path):
+    """Parse EXTR_ResBldg.csv into the cleaned, one-row-per-PIN building table."""
     bldg = pd.read_csv(
-        KC_BLDG_CSV, dtype={"Major": str, "Minor": str}, encoding="latin-1",
-        low_memory=False,
+        path, dtype={"Major": str, "Minor": str}, encoding="latin-1",
+        usecols=lambda c: c in BLDG_SOURCE_COLUMNS,
     )
     print(f"Building records loaded: {len(bldg)}")
 
@@ -173,7 +210,6 @@ def load_building_data():
     bldg = bldg.sort_values("SqFtTotLiving", ascending=False).drop_duplicates(
         subset="PIN", keep="first"
     )
-    print(f"Unique building PINs: {len(bldg)}")
 
     # Rename to output field names
     bldg = bldg.rename(
@@ -189,18 +225,94 @@ def load_building_data():
         if col in bldg.columns:
             bldg[col] = bldg[col].replace(0, np.nan)
 
+    return bldg.reset_index(drop=True)
+
+
+def cached_building_table(csv_path, cache_path):
+    """Return the cleaned building table, from the Parquet cache when valid.
+
+    The cache records the source CSV's SHA-256 (plus size and mtime, so an
+    untouched file isn't re-hashed) in its schema metadata; any change to
+    the CSV rebuilds it.
+    """
+    stat = os.stat(csv_path)
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if os.path.exists(cache_path):
+        meta = pq.read_schema(cache_path).metadata or {}
+        cached = json.loads(meta.get(b"source", b"{}"))
+        same_file = all(cached.get(k) == v for k, v in source.items())
+        if same_file or cached.get("sha256") == file_sha256(csv_path):
+            print(f"Building table loaded from cache: {cache_path}")
+            return pd.read_parquet(cache_path)
+
+    bldg = read_building_csv(csv_path)
+    source["sha256"] = file_sha256(csv_path)
+    table = pa.Table.from_pandas(bldg, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"source": json.dumps(source).encode()}
+    )
+    tmp_path = cache_path + ".tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, cache_path)
+    print(f"Building table cached to {cache_path}")
+    return bldg
+
+
+def load_building_data():
+    """Load and deduplicate residential building data (King County only)."""
+    if not os.path.exists(KC_BLDG_CSV):
+        print(f"No building data found at {KC_BLDG_CSV}, skipping enrichment")
+        return None
+
+    bldg = cached_building_table(KC_BLDG_CSV, KC_BLDG_CACHE)
+    print(f"Unique building PINs: {len(bldg)}")
     return bldg
 
 
-def load_king_county(bldg):
+def load_county_sales(csv_path, store_county, window, id_col, coords_path):
+    """(sales, coords) from the rolling CSV, or from the sales store for a window.
+
+    `window` is None (use csv_path) or a (since, until) pair of
+    YYYY-MM-DD strings or None, read from the month-partitioned store.
+    Either frame is empty if its file is missing. For a window, prints the
+    share of its sales with coordinates and warns when that is below the
+    rolling CSV's share: parcels sold only outside the rolling window are
+    geocoded by the fetcher's --history mode.
+    """
+    coords = pd.DataFrame()
+    if os.path.exists(coords_path):
+        coords = pd.read_csv(coords_path, dtype={id_col: str})
+    if window is None:
+        if not os.path.exists(csv_path):
+            return pd.DataFrame(), coords
+        return pd.read_csv(csv_path, dtype={id_col: str}), coords
+
+    sales = read_window(store_county, *window)
+    if sales.empty or coords.empty:
+        return sales, coords
+    known = set(coords[id_col])
+    rate = sales[id_col].isin(known).mean()
+    print(f"Window coordinate match rate: {rate*100:.1f}% of {len(sales)} sales")
+    if os.path.exists(csv_path):
+        rolling = pd.read_csv(csv_path, usecols=[id_col], dtype={id_col: str})[id_col]
+        rolling_rate = rolling.isin(known).mean() if len(rolling) else 0.0
+        print(f"Rolling-window coordinate match rate: {rolling_rate*100:.1f}%")
+        if rate < rolling_rate:
+            print(
+                f"WARNING: window match rate is below the rolling window's; "
+                f"run data/{HISTORY_COORDS_SCRIPTS[store_county]} --history "
+                f"to geocode parcels from the sales store"
+            )
+    return sales, coords
+
+
+def load_king_county(bldg, window=None):
     """Load and merge King County sales with coords and building data."""
-    if not os.path.exists(KC_SALES_CSV) or not os.path.exists(KC_COORDS_CSV):
+    sales, coords = load_county_sales(KC_SALES_CSV, "king", window, "PIN", KC_COORDS_CSV)
+    if sales.empty or coords.empty:
         print("King County data not found, skipping")
         return pd.DataFrame()
 
-    sales = pd.read_csv(KC_SALES_CSV, dtype={"PIN": str})
-    coords = pd.read_csv(KC_COORDS_CSV, dtype={"PIN": str})
-
     print(f"\n--- King County ---")
     print(f"Sales records: {len(sales)}")
     print(f"Parcel coordinates: {len(coords)}")
@@ -218,18 +330,18 @@ def load_king_county(bldg):
     return merged
 
 
-def load_snohomish_county():
+def load_snohomish_county(window=None):
     """Load and merge Snohomish County sales with coords.
 
     Building data comes from the sales CSV itself (no separate join needed).
     """
-    if not os.path.exists(SN_SALES_CSV) or not os.path.exists(SN_COORDS_CSV):
+    sales, coords = load_county_sales(
+        SN_SALES_CSV, "snohomish", window, "PARCEL_ID", SN_COORDS_CSV
+    )
+    if sales.empty or coords.empty:
         print("Snohomish County data not found, skipping")
         return pd.DataFrame()
 
-    sales = pd.read_csv(SN_SALES_CSV, dtype={"PARCEL_ID": str})
-    coords = pd.read_csv(SN_COORDS_CSV, dtype={"PARCEL_ID": str})
-
     print(f"\n--- Snohomish County ---")
     print(f"Sales records: {len(sales)}")
     print(f"Parcel coordinates: {len(coords)}")
@@ -243,96 +355,163 @@ def load_snohomish_county():
     return merged
 
 
-def main():
-    bldg = load_building_data()
+def date_arg(value):
+    """argparse type for YYYY-MM-DD dates, kept as the normalized string."""
+    try:
+        return pd.Timestamp(value).strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date: {value!r}")
 
-    kc = load_king_county(bldg)
-    sn = load_snohomish_county()
 
-    # Ensure both DataFrames have the same building columns
-    for col in ["beds", "baths", "sqft", "yrBuilt"]:
-        if col not in kc.columns:
-            kc[col] = np.nan
-        if col not in sn.columns:
-            sn[col] = np.nan
-
-    merged = pd.concat([kc, sn], ignore_index=True)
-    print(f"\n--- Combined ---")
-    print(f"Total sales: {len(merged)}")
-    for county in merged["county"].unique():
-        count = (merged["county"] == county).sum()
-        print(f"  {county}: {count}")
-
-    merged = merged.sort_values("date", ascending=False)
-
-    # Geo bounds filter -- widened to include Snohomish County
-    merged = merged[
-        (merged["lat"] >= 47.0)
-        & (merged["lat"] <= 48.35)
-        & (merged["lng"] >= -122.6)
-        & (merged["lng"] <= -121.5)
-    ]
-    print(f"After geo bounds filter: {len(merged)}")
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--binary", action="store_true",
+        help="also write the columnar sales_data.bin artifact",
+    )
+    parser.add_argument(
+        "--shards", action="store_true",
+        help="also write sales partitioned by H3 parent cell, plus a manifest, to public/shards",
+    )
+    parser.add_argument(
+        "--shard-res", type=int, choices=(5, 6), default=SHARD_RES,
+        help="H3 resolution of the shard cells",
+    )
+    parser.add_argument(
+        "--since", type=date_arg,
+        help="export sales from this date (YYYY-MM-DD) out of the historical sales store "
+        "(see fetch_sales.py --history) instead of the rolling 365-day CSVs",
+    )
+    parser.add_argument(
+        "--until", type=date_arg,
+        help="last sale date (YYYY-MM-DD) to export from the historical sales store",
+    )
+    parser.add_argument(
+        "--top-k", type=int, default=TOP_K_NEAREST,
+        help="route each cell only to the K straight-line-nearest POIs of each nearest "
+        "category (0 = all)",
+    )
+    parser.add_argument(
+        "--validate-top-k", action="store_true",
+        help="route every POI and report how often the top-K pre-filter misses the fastest",
+    )
+    parser.add_argument(
+        "--slot", choices=list(SLOTS), default=DEFAULT_SLOT,
+        help="departure slot of the Google routes cache used for the drive time columns",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="also emit every slot's drive minutes as <column>_<slot> fields",
+    )
+    parser.add_argument(
+        "--report", default=RUN_REPORT_JSON,
+        help="where to write the per-stage run report (also appended to raw/process_reports.jsonl)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = RunReport("process_data")
+    categories = load_registry()
+    with report.stage("load_building_data") as stage:
+        bldg = load_building_data()
+        stage["rows"] = 0 if bldg is None else len(bldg)
+
+    window = None
+    if args.since or args.until:
+        window = (args.since, args.until)
+        print(f"Historical window: {args.since or 'start'} to {args.until or 'latest'} (sales store)")
+    with report.stage("load_king_county") as stage:
+        kc = load_king_county(bldg, window)
+        stage["rows"] = len(kc)
+    with report.stage("load_snohomish_county") as stage:
+        sn = load_snohomish_county(window)
+        stage["rows"] = len(sn)
+
+    with report.stage("combine") as stage:
+        # Ensure both DataFrames have the same building columns
+        for col in ["beds", "baths", "sqft", "yrBuilt"]:
+            if col not in kc.columns:
+                kc[col] = np.nan
+            if col not in sn.columns:
+                sn[col] = np.nan
+
+        merged = pd.concat([kc, sn], ignore_index=True)
+        print(f"\n--- Combined ---")
+        print(f"Total sales: {len(merged)}")
+        for county in merged["county"].unique():
+            count = (merged["county"] == county).sum()
+            print(f"  {county}: {count}")
+
+        merged = merged.sort_values("date", ascending=False)
+
+        # Geo bounds filter -- widened to include Snohomish County
+        merged = merged[
+            (merged["lat"] >= 47.0)
+            & (merged["lat"] <= 48.35)
+            & (merged["lng"] >= -122.6)
+            & (merged["lng"] <= -121.5)
+        ]
+        print(f"After geo bounds filter: {len(merged)}")
+        stage["rows"] = len(merged)
 
     # Assign H3 hex IDs
-    print("\nAssigning H3 hex IDs...")
-    merged["h3"] = merged.apply(
-        lambda r: h3.latlng_to_cell(r["lat"], r["lng"], 8), axis=1
-    )
-    merged["h3_r7"] = merged["h3"].apply(lambda c: h3.cell_to_parent(c, 7))
-    n_hex8 = merged["h3"].nunique()
-    n_hex7 = merged["h3_r7"].nunique()
-    print(f"  Res-8 hexes: {n_hex8}")
-    print(f"  Res-7 hexes (routing): {n_hex7}")
-
-    # Write routing centroids for Google Maps API script
-    routing_centroids = {}
-    for hex7 in merged["h3_r7"].unique():
-        lat, lng = h3.cell_to_latlng(hex7)
-        routing_centroids[hex7] = {"lat": round(lat, 6), "lng": round(lng, 6)}
-    centroids_path = os.path.join(RAW_DIR, "routing_centroids.json")
-    with open(centroids_path, "w") as f:
-        json.dump(routing_centroids, f)
-    print(f"  Routing centroids written to {centroids_path}")
+    with report.stage("h3") as stage:
+        print("\nAssigning H3 hex IDs...")
+        cells, parents = assign_cells(merged["lat"].values, merged["lng"].values)
+        merged["h3"] = cells
+        merged["h3_r7"] = parents
+        n_hex8 = merged["h3"].nunique()
+        n_hex7 = merged["h3_r7"].nunique()
+        print(f"  Res-8 hexes: {n_hex8}")
+        print(f"  Res-7 hexes (routing): {n_hex7}")
+
+        # Write routing centroids for Google Maps API script
+        routing_centroids = {}
+        for hex7 in merged["h3_r7"].unique():
+            lat, lng = h3.cell_to_latlng(hex7)
+            routing_centroids[hex7] = {"lat": round(lat, 6), "lng": round(lng, 6)}
+        centroids_path = os.path.join(RAW_DIR, "routing_centroids.json")
+        with open(centroids_path, "w") as f:
+            json.dump(routing_centroids, f)
+        print(f"  Routing centroids written to {centroids_path}")
+        stage.update(rows=len(merged), hexes_r8=int(n_hex8), hexes_r7=int(n_hex7))
 
     # Load Google Maps drive times if available, otherwise fall back to OSRM
-    google_cache_path = os.path.join(RAW_DIR, "google_routes_cache.json")
-    if os.path.exists(google_cache_path):
-        print("\nLoading Google Maps drive times from cache...")
-        with open(google_cache_path) as f:
-            google_cache = json.load(f)
-        print(f"  Cache entries: {len(google_cache)}")
-
-        drive_gym = []
-        drive_office = []
-        nearest_gym_name = []
-        cache_hits = 0
-        for _, row in merged.iterrows():
-            hex7 = row["h3_r7"]
-            if hex7 in google_cache:
-                cache_hits += 1
-                entry = google_cache[hex7]
-                drive_office.append(entry.get("officeMinutes"))
-                drive_gym.append(entry.get("nearestGymMinutes"))
-                nearest_gym_name.append(entry.get("nearestGymName"))
-            else:
-                drive_office.append(None)
-                drive_gym.append(None)
-                nearest_gym_name.append(None)
-
-        merged["driveGym"] = drive_gym
-        merged["driveOffice"] = drive_office
-        merged["nearestGymName"] = nearest_gym_name
-        print(f"  Cache hits: {cache_hits}/{len(merged)} sales")
-
-        # Fall back to OSRM for any missing
-        missing = merged["driveGym"].isna().sum()
-        if missing > 0:
-            print(f"  {missing} sales missing Google Maps data, computing OSRM fallback...")
-            merged = compute_drive_times(merged, only_missing=True)
-    else:
-        print("\nNo Google Maps cache found, computing OSRM drive times...")
-        merged = compute_drive_times(merged)
+    with report.stage("routing") as stage:
+        google_cache_path = os.path.join(RAW_DIR, "google_routes_cache.npz")
+        drive_fields = output_fields(categories)
+        if routes_cache_exists(google_cache_path):
+            stage["source"] = "google"
+            print(f"\nLoading Google Maps drive times from cache ({args.slot})...")
+            cache_df = load_routes_cache(google_cache_path, categories, args.slot)
+            print(f"  Cache entries: {len(cache_df)}")
+            merged = join_drive_times(merged, cache_df)
+
+            if args.profile:
+                profile_df = load_routes_profile(google_cache_path, categories)
+                merged = merged.drop(columns=list(profile_df.columns), errors="ignore")
+                merged = merged.merge(profile_df, left_on="h3_r7", right_index=True, how="left")
+                drive_fields = drive_fields + [(col, "int") for col in profile_df.columns]
+                print(f"  Profile columns: {len(profile_df.columns)} ({len(SLOTS)} slots)")
+
+            # Fall back to OSRM for any missing
+            minute_columns = [cat["column"] for cat in categories]
+            missing = merged[minute_columns].isna().any(axis=1).sum()
+            if missing > 0:
+                print(f"  {missing} sales missing Google Maps data, computing OSRM fallback...")
+                stage["osrm_fallback_rows"] = int(missing)
+                merged = compute_drive_times(
+                    merged, categories, only_missing=True, top_k=args.top_k, validate=args.validate_top_k
+                )
+        else:
+            stage["source"] = "osrm"
+            print("\nNo Google Maps cache found, computing OSRM drive times...")
+            merged = compute_drive_times(
+                merged, categories, top_k=args.top_k, validate=args.validate_top_k
+            )
+        stage["rows"] = len(merged)
 
     percentiles = [0, 20, 40, 60, 80, 100]
     breakpoints = np.percentile(merged["price"], percentiles).tolist()
@@ -345,65 +524,63 @@ def main():
         "mean": int(merged["price"].mean()),
         "percentiles": {str(p): int(v) for p, v in zip(percentiles, breakpoints)},
     }
+    if window is not None:
+        stats["window"] = {"since": merged["date"].min(), "until": merged["date"].max()}
 
     # Add filter ranges for the frontend
-    has_bldg = merged["sqft"].notna()
-    if has_bldg.any():
-        stats["filterRanges"] = {
-            "price": {"min": int(merged["price"].min()), "max": int(merged["price"].max())},
-            "sqft": {
-                "min": int(merged.loc[has_bldg, "sqft"].min()),
-                "max": int(merged.loc[has_bldg, "sqft"].max()),
-            },
-            "yrBuilt": {
-                "min": int(merged.loc[has_bldg, "yrBuilt"].min()),
-                "max": int(merged.loc[has_bldg, "yrBuilt"].max()),
-            },
-            "beds": {"max": int(merged.loc[has_bldg, "beds"].max())},
-            "driveGym": {"max": int(merged["driveGym"].max())},
-            "driveOffice": {"max": int(merged["driveOffice"].max())},
-        }
-
-    sales_list = []
-    for _, row in merged.iterrows():
-        sale = {
-            "lat": round(row["lat"], 6),
-            "lng": round(row["lng"], 6),
-            "price": int(row["price"]),
-            "date": row["date"],
-            "county": row["county"],
-            "h3": row["h3"],
-        }
-        # Add building fields if available
-        for field in ["beds", "baths", "sqft", "yrBuilt"]:
-            if field in row.index and pd.notna(row[field]):
-                val = row[field]
-                sale[field] = round(val, 1) if field == "baths" else int(val)
-        # Add drive times
-        if pd.notna(row.get("driveGym")):
-            sale["driveGym"] = int(row["driveGym"])
-        if pd.notna(row.get("driveOffice")):
-            sale["driveOffice"] = int(row["driveOffice"])
-        if pd.notna(row.get("nearestGymName")):
-            sale["nearestGymName"] = row["nearestGymName"]
-        sales_list.append(sale)
-
-    output = {
-        "generated": pd.Timestamp.now().strftime("%Y-%m-%d"),
-        "stats": stats,
-        "sales": sales_list,
-    }
+    drive_columns = [cat["column"] for cat in categories]
+    ranges = filter_ranges(merged, drive_columns)
+    if ranges:
+        stats["filterRanges"] = ranges
 
     os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
 
-    with open(OUTPUT_JSON, "w") as f:
-        json.dump(output, f)
+    generated = pd.Timestamp.now().strftime("%Y-%m-%d")
+    with report.stage("write_sales_json") as stage:
+        write_sales_json(merged, OUTPUT_JSON, generated, stats, extra_fields=drive_fields)
+        stage.update(rows=len(merged), bytes=os.path.getsize(OUTPUT_JSON))
+    if args.binary:
+        with report.stage("write_sales_bin") as stage:
+            write_sales_bin(merged, OUTPUT_BIN, generated, stats, extra_fields=drive_fields)
+            stage.update(rows=len(merged), bytes=os.path.getsize(OUTPUT_BIN))
+    with report.stage("write_hex_summaries") as stage:
+        summary_paths = write_hex_summaries(
+            merged, HEX_SUMMARY_JSON, generated, extra_fields=drive_fields
+        )
+        stage.update(rows=len(merged), bytes=sum(os.path.getsize(p) for p in summary_paths))
+    with report.stage("write_price_sketches") as stage:
+        sketches = write_price_sketches(merged, PRICE_SKETCH_JSON, generated)
+        stage.update(rows=len(sketches), bytes=os.path.getsize(PRICE_SKETCH_JSON))
+    if args.shards:
+        with report.stage("write_sales_shards") as stage:
+            manifest = write_sales_shards(
+                merged, SHARD_DIR, generated, stats, res=args.shard_res,
+                extra_fields=drive_fields, drive_columns=drive_columns, binary=args.binary,
+            )
+            stage.update(rows=len(merged), bytes=sum(s["bytes"] for s in manifest["shards"]))
 
     file_size = os.path.getsize(OUTPUT_JSON) / 1024 / 1024
     print(f"\nOutput: {OUTPUT_JSON}")
     print(f"File size: {file_size:.1f} MB")
+    if args.binary:
+        bin_size = os.path.getsize(OUTPUT_BIN) / 1024 / 1024
+        print(f"Binary output: {OUTPUT_BIN} ({bin_size:.1f} MB)")
+    for path in summary_paths:
+        print(f"Hex summary: {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    if args.shards:
+        sizes = [s["bytes"] for s in manifest["shards"]]
+        print(
+            f"Shards: {len(sizes)} res-{args.shard_res} files in {SHARD_DIR} "
+            f"({min(sizes) / 1024:.0f}-{max(sizes) / 1024:.0f} KB)"
+        )
+    sketch_size = os.path.getsize(PRICE_SKETCH_JSON) / 1024
+    print(f"Price sketches: {PRICE_SKETCH_JSON} ({len(sketches)} hex-months, {sketch_size:.0f} KB)")
     print(f"Stats: {json.dumps(stats, indent=2)}")
 
+    report.print_summary()
+    report.write(args.report, RUN_REPORT_HISTORY)
+    print(f"Run report: {args.report}")
+
 
 if __name__ == "__main__":
     main()
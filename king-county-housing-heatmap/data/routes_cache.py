@@ -0,0 +1,333 @@
+"""Time-of-day drive-time profiles per res-7 hex (the Google routes cache).
+
+Every hex can be routed at several departure slots (SLOTS: weekday AM and
+PM peaks, weekday midday, weekend). The compacted snapshot
+(``google_routes_cache.npz``) is array-backed: the hex ids, the slot ids
+and, per registry column, one [hexes x slots] array -- uint16 minutes for
+drive-time columns, int32 codes into a per-column vocabulary for POI name
+columns. About 1,000 hexes x 4 slots x 3 columns compress to under 10 KB.
+
+Writes go to a JSONL journal next to the snapshot, one append per routed
+batch (``{"hex", "slot", **fields}``). Loading replays the journal over the
+snapshot and compact() folds it back in (atomic rename) and truncates it.
+A partial last journal line from an interrupted run is ignored by readers
+and cut off when RoutesCache reopens the journal for appending. Journal
+lines without a slot, and the pre-profile JSON snapshot
+(``google_routes_cache.json``, read when no .npz exists yet), belong to
+DEFAULT_SLOT.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from poi_registry import normalize_routes_entry
+
+# Departure slots: id -> (weekday, hour) in Pacific time, Monday = 0
+SLOTS = {
+    "weekday_am": (1, 8),  # Tuesday 8 AM, the original single departure time
+    "weekday_midday": (1, 12),
+    "weekday_pm": (1, 17),
+    "weekend": (5, 11),  # Saturday 11 AM
+}
+DEFAULT_SLOT = "weekday_am"
+
+MINUTES_MISSING = 0xFFFF  # slot not routed yet
+MINUTES_UNROUTABLE = 0xFFFE  # routed, but no route found
+MINUTES_MAX = 0xFFFD
+NAME_MISSING = -1
+
+COMPACT_MIN_LINES = 5000  # compact once the journal has this many lines...
+COMPACT_RATIO = 0.5  # ...and at least this fraction of the snapshot's hexes
+
+
+def journal_path(path):
+    return os.path.splitext(path)[0] + ".jsonl"
+
+
+def legacy_json_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def routes_cache_exists(path):
+    """Whether any part of the routes cache (snapshot, journal, legacy JSON) exists."""
+    return any(os.path.exists(p) for p in (path, journal_path(path), legacy_json_path(path)))
+
+
+class RouteProfiles:
+    """Per-hex, per-slot drive times held in growable [hexes x slots] arrays.
+
+    `kinds` maps column -> "int" (minutes) or "str" (POI name), typically
+    dict(output_fields(categories)); columns not listed are inferred from
+    the first value stored.
+    """
+
+    def __init__(self, hexes=(), slots=tuple(SLOTS), kinds=None):
+        self.hexes = list(hexes)
+        self.index = {h: i for i, h in enumerate(self.hexes)}
+        self.slots = list(slots)
+        self.slot_index = {s: i for i, s in enumerate(self.slots)}
+        self.kinds = dict(kinds or {})
+        self.minutes = {}  # column -> uint16 [capacity x slots]
+        self.names = {}  # column -> int32 [capacity x slots]
+        self.vocab = {}  # column -> list of names
+        self.vocab_index = {}
+        self._capacity = len(self.hexes)
+
+    def __len__(self):
+        return len(self.hexes)
+
+    @classmethod
+    def load(cls, path, kinds=None):
+        """Read a snapshot written by save()."""
+        with np.load(path) as data:
+            profiles = cls(data["hexes"].tolist(), data["slots"].tolist(), kinds)
+            for key in data.files:
+                prefix, _, column = key.partition(".")
+                if prefix == "minutes":
+                    profiles.minutes[column] = data[key]
+                elif prefix == "names":
+                    profiles.names[column] = data[key]
+                elif prefix == "vocab":
+                    profiles.vocab[column] = data[key].tolist()
+        for column, names in profiles.vocab.items():
+            profiles.vocab_index[column] = {name: i for i, name in enumerate(names)}
+        for slot in SLOTS:
+            profiles._slot_col(slot)
+        return profiles
+
+    def save(self, path):
+        """Write the arrays to `path` (.npz) atomically."""
+        n = len(self.hexes)
+        arrays = {
+            "hexes": np.array(self.hexes, dtype=str),
+            "slots": np.array(self.slots, dtype=str),
+        }
+        for column, values in self.minutes.items():
+            arrays[f"minutes.{column}"] = values[:n]
+        for column, codes in self.names.items():
+            arrays[f"names.{column}"] = codes[:n]
+            arrays[f"vocab.{column}"] = np.array(self.vocab[column], dtype=str)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def _row(self, hex_id):
+        row = self.index.get(hex_id)
+        if row is None:
+            row = len(self.hexes)
+            if row == self._capacity:
+                self._resize(max(64, 2 * self._capacity), len(self.slots))
+            self.hexes.append(hex_id)
+            self.index[hex_id] = row
+        return row
+
+    def _slot_col(self, slot):
+        col = self.slot_index.get(slot)
+        if col is None:
+            col = len(self.slots)
+            self._resize(self._capacity, col + 1)
+            self.slots.append(slot)
+            self.slot_index[slot] = col
+        return col
+
+    def _resize(self, capacity, n_slots):
+        for arrays, fill in ((self.minutes, MINUTES_MISSING), (self.names, NAME_MISSING)):
+            for column, values in arrays.items():
+                grown = np.full((capacity, n_slots), fill, dtype=values.dtype)
+                grown[: len(values), : values.shape[1]] = values
+                arrays[column] = grown
+        self._capacity = capacity
+
+    def _column(self, column, value):
+        """The minutes or names array for `column`, created on first use."""
+        if column in self.minutes:
+            return self.minutes[column]
+        if column in self.names:
+            return self.names[column]
+        kind = self.kinds.get(column, "str" if isinstance(value, str) else "int")
+        shape = (self._capacity, len(self.slots))
+        if kind == "str":
+            self.names[column] = np.full(shape, NAME_MISSING, dtype=np.int32)
+            self.vocab[column] = []
+            self.vocab_index[column] = {}
+            return self.names[column]
+        self.minutes[column] = np.full(shape, MINUTES_MISSING, dtype=np.uint16)
+        return self.minutes[column]
+
+    def set(self, hex_id, slot, fields):
+        """Store {column: minutes or name} for one hex at one slot (None = unroutable)."""
+        row, col = self._row(hex_id), self._slot_col(slot)
+        for column, value in fields.items():
+            values = self._column(column, value)
+            if column in self.names:
+                if value is not None:
+                    index = self.vocab_index[column]
+                    if value not in index:
+                        index[value] = len(self.vocab[column])
+                        self.vocab[column].append(value)
+                    values[row, col] = index[value]
+            else:
+                values[row, col] = MINUTES_UNROUTABLE if value is None else min(int(value), MINUTES_MAX)
+
+    def get(self, hex_id, slot=DEFAULT_SLOT):
+        """{column: minutes (None = unroutable) or name} routed for a hex at a slot."""
+        row, col = self.index.get(hex_id), self.slot_index.get(slot)
+        if row is None or col is None:
+            return {}
+        entry = {}
+        for column, values in self.minutes.items():
+            value = int(values[row, col])
+            if value != MINUTES_MISSING:
+                entry[column] = None if value == MINUTES_UNROUTABLE else value
+        for column, codes in self.names.items():
+            code = codes[row, col]
+            if code != NAME_MISSING:
+                entry[column] = self.vocab[column][code]
+        return entry
+
+    def routed(self, hex_ids, column, slot=DEFAULT_SLOT):
+        """Boolean mask of which hex_ids already have `column` at `slot`."""
+        values = self.minutes.get(column)
+        col = self.slot_index.get(slot)
+        if values is None or col is None:
+            return np.zeros(len(hex_ids), dtype=bool)
+        rows = np.array([self.index.get(h, -1) for h in hex_ids], dtype=np.int64)
+        known = rows >= 0
+        out = np.zeros(len(hex_ids), dtype=bool)
+        out[known] = values[rows[known], col] != MINUTES_MISSING
+        return out
+
+    def frame(self, fields, slot=DEFAULT_SLOT):
+        """DataFrame of (field, kind) columns at `slot`, indexed by res-7 hex.
+
+        Minutes are floats with NaN where not routed or unroutable; names
+        are None where unknown. Hexes never routed at `slot` are left out.
+        """
+        n = len(self.hexes)
+        col = self._slot_col(slot)
+        data = {}
+        for column, _ in fields:
+            if column in self.minutes:
+                values = self.minutes[column][:n, col].astype(np.float64)
+                values[values >= MINUTES_UNROUTABLE] = np.nan
+                data[column] = values
+            elif column in self.names:
+                names = np.array(self.vocab[column] + [None], dtype=object)
+                data[column] = names[self.names[column][:n, col]]
+            else:
+                data[column] = np.full(n, np.nan)
+        df = pd.DataFrame(data, index=pd.Index(self.hexes, name="h3_r7"))
+        any_routed = np.zeros(n, dtype=bool)
+        for values in self.minutes.values():
+            any_routed |= values[:n, col] != MINUTES_MISSING
+        return df[any_routed]
+
+
+def read_routes_cache(path, fields=()):
+    """Return RouteProfiles from the snapshot at `path` plus its journal."""
+    kinds = dict(fields)
+    if os.path.exists(path):
+        profiles = RouteProfiles.load(path, kinds)
+    else:
+        profiles = RouteProfiles(kinds=kinds)
+        legacy = legacy_json_path(path)
+        if os.path.exists(legacy):
+            with open(legacy) as f:
+                for hex_id, entry in json.load(f).items():
+                    profiles.set(hex_id, DEFAULT_SLOT, normalize_routes_entry(entry))
+    jpath = journal_path(path)
+    if os.path.exists(jpath):
+        with open(jpath) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # partial last line from an interrupted write
+                hex_id = record.pop("hex")
+                slot = record.pop("slot", DEFAULT_SLOT)
+                profiles.set(hex_id, slot, normalize_routes_entry(record))
+    return profiles
+
+
+def trim_journal(jpath):
+    """Cut a partial last line off the journal; return its complete line count.
+
+    Otherwise the next append would be joined onto the fragment, and that
+    line and everything after it would be dropped on reload.
+    """
+    if not os.path.exists(jpath):
+        return 0
+    lines = complete = 0
+    with open(jpath, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except json.JSONDecodeError:
+                break
+            lines += 1
+            complete += len(line)
+    if complete < os.path.getsize(jpath):
+        with open(jpath, "r+b") as f:
+            f.truncate(complete)
+    return lines
+
+
+class RoutesCache:
+    """Routes cache profiles with journaled, batched writes."""
+
+    def __init__(self, path, fields=()):
+        self.path = path
+        self.journal_path = journal_path(path)
+        self.journal_lines = trim_journal(self.journal_path)
+        self.profiles = read_routes_cache(path, fields)
+        self.snapshot_size = len(self.profiles)
+        self._journal = open(self.journal_path, "a")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def get(self, hex_id, slot=DEFAULT_SLOT):
+        return self.profiles.get(hex_id, slot)
+
+    def routed(self, hex_ids, column, slot=DEFAULT_SLOT):
+        return self.profiles.routed(hex_ids, column, slot)
+
+    def append(self, updates, slot=DEFAULT_SLOT):
+        """Merge {hex: fields} at `slot` into the cache and journal them in one write."""
+        lines = []
+        for hex_id, fields in updates.items():
+            self.profiles.set(hex_id, slot, fields)
+            lines.append(json.dumps({"hex": hex_id, "slot": slot, **fields}) + "\n")
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        self.journal_lines += len(lines)
+
+    def maybe_compact(self):
+        """Compact once the journal is large relative to the snapshot."""
+        if self.journal_lines >= max(COMPACT_MIN_LINES, COMPACT_RATIO * self.snapshot_size):
+            self.compact()
+
+    def compact(self):
+        """Write the profiles to the snapshot and truncate the journal."""
+        self.profiles.save(self.path)
+        self._journal.close()
+        self._journal = open(self.journal_path, "w")
+        self.snapshot_size = len(self.profiles)
+        self.journal_lines = 0
+
+    def close(self):
+        if self.journal_lines:
+            self.compact()
+        self._journal.close()
@@ -0,0 +1,146 @@
+"""OSRM drive times from H3 cells to every POI category in the registry.
+
+All categories are routed together: their POIs form the destination
+columns of one [cells x POIs] duration matrix, filled from the per-POI
+SQLite cache (drive_cache) and topped up with OSRM table requests for the
+missing pairs only. A newly added category or POI therefore costs just its
+own columns. The matrix is then reduced per category (see poi_registry):
+the fastest POI for ``nearest`` categories, the single POI for
+``destination`` ones.
+"""
+
+import os
+from contextlib import nullcontext
+
+import numpy as np
+
+from drive_cache import DriveTimeCache
+from h3_index import cell_centroids
+from osrm_client import OSRMTableClient
+from poi_filter import TOP_K_NEAREST, print_top_k_report
+from poi_registry import category_minutes, route_candidates
+
+DRIVE_BATCH_SIZE = 100  # routing cells per OSRM table request
+DRIVE_BATCH_ELEMENTS = 1000  # cells x POIs per request when packing small groups
+OSRM_CACHE_DB = os.path.join(os.path.dirname(__file__), "raw", "osrm_cache.sqlite")
+
+
+def plan_route_batches(missing, batch_size=DRIVE_BATCH_SIZE, max_elements=DRIVE_BATCH_ELEMENTS):
+    """Split the cell-POI pairs to route into one plan of OSRM table batches.
+
+    `missing` is a boolean [cells x pois] mask. Cells missing the same POIs
+    (the same top-k candidate set, or a new POI column) are grouped and
+    each group is cut into full batches of batch_size cells. The partial
+    batches left over -- with the top-k pre-filter, many small groups --
+    are then packed together (largest first) and routed to the union of
+    their POIs while that stays within max_elements, trading a few unneeded
+    elements for far fewer requests. Returns a list of (rows, cols) index
+    arrays covering every missing pair.
+    """
+    patterns, pattern_idx = np.unique(missing, axis=0, return_inverse=True)
+    pattern_idx = pattern_idx.reshape(-1)
+    batches, partial = [], []
+    for i, pattern in enumerate(patterns):
+        if not pattern.any():
+            continue
+        rows = np.flatnonzero(pattern_idx == i)
+        full = len(rows) - len(rows) % batch_size
+        for b in range(0, full, batch_size):
+            batches.append((rows[b : b + batch_size], np.flatnonzero(pattern)))
+        if full < len(rows):
+            partial.append((rows[full:], pattern))
+
+    packed = []  # [row arrays, union of POI columns]
+    for rows, pattern in sorted(partial, key=lambda group: -len(group[0])):
+        for pack in packed:
+            n_rows = sum(len(r) for r in pack[0]) + len(rows)
+            if n_rows <= batch_size and n_rows * (pack[1] | pattern).sum() <= max_elements:
+                pack[0].append(rows)
+                pack[1] = pack[1] | pattern
+                break
+        else:
+            packed.append([[rows], pattern])
+    batches += [(np.concatenate(rows), np.flatnonzero(cols)) for rows, cols in packed]
+    return batches
+
+
+def route_batches(cells, pois, batches, client):
+    """Route each (rows, cols) batch: cells[rows] to pois[cols] via OSRM.
+
+    Every batch goes through one table_many call on `client`, so all of
+    them share its rate limit and in-flight bound. Yields (rows, cols,
+    durations) as batches succeed, durations being a [rows x cols] float
+    array of seconds (NaN where unroutable); failed batches are skipped.
+    """
+    lats, lngs = cell_centroids(cells)
+    table_batches = [
+        (list(zip(lats[rows], lngs[rows])), [(pois[c]["lat"], pois[c]["lng"]) for c in cols])
+        for rows, cols in batches
+    ]
+    print(f"  {client.base_url} ({client.max_in_flight} in flight, {client.bucket.rate:g} req/s)")
+    for done, (i, durations) in enumerate(client.table_many(table_batches), 1):
+        if done % 20 == 0 or done == 1:
+            print(f"  Batch {done}/{len(batches)}")
+        if durations is not None:
+            rows, cols = batches[i]
+            # None (unroutable) becomes NaN
+            yield rows, cols, np.array(durations, dtype=np.float64)
+
+
+def cached_route_cells(cells, pois, cache_path=OSRM_CACHE_DB, wanted=None, client=None):
+    """Durations from `cells` to `pois`, routing only pairs missing from the cache.
+
+    If given, the boolean [cells x pois] `wanted` mask limits routing to
+    those pairs (cached values are still returned). Requests go through
+    `client`, or a new OSRMTableClient if None.
+    """
+    with DriveTimeCache(cache_path) as cache:
+        durations, known = cache.lookup(cells, pois)
+        if wanted is not None:
+            known = known | ~wanted
+        n_missing = int((~known).sum())
+        print(f"  Cache: {known.all(axis=1).sum()}/{len(cells)} cells complete, {n_missing} cell-POI pairs to route")
+        if n_missing == 0:
+            return durations
+
+        batches = plan_route_batches(~known)
+        n_cells = int((~known).any(axis=1).sum())
+        print(f"  Routing {n_cells} cells in {len(batches)} batches...")
+        with nullcontext(client) if client is not None else OSRMTableClient() as client:
+            for rows, cols, batch_dur in route_batches(cells, pois, batches, client):
+                durations[np.ix_(rows, cols)] = batch_dur
+                cache.store(cells[rows], [pois[c] for c in cols], batch_dur)
+
+    return durations
+
+
+def category_drive_times(
+    cells, categories, top_k=TOP_K_NEAREST, validate=False, cache_path=OSRM_CACHE_DB, client=None
+):
+    """Drive times from each cell to every registry category.
+
+    Returns {column: per-cell array}: minutes (float, NaN where unroutable)
+    under each category's ``column`` and, for nearest categories with a
+    ``nameColumn``, the fastest POI's name (None where unroutable).
+    Nearest categories are routed only to each cell's top_k
+    straight-line-nearest POIs; validate=True routes all of them and
+    reports how often the pre-filter would have missed the fastest.
+    All requests share one OSRM client (`client`, or a new one).
+    """
+    lats, lngs = cell_centroids(cells)
+    pois, category_cols, candidates = route_candidates(categories, lats, lngs, top_k)
+    wanted = np.zeros((len(cells), len(pois)), dtype=bool)
+    for cols, mask in zip(category_cols, candidates):
+        wanted[:, cols] |= np.ones_like(mask) if validate else mask
+
+    durations = cached_route_cells(cells, pois, cache_path, wanted=wanted, client=client)
+
+    out = {}
+    for cat, cols, mask in zip(categories, category_cols, candidates):
+        cat_dur = durations[:, cols]
+        if not validate:
+            cat_dur = np.where(mask, cat_dur, np.nan)
+        elif cat["kind"] == "nearest":
+            print_top_k_report(cat_dur, mask, top_k, label=cat["id"])
+        out.update(category_minutes(cat, cat_dur))
+    return out
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Run the data scripts as one pipeline, skipping steps that are up to date.
+
+Each step in STEPS names the script it runs, the steps it must follow and
+the files it reads and writes (relative to data/). Before a step runs, its
+key is computed from the SHA-256 of its inputs, its arguments and the
+source of the script plus every data/ module it imports. If that key
+matches the last successful run in raw/pipeline_state.json and the
+outputs still exist, the step is skipped. Steps whose predecessors are
+done run in parallel, so the King and Snohomish fetch chains overlap.
+
+Fetch steps marked "network" read remote sources and always run. Their
+conditional downloads (see downloads) make that cheap when nothing
+changed, and their outputs' hashes decide whether later steps rerun.
+
+--google adds the Google Maps routing step before process_data. It
+routes the centroids written by the previous process_data run.
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from downloads import file_sha256
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(DATA_DIR, "raw", "pipeline_state.json")
+MAX_PARALLEL = 4
+
+STEPS = [
+    {
+        "name": "sales_king",
+        "script": "fetch_sales.py",
+        "network": True,
+        "outputs": ["raw/filtered_sales.csv"],
+    },
+    {
+        "name": "buildings_king",
+        "script": "fetch_buildings.py",
+        "network": True,
+        "outputs": ["raw/EXTR_ResBldg.csv"],
+    },
+    {
+        "name": "parcels_king",
+        "script": "fetch_parcels.py",
+        "after": ["sales_king"],
+        "inputs": ["raw/filtered_sales.csv"],
+        "outputs": ["raw/parcel_coords.csv"],
+    },
+    {
+        "name": "sales_snohomish",
+        "script": "fetch_sales_snohomish.py",
+        "network": True,
+        "outputs": ["raw/filtered_sales_snohomish.csv"],
+    },
+    {
+        "name": "coords_snohomish",
+        "script": "fetch_coords_snohomish.py",
+        "after": ["sales_snohomish"],
+        "inputs": ["raw/filtered_sales_snohomish.csv"],
+        "outputs": ["raw/parcel_coords_snohomish.csv"],
+    },
+    {
+        "name": "google_routes",
+        "script": "fetch_google_routes.py",
+        "network": True,
+        "optional": True,
+        "inputs": ["raw/routing_centroids.json", "../frontend/src/data/pois.json"],
+        "outputs": ["raw/google_routes_cache.npz"],
+    },
+    {
+        "name": "process",
+        "script": "process_data.py",
+        "after": ["parcels_king", "buildings_king", "coords_snohomish", "google_routes"],
+        "inputs": [
+            "raw/filtered_sales.csv",
+            "raw/parcel_coords.csv",
+            "raw/EXTR_ResBldg.csv",
+            "raw/resbldg.parquet",
+            "raw/filtered_sales_snohomish.csv",
+            "raw/parcel_coords_snohomish.csv",
+            # Each county's index records every month partition's hash (--since/--until)
+            "raw/sales_store/king/index.json",
+            "raw/sales_store/snohomish/index.json",
+            "raw/google_routes_cache.npz",
+            "raw/google_routes_cache.jsonl",
+            "raw/google_routes_cache.json",  # legacy cache, read when no .npz exists
+            "../frontend/src/data/pois.json",
+        ],
+        "outputs": ["../frontend/public/sales_data.json", "raw/routing_centroids.json"],
+    },
+]
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def local_modules(script):
+    """The script and every data/ module it imports, transitively."""
+    seen, todo = set(), [script]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        with open(os.path.join(DATA_DIR, name)) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                if os.path.exists(os.path.join(DATA_DIR, module + ".py")):
+                    todo.append(module + ".py")
+    return sorted(seen)
+
+
+def step_key(step):
+    """Hash of everything a step's result depends on (missing inputs hash as such)."""
+    parts = {"args": step.get("args", [])}
+    for path in local_modules(step["script"]) + step.get("inputs", []):
+        full_path = os.path.join(DATA_DIR, path)
+        parts[path] = file_sha256(full_path) if os.path.exists(full_path) else None
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def is_current(step, key, state):
+    """Whether a non-network step's last successful run used the same key."""
+    if step.get("network"):
+        return False
+    if state.get(step["name"], {}).get("key") != key:
+        return False
+    return all(os.path.exists(os.path.join(DATA_DIR, p)) for p in step.get("outputs", []))
+
+
+def run_step(step):
+    """Run one step's script, prefixing its output with the step name; return the exit code."""
+    cmd = [sys.executable, "-u", step["script"], *step.get("args", [])]
+    proc = subprocess.Popen(
+        cmd, cwd=DATA_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    for line in proc.stdout:
+        print(f"[{step['name']}] {line}", end="", flush=True)
+    return proc.wait()
+
+
+def run_pipeline(steps, state, force=(), max_parallel=MAX_PARALLEL, dry_run=False):
+    """Run `steps` in dependency order, in parallel where possible.
+
+    Returns {step name: "ran", "skipped", "failed" or "blocked"}.
+    """
+    names = {step["name"] for step in steps}
+    pending = {step["name"]: step for step in steps}
+    status = {}
+    running = {}
+
+    def launch_ready():
+        progress = True
+        while progress:
+            progress = False
+            for name, step in list(pending.items()):
+                after = [d for d in step.get("after", []) if d in names]
+                if any(status.get(d) in ("failed", "blocked") for d in after):
+                    status[name] = "blocked"
+                elif all(status.get(d) in ("ran", "skipped") for d in after):
+                    key = step_key(step)
+                    if name not in force and "all" not in force and is_current(step, key, state):
+                        status[name] = "skipped"
+                        print(f"[{name}] up to date, skipping")
+                    elif dry_run:
+                        status[name] = "ran"
+                        print(f"[{name}] would run {step['script']}")
+                    else:
+                        print(f"[{name}] running {step['script']}")
+                        running[pool.submit(run_step, step)] = (name, step, time.time())
+                        status[name] = "running"
+                else:
+                    continue
+                del pending[name]
+                progress = True
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        launch_ready()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, step, started = running.pop(future)
+                elapsed = time.time() - started
+                if future.result() == 0:
+                    status[name] = "ran"
+                    # Re-hash: a step may write a cache it also reads (process_data's
+                    # resbldg.parquet), which would otherwise rerun it once more
+                    key = step_key(step)
+                    state[name] = {"key": key, "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+                    save_state(state)
+                    print(f"[{name}] done in {elapsed:.1f}s")
+                else:
+                    status[name] = "failed"
+                    print(f"[{name}] FAILED after {elapsed:.1f}s")
+            launch_ready()
+
+    for name in pending:
+        status[name] = "blocked"
+    return status
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--google", action="store_true",
+        help="include the Google Maps routing step (needs GOOGLE_MAPS_API_KEY)",
+    )
+    parser.add_argument(
+        "--force", default="",
+        help="comma-separated steps to rerun even if up to date ('all' for every step)",
+    )
+    parser.add_argument(
+        "--only", default="",
+        help="comma-separated steps to run (their predecessors are assumed done)",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=MAX_PARALLEL,
+        help="maximum steps running at once",
+    )
+    parser.add_argument(
+        "--process-args", default="",
+        help="extra arguments for process_data.py, e.g. \"--binary --shards\"",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="print which steps would run without running them",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    steps = [step for step in STEPS if args.google or not step.get("optional")]
+    if args.only:
+        only = set(args.only.split(","))
+        steps = [step for step in steps if step["name"] in only]
+    for step in steps:
+        if step["name"] == "process" and args.process_args:
+            step["args"] = shlex.split(args.process_args)
+
+    force = set(filter(None, args.force.split(",")))
+    status = run_pipeline(steps, load_state(), force, max(1, args.jobs), args.dry_run)
+
+    print()
+    for step in steps:
+        print(f"  {step['name']:<18} {status[step['name']]}")
+    if any(s in ("failed", "blocked") for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Per-stage timing and memory instrumentation for the pipeline scripts.
+
+    report = RunReport("process_data")
+    with report.stage("load_king_county") as stage:
+        kc = load_king_county(bldg)
+        stage["rows"] = len(kc)
+    report.write(REPORT_JSON, REPORT_HISTORY)
+
+Each stage records wall time, CPU time (all threads of the process), the
+process's peak RSS when the stage ended and how much the stage raised
+it, plus any counts the caller puts in the yielded dict. write() saves the
+report as JSON and appends it as one line to a JSONL history, so a stage
+that regresses stands out across runs. Peak RSS comes from getrusage and
+is left out where the resource module is unavailable (Windows).
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory in MB, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RunReport:
+    """Collects one record per stage of a script run."""
+
+    def __init__(self, name, argv=None):
+        self.name = name
+        self.argv = sys.argv[1:] if argv is None else list(argv)
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.stages = []
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block; extra fields set on the yielded dict are recorded."""
+        info = {}
+        wall, cpu, peak = time.perf_counter(), time.process_time(), peak_rss_mb()
+        try:
+            yield info
+        except BaseException:
+            info["failed"] = True
+            raise
+        finally:
+            record = {
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall, 3),
+                "cpu_s": round(time.process_time() - cpu, 3),
+            }
+            end_peak = peak_rss_mb()
+            if end_peak is not None:
+                record["peak_rss_mb"] = round(end_peak, 1)
+                record["peak_rss_growth_mb"] = round(end_peak - peak, 1)
+            record.update(info)
+            self.stages.append(record)
+
+    def to_dict(self):
+        report = {
+            "script": self.name,
+            "argv": self.argv,
+            "started": self.started,
+            "wall_s": round(time.perf_counter() - self._wall, 3),
+            "cpu_s": round(time.process_time() - self._cpu, 3),
+            "stages": self.stages,
+        }
+        peak = peak_rss_mb()
+        if peak is not None:
+            report["peak_rss_mb"] = round(peak, 1)
+        return report
+
+    def write(self, path, history_path=None):
+        """Write the report to `path` and append it to the JSONL `history_path`."""
+        report = self.to_dict()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+        if history_path:
+            with open(history_path, "a") as f:
+                f.write(json.dumps(report) + "\n")
+        return report
+
+    def print_summary(self):
+        report = self.to_dict()
+        print(f"\n{'Stage':<24} {'wall s':>8} {'cpu s':>8} {'peak MB':>8} {'rows':>10}")
+        for s in report["stages"]:
+            peak = s.get("peak_rss_mb")
+            rows = s.get("rows")
+            print(
+                f"{s['stage']:<24} {s['wall_s']:>8.2f} {s['cpu_s']:>8.2f} "
+                f"{'' if peak is None else f'{peak:.0f}':>8} {'' if rows is None else rows:>10}"
+            )
+        print(f"{'total':<24} {report['wall_s']:>8.2f} {report['cpu_s']:>8.2f}")
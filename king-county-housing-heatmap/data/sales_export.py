@@ -0,0 +1,372 @@
+"""Columnar writers (and a reader) for the frontend sales artifacts.
+
+Each output field is rendered to JSON text for the whole column at once and
+rows are assembled with element-wise string concatenation on object arrays,
+so no per-sale dict is ever built. Rows are streamed to disk in chunks to
+keep peak memory bounded. The text is byte-identical to what
+``json.dump(output, f)`` produced from the old list-of-dicts loop.
+
+The optional binary artifact (``sales_data.bin``) stores the same sales as
+typed column buffers that the browser can view without parsing:
+
+    bytes 0-3   magic b"KCSB"
+    bytes 4-7   uint32 format version
+    bytes 8-11  uint32 header length
+    header      UTF-8 JSON (space-padded to 8-byte alignment) with count,
+                generated, stats, dateEpoch and one entry per column
+    data        little-endian column buffers, each 8-byte aligned
+
+Coordinates are int32 microdegrees (exact for the JSON's 6-digit rounding),
+dates are int16 day offsets from ``dateEpoch`` (int32 when they span more
+than 32767 days; every column's dtype is in the header), and string
+columns are dictionary-encoded with the dictionary stored in the header.
+Missing integers are ``-1`` and missing baths are NaN.
+
+Sales can also be split into shards by their res-5/6 H3 parent cell
+(``shards/<cell>.json``, same format as sales_data.json), with a
+``shards/manifest.json`` listing each shard's file, sale count, bounding
+box and filter ranges, so a map can fetch only the shards in view.
+"""
+
+import glob
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from h3_index import parent_cells
+
+CHUNK_ROWS = 100_000
+
+# (field, kind) in output order; required fields are always present
+REQUIRED_FIELDS = [
+    ("lat", "coord"),
+    ("lng", "coord"),
+    ("price", "int"),
+    ("date", "str"),
+    ("county", "str"),
+    ("h3", "str"),
+]
+# Optional fields are omitted from a sale when the value is missing
+OPTIONAL_FIELDS = [
+    ("beds", "int"),
+    ("baths", "bath"),
+    ("sqft", "int"),
+    ("yrBuilt", "int"),
+    ("driveGym", "int"),
+    ("driveOffice", "int"),
+    ("nearestGymName", "str"),
+]
+
+
+def _render_numeric(values, kind):
+    """Render a float array to JSON number strings (no missing values)."""
+    if kind == "int":
+        return [str(v) for v in values.astype(np.int64).tolist()]
+    ndigits = 6 if kind == "coord" else 1
+    return [repr(round(v, ndigits)) for v in values.tolist()]
+
+
+def _render_column(series, kind):
+    """Return (text, present) arrays for one column.
+
+    ``text`` holds the JSON literal for each row ("" where missing) and
+    ``present`` is a boolean mask of rows that have a value.
+    """
+    n = len(series)
+    text = np.full(n, "", dtype=object)
+
+    if kind == "str":
+        codes, uniques = pd.factorize(series)
+        present = codes >= 0
+        encoded = np.array([json.dumps(u) for u in uniques] + [""], dtype=object)
+        text[:] = encoded[codes]
+        return text, present
+
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+    present = ~np.isnan(values)
+    if present.any():
+        text[present] = _render_numeric(values[present], kind)
+    return text, present
+
+
+def _render_rows(df, optional_fields=OPTIONAL_FIELDS):
+    """Render a DataFrame chunk to an object array of JSON sale objects."""
+    n = len(df)
+    rows = np.full(n, "{", dtype=object)
+
+    for i, (field, kind) in enumerate(REQUIRED_FIELDS):
+        text, _ = _render_column(df[field], kind)
+        sep = "" if i == 0 else ", "
+        rows = rows + f'{sep}"{field}": ' + text
+
+    for field, kind in optional_fields:
+        if field not in df.columns:
+            continue
+        text, present = _render_column(df[field], kind)
+        prefix = np.where(present, f', "{field}": ', "").astype(object)
+        rows = rows + prefix + text
+
+    return rows + "}"
+
+
+def _with_extra(fields, extra_fields):
+    """`fields` followed by any (field, kind) in extra_fields not already listed."""
+    names = {field for field, _ in fields}
+    return fields + [(f, kind) for f, kind in extra_fields if f not in names]
+
+
+def write_sales_json(df, path, generated, stats, chunk_rows=CHUNK_ROWS, extra_fields=()):
+    """Stream ``{"generated", "stats", "sales"}`` JSON to path.
+
+    extra_fields lists additional optional (field, kind) columns, e.g. drive
+    times for POI categories beyond the built-in ones.
+    """
+    optional_fields = _with_extra(OPTIONAL_FIELDS, extra_fields)
+    header = json.dumps({"generated": generated, "stats": stats})
+    with open(path, "w") as f:
+        f.write(header[:-1] + ', "sales": [')
+        for start in range(0, len(df), chunk_rows):
+            if start > 0:
+                f.write(", ")
+            rows = _render_rows(df.iloc[start : start + chunk_rows], optional_fields)
+            f.write(", ".join(rows.tolist()))
+        f.write("]}")
+
+
+BIN_MAGIC = b"KCSB"
+BIN_VERSION = 1
+BIN_ALIGN = 8
+
+# (field, dtype) for numeric columns; -1 marks missing for integer types
+BIN_NUMERIC_FIELDS = [
+    ("price", "<u4"),
+    ("beds", "<i2"),
+    ("baths", "<f4"),
+    ("sqft", "<i4"),
+    ("yrBuilt", "<i2"),
+    ("driveGym", "<i2"),
+    ("driveOffice", "<i2"),
+]
+BIN_DICT_FIELDS = ["county", "h3", "nearestGymName"]
+COORD_SCALE = 1_000_000
+
+
+def _code_dtype(n_values):
+    """Smallest signed integer dtype that can hold codes 0..n-1 and -1."""
+    for dtype in ("<i1", "<i2", "<i4"):
+        if n_values <= np.iinfo(dtype).max:
+            return dtype
+    return "<i8"
+
+
+def _numeric_column(series, dtype):
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+    if np.dtype(dtype).kind == "f":
+        return np.round(values, 1).astype(dtype)
+    missing = np.isnan(values)
+    return np.where(missing, -1, values).astype(dtype)
+
+
+def write_sales_bin(df, path, generated, stats, extra_fields=()):
+    """Write sales as the columnar binary artifact described above.
+
+    extra_fields takes the same (field, kind) pairs as write_sales_json:
+    "int" fields are stored as int16 minutes, "str" fields dictionary-encoded.
+    """
+    n = len(df)
+    numeric_fields = _with_extra(
+        BIN_NUMERIC_FIELDS, [(f, "<i2") for f, kind in extra_fields if kind == "int"]
+    )
+    dict_fields = BIN_DICT_FIELDS + [
+        f for f, kind in extra_fields if kind == "str" and f not in BIN_DICT_FIELDS
+    ]
+    columns = []
+    buffers = []
+
+    def add(name, array, **meta):
+        columns.append({"name": name, "dtype": array.dtype.str, **meta})
+        buffers.append(np.ascontiguousarray(array))
+
+    for field in ("lat", "lng"):
+        micro = np.rint(df[field].to_numpy(dtype=np.float64) * COORD_SCALE)
+        add(field, micro.astype("<i4"), scale=COORD_SCALE)
+
+    dates = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]")
+    epoch = dates.min() if n else np.datetime64("1970-01-01", "D")
+    days = (dates - epoch).astype(np.int64)
+    # int16 covers ~89 years; historical windows or stray early dates need more
+    wide = n and days.max() > np.iinfo(np.int16).max
+    add("date", days.astype("<i4" if wide else "<i2"))
+
+    for field, dtype in numeric_fields:
+        if field in df.columns:
+            add(field, _numeric_column(df[field], dtype))
+
+    for field in dict_fields:
+        if field in df.columns:
+            codes, uniques = pd.factorize(df[field])
+            dtype = _code_dtype(len(uniques))
+            add(field, codes.astype(dtype), dictionary=[str(u) for u in uniques])
+
+    offset = 0
+    for col, buf in zip(columns, buffers):
+        offset += -offset % BIN_ALIGN
+        col["offset"] = offset
+        col["length"] = len(buf)
+        offset += buf.nbytes
+
+    header = {
+        "count": n,
+        "generated": generated,
+        "stats": stats,
+        "dateEpoch": str(epoch),
+        "columns": columns,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix_len = len(BIN_MAGIC) + 8 + len(header_bytes)
+    header_bytes += b" " * (-prefix_len % BIN_ALIGN)
+
+    with open(path, "wb") as f:
+        f.write(BIN_MAGIC)
+        f.write(struct.pack("<II", BIN_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        written = 0
+        for col, buf in zip(columns, buffers):
+            f.write(b"\0" * (col["offset"] - written))
+            f.write(buf.tobytes())
+            written = col["offset"] + buf.nbytes
+
+
+def read_sales_bin(path):
+    """Read a sales_data.bin artifact into (header, DataFrame).
+
+    The DataFrame has the same columns and missing-value semantics as the
+    sales in sales_data.json (floats with NaN for missing numbers, None for
+    missing strings).
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw[:4] != BIN_MAGIC:
+        raise ValueError(f"{path} is not a sales binary artifact")
+    version, header_len = struct.unpack_from("<II", raw, 4)
+    if version != BIN_VERSION:
+        raise ValueError(f"Unsupported sales binary version {version}")
+    data_start = 12 + header_len
+    header = json.loads(raw[12:data_start])
+    epoch = np.datetime64(header["dateEpoch"], "D")
+
+    out = {}
+    for col in header["columns"]:
+        values = np.frombuffer(
+            raw, dtype=col["dtype"], count=col["length"],
+            offset=data_start + col["offset"],
+        )
+        name = col["name"]
+        if "scale" in col:
+            out[name] = values / col["scale"]
+        elif name == "date":
+            out[name] = np.datetime_as_string(epoch + values.astype("timedelta64[D]"))
+        elif "dictionary" in col:
+            dictionary = np.array(col["dictionary"] + [None], dtype=object)
+            out[name] = dictionary[values]
+        elif values.dtype.kind == "f":
+            # Stored as float32 after rounding to one decimal, like the JSON
+            out[name] = np.round(values.astype(np.float64), 1)
+        else:
+            out[name] = np.where(values < 0, np.nan, values.astype(np.float64))
+
+    return header, pd.DataFrame(out)
+
+
+SHARD_RES = 6
+SHARD_MANIFEST = "manifest.json"
+
+
+def filter_ranges(df, drive_columns=()):
+    """Slider ranges for the frontend filter panel, or None without building data.
+
+    A drive column with no values (nothing routed) gets no entry.
+    """
+    has_bldg = df["sqft"].notna()
+    if not has_bldg.any():
+        return None
+    bldg = df[has_bldg]
+    ranges = {
+        "price": {"min": int(df["price"].min()), "max": int(df["price"].max())},
+        "sqft": {"min": int(bldg["sqft"].min()), "max": int(bldg["sqft"].max())},
+        "yrBuilt": {"min": int(bldg["yrBuilt"].min()), "max": int(bldg["yrBuilt"].max())},
+        "beds": {"max": int(bldg["beds"].max())},
+    }
+    for column in drive_columns:
+        if column in df.columns and df[column].notna().any():
+            ranges[column] = {"max": int(df[column].max())}
+    return ranges
+
+
+def write_sales_shards(
+    df, out_dir, generated, stats, res=SHARD_RES, extra_fields=(), drive_columns=(), binary=False,
+):
+    """Partition sales by res-`res` parent of their h3 cell into out_dir.
+
+    Each shard is a sales_data.json-format file (plus a .bin when
+    `binary`) whose stats hold its own count and filterRanges. The
+    manifest carries the global `stats` and per shard its cell, file,
+    count, byte size, bounding box [south, west, north, east] and filter
+    ranges. Shard files left over from earlier runs are removed. Returns
+    the manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    df = df[df["h3"].notna()]
+    shard_cells = parent_cells(df["h3"].to_numpy(dtype=object), res)
+    codes, cells = pd.factorize(shard_cells, sort=True)
+
+    # Per-shard bounding boxes in one pass
+    bounds = pd.DataFrame({"lat": df["lat"].to_numpy(), "lng": df["lng"].to_numpy()}).groupby(codes)
+    lo, hi = bounds.min(), bounds.max()
+
+    shards = []
+    written = set()
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(len(cells) + 1))
+    for i, cell in enumerate(cells):
+        shard = df.iloc[order[starts[i] : starts[i + 1]]]
+        ranges = filter_ranges(shard, drive_columns)
+        shard_stats = {"count": len(shard)}
+        if ranges:
+            shard_stats["filterRanges"] = ranges
+
+        entry = {
+            "h3": cell,
+            "file": f"{cell}.json",
+            "count": len(shard),
+            "bbox": [
+                round(float(lo["lat"][i]), 6), round(float(lo["lng"][i]), 6),
+                round(float(hi["lat"][i]), 6), round(float(hi["lng"][i]), 6),
+            ],
+        }
+        if ranges:
+            entry["filterRanges"] = ranges
+        path = os.path.join(out_dir, entry["file"])
+        write_sales_json(shard, path, generated, shard_stats, extra_fields=extra_fields)
+        entry["bytes"] = os.path.getsize(path)
+        written.add(entry["file"])
+        if binary:
+            entry["bin"] = f"{cell}.bin"
+            write_sales_bin(shard, os.path.join(out_dir, entry["bin"]), generated, shard_stats, extra_fields)
+            written.add(entry["bin"])
+        shards.append(entry)
+
+    manifest = {"generated": generated, "res": res, "stats": stats, "shards": shards}
+    tmp_path = os.path.join(out_dir, SHARD_MANIFEST + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(out_dir, SHARD_MANIFEST))
+
+    for path in glob.glob(os.path.join(out_dir, "*.json")) + glob.glob(os.path.join(out_dir, "*.bin")):
+        name = os.path.basename(path)
+        if name != SHARD_MANIFEST and name not in written:
+            os.remove(path)
+    return manifest
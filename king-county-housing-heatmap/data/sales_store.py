@@ -0,0 +1,134 @@
+"""Month-partitioned store of filtered sales for historical mode.
+
+The fetchers' default output is a rolling 365-day CSV. With --history they
+instead keep every year of filtered sales here, one Parquet file per county
+and sale month:
+
+    raw/sales_store/<county>/<YYYY-MM>.parquet
+    raw/sales_store/<county>/index.json   {month: {"rows", "sha256"}}
+
+write_partitions() hashes each month's rows and rewrites only the months
+whose content changed, so a refreshed source touches the latest partitions
+(plus any back-dated corrections) rather than the whole history.
+read_window() loads any date range by opening just the months it spans,
+and store_parcel_ids() lists every parcel the coordinate fetchers must
+cover for windows older than the rolling CSVs.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+STORE_DIR = os.path.join(os.path.dirname(__file__), "raw", "sales_store")
+INDEX_NAME = "index.json"
+
+
+def county_dir(county):
+    return os.path.join(STORE_DIR, county)
+
+
+def partition_path(county, month):
+    return os.path.join(county_dir(county), f"{month}.parquet")
+
+
+def load_index(county):
+    path = os.path.join(county_dir(county), INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_index(county, index):
+    path = os.path.join(county_dir(county), INDEX_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def frame_sha256(df):
+    """Content hash of a DataFrame's rows (independent of row order)."""
+    df = df.sort_values(list(df.columns), ignore_index=True)
+    digest = hashlib.sha256(",".join(df.columns).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def write_partitions(county, sales, keep_before=None):
+    """Store `sales` (with a YYYY-MM-DD ``date`` column) as monthly partitions.
+
+    Stored months absent from `sales` are dropped, except those before
+    `keep_before` (YYYY-MM): sources that only publish a rolling window
+    pass the first month they cover in full, so older months stay in the
+    store and an already-stored, now partial, first month is not
+    overwritten. Returns (written, unchanged, removed) lists of months.
+    """
+    os.makedirs(county_dir(county), exist_ok=True)
+    index = load_index(county)
+    months = sales["date"].str[:7]
+    written, unchanged = [], []
+    for month, part in sales.groupby(months, sort=True):
+        path = partition_path(county, month)
+        if keep_before is not None and month < keep_before and month in index:
+            unchanged.append(month)
+            continue
+        part = part.reset_index(drop=True)
+        digest = frame_sha256(part)
+        if index.get(month, {}).get("sha256") == digest and os.path.exists(path):
+            unchanged.append(month)
+            continue
+        tmp_path = path + ".tmp"
+        part.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        index[month] = {"rows": len(part), "sha256": digest}
+        written.append(month)
+
+    removed = sorted(
+        m for m in set(index) - set(written) - set(unchanged)
+        if keep_before is None or m >= keep_before
+    )
+    for month in removed:
+        path = partition_path(county, month)
+        if os.path.exists(path):
+            os.remove(path)
+        del index[month]
+    save_index(county, index)
+    return written, unchanged, removed
+
+
+def store_months(county):
+    """Sorted months present in the store for `county`."""
+    return sorted(load_index(county))
+
+
+def store_parcel_ids(county, id_col):
+    """Unique parcel IDs (`id_col`) across every stored month of `county`."""
+    ids = set()
+    for month in store_months(county):
+        column = pd.read_parquet(partition_path(county, month), columns=[id_col])[id_col]
+        ids.update(column.dropna().astype(str))
+    return sorted(ids)
+
+
+def read_window(county, since=None, until=None):
+    """Sales of `county` dated since <= date <= until (YYYY-MM-DD strings, None = open).
+
+    Only the monthly partitions overlapping the window are read.
+    """
+    months = [
+        m for m in store_months(county)
+        if (since is None or m >= since[:7]) and (until is None or m <= until[:7])
+    ]
+    if not months:
+        return pd.DataFrame()
+    sales = pd.concat(
+        [pd.read_parquet(partition_path(county, m)) for m in months], ignore_index=True
+    )
+    if since is not None:
+        sales = sales[sales["date"] >= since]
+    if until is not None:
+        sales = sales[sales["date"] <= until]
+    return sales.reset_index(drop=True)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Generate synthetic raw inputs for process_data.py at any scale.
+
+Writes the files the fetch scripts leave in raw/ -- King County
+filtered_sales.csv, parcel_coords.csv and EXTR_ResBldg.csv, Snohomish
+filtered_sales_snohomish.csv and parcel_coords_snohomish.csv -- plus a
+Google routes cache covering every res-7 hex at every slot, so
+process_data runs end to end offline (no county downloads, API key or OSRM).
+
+Usage: python data/synth_raw.py [n_sales ...] [--out DIR] [--seed N]
+       (default: 100000, written to raw/synth/<n_sales>/)
+
+About 75% of sales are in King County and ~30% are repeat sales of a
+parcel. A few parcels have no coordinates, ~10% of King parcels have no
+building record and some have two, as in the assessor extract. Prices fall
+off with distance from Seattle and Everett like generate_sample.py; drive
+minutes come from straight-line distance to the registry POIs, slower at
+the peak slots.
+"""
+
+import argparse
+import json
+import os
+
+import h3
+import numpy as np
+import pandas as pd
+
+from h3_index import assign_cells
+from poi_filter import haversine_km
+from poi_registry import load_registry, output_fields
+from routes_cache import SLOTS, RouteProfiles
+
+SYNTH_DIR = os.path.join(os.path.dirname(__file__), "raw", "synth")
+DEFAULT_SIZES = [100_000]
+META_NAME = "synth.json"
+
+KING_SHARE = 0.75
+REPEAT_SALE_SHARE = 0.3
+NO_COORDS_SHARE = 0.02  # parcels missing from the coordinates file
+NO_BLDG_SHARE = 0.1  # King parcels without a building record
+EXTRA_BLDG_SHARE = 0.05  # King parcels with a second (smaller) building
+LAST_SALE_DATE = np.datetime64("2025-12-31")
+SALE_DAYS = 365
+
+# (lat_min, lat_max, lng_min, lng_max), (center lat, lng), price at center, floor, $ per degree
+KING = ((47.2, 47.8, -122.5, -121.8), (47.6, -122.3), 900_000, 200_000, 3_000_000)
+SNOHOMISH = ((47.8, 48.3, -122.4, -121.7), (48.0, -122.2), 700_000, 180_000, 2_500_000)
+
+ROAD_FACTOR = 1.3  # road distance / straight-line distance
+AVERAGE_KMH = 50
+SLOT_SLOWDOWN = {"weekday_am": 1.3, "weekday_midday": 1.1, "weekday_pm": 1.4, "weekend": 1.0}
+
+
+def synth_sales(rng, n_sales, county):
+    """(parcels, sales) frames for one county: parcel lat/lng, and parcel index, date, price per sale."""
+    (lat_min, lat_max, lng_min, lng_max), center, base, floor, slope = county
+    n_parcels = max(1, int(n_sales * (1 - REPEAT_SALE_SHARE)))
+    parcels = pd.DataFrame({
+        "lat": np.round(rng.uniform(lat_min, lat_max, n_parcels), 6),
+        "lng": np.round(rng.uniform(lng_min, lng_max, n_parcels), 6),
+    })
+    dist = np.hypot(parcels["lat"] - center[0], parcels["lng"] - center[1]).to_numpy()
+    value = np.maximum(floor, base - dist * slope)
+
+    parcel = rng.integers(0, n_parcels, n_sales)
+    dates = LAST_SALE_DATE - rng.integers(0, SALE_DAYS, n_sales).astype("timedelta64[D]")
+    sales = pd.DataFrame({
+        "parcel": parcel,
+        "date": np.datetime_as_string(dates),
+        "price": (value[parcel] * rng.uniform(0.7, 1.5, n_sales)).astype(np.int64),
+    })
+    return parcels, sales
+
+
+def building_values(rng, n):
+    """Bedrooms, sqft and year built as the assessor records them (0 = unknown)."""
+    beds = rng.choice([0, 1, 2, 2, 3, 3, 3, 4, 4, 5, 6], n)
+    sqft = rng.integers(600, 5000, n)
+    yr_built = rng.integers(1900, 2025, n)
+    return beds, sqft, yr_built
+
+
+def write_king(rng, n_sales, out_dir):
+    parcels, sales = synth_sales(rng, n_sales, KING)
+    ids = np.arange(len(parcels))
+    major = pd.Series(ids // 10_000).astype(str).str.zfill(6)
+    minor = pd.Series(ids % 10_000).astype(str).str.zfill(4)
+    pins = major + minor
+
+    pd.DataFrame({
+        "PIN": pins.to_numpy()[sales["parcel"]],
+        "Major": major.to_numpy()[sales["parcel"]],
+        "Minor": minor.to_numpy()[sales["parcel"]],
+        "date": sales["date"],
+        "price": sales["price"],
+    }).to_csv(os.path.join(out_dir, "filtered_sales.csv"), index=False)
+
+    has_coords = rng.random(len(parcels)) >= NO_COORDS_SHARE
+    coords = parcels[has_coords].assign(PIN=pins[has_coords].to_numpy())
+    coords[["PIN", "lat", "lng"]].to_csv(os.path.join(out_dir, "parcel_coords.csv"), index=False)
+
+    # The extract stores Major/Minor unpadded and has many more columns than are read
+    with_bldg = ids[rng.random(len(ids)) >= NO_BLDG_SHARE]
+    extra = with_bldg[rng.random(len(with_bldg)) < EXTRA_BLDG_SHARE]
+    bldg_ids = np.concatenate([with_bldg, extra])
+    n = len(bldg_ids)
+    beds, sqft, yr_built = building_values(rng, n)
+    sqft[len(with_bldg):] //= 3  # second buildings are ADUs; the largest one wins
+    pd.DataFrame({
+        "Major": bldg_ids // 10_000,
+        "Minor": bldg_ids % 10_000,
+        "BldgNbr": np.r_[np.ones(len(with_bldg), dtype=np.int64), np.full(len(extra), 2)],
+        "NbrLivingUnits": 1,
+        "Address": "123 SYNTHETIC ST",
+        "Stories": rng.choice([1, 1.5, 2, 3], n),
+        "BldgGrade": rng.integers(4, 13, n),
+        "SqFtTotLiving": sqft,
+        "Bedrooms": beds,
+        "BathHalfCount": rng.integers(0, 2, n),
+        "Bath3qtrCount": rng.integers(0, 2, n),
+        "BathFullCount": rng.integers(1, 4, n),
+        "YrBuilt": yr_built,
+        "Condition": rng.integers(1, 6, n),
+    }).to_csv(os.path.join(out_dir, "EXTR_ResBldg.csv"), index=False)
+    return coords
+
+
+def write_snohomish(rng, n_sales, out_dir):
+    parcels, sales = synth_sales(rng, n_sales, SNOHOMISH)
+    ids = pd.Series(np.arange(len(parcels)) + 10**12).astype(str).str.zfill(14)
+
+    beds, sqft, yr_built = building_values(rng, len(parcels))
+    building = pd.DataFrame({"beds": beds, "sqft": sqft, "yrBuilt": yr_built}).replace(0, np.nan)
+    out = building.iloc[sales["parcel"]].reset_index(drop=True)
+    out.insert(0, "PARCEL_ID", ids.to_numpy()[sales["parcel"]])
+    out.insert(1, "date", sales["date"])
+    out.insert(2, "price", sales["price"])
+    out.to_csv(os.path.join(out_dir, "filtered_sales_snohomish.csv"), index=False)
+
+    has_coords = rng.random(len(parcels)) >= NO_COORDS_SHARE
+    coords = parcels[has_coords].assign(PARCEL_ID=ids[has_coords].to_numpy())
+    coords[["PARCEL_ID", "lat", "lng"]].to_csv(
+        os.path.join(out_dir, "parcel_coords_snohomish.csv"), index=False
+    )
+    return coords
+
+
+def write_routes_cache(coords, categories, path):
+    """Route every res-7 hex of `coords` to the registry POIs at every slot."""
+    _, parents = assign_cells(coords["lat"].values, coords["lng"].values)
+    hexes = sorted(set(parents.tolist()))
+    centers = np.array([h3.cell_to_latlng(h) for h in hexes])
+    profiles = RouteProfiles(kinds=dict(output_fields(categories)))
+
+    base = {}  # column -> (free-flow minutes, POI names or None)
+    for cat in categories:
+        pois = cat["pois"]
+        km = haversine_km(
+            centers[:, 0], centers[:, 1], [p["lat"] for p in pois], [p["lng"] for p in pois]
+        )
+        best = km.argmin(axis=1)
+        minutes = km[np.arange(len(hexes)), best] * ROAD_FACTOR / AVERAGE_KMH * 60
+        names = [pois[i]["name"] for i in best] if cat.get("nameColumn") else None
+        base[cat["column"]] = (minutes, names)
+
+    for slot in SLOTS:
+        slowdown = SLOT_SLOWDOWN.get(slot, 1.0)
+        for i, hex_id in enumerate(hexes):
+            fields = {}
+            for cat in categories:
+                minutes, names = base[cat["column"]]
+                fields[cat["column"]] = max(1, round(minutes[i] * slowdown))
+                if names is not None:
+                    fields[cat["nameColumn"]] = names[i]
+            profiles.set(hex_id, slot, fields)
+    profiles.save(path)
+    return len(hexes)
+
+
+def generate_raw(n_sales, out_dir, seed=42, categories=None):
+    """Write a full set of synthetic raw inputs for `n_sales` sales into `out_dir`.
+
+    Returns the metadata also saved as synth.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    if categories is None:
+        categories = load_registry()
+    n_king = int(round(n_sales * KING_SHARE))
+    king_coords = write_king(rng, n_king, out_dir)
+    sn_coords = write_snohomish(rng, n_sales - n_king, out_dir)
+    n_hexes = write_routes_cache(
+        pd.concat([king_coords, sn_coords], ignore_index=True), categories,
+        os.path.join(out_dir, "google_routes_cache.npz"),
+    )
+    meta = {"sales": n_sales, "seed": seed, "king": n_king, "routedHexes": n_hexes}
+    with open(os.path.join(out_dir, META_NAME), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def read_meta(out_dir):
+    """Metadata of a generated directory, or None if it holds no complete set."""
+    path = os.path.join(out_dir, META_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES, help="sales per set")
+    parser.add_argument("--out", help=f"output directory (default: {SYNTH_DIR}/<n_sales>)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.out and len(args.sizes) > 1:
+        parser.error("--out takes a single size")
+    return args
+
+
+def main():
+    args = parse_args()
+    for n in args.sizes:
+        out_dir = args.out or os.path.join(SYNTH_DIR, str(n))
+        meta = generate_raw(n, out_dir, seed=args.seed)
+        sizes = {
+            name: os.path.getsize(os.path.join(out_dir, name)) / 1024 / 1024
+            for name in sorted(os.listdir(out_dir))
+            if name != META_NAME and os.path.isfile(os.path.join(out_dir, name))
+        }
+        print(f"{n:,} sales -> {out_dir} ({meta['routedHexes']} routed hexes)")
+        for name, size in sizes.items():
+            print(f"  {name}: {size:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import arcgis_parcels
+from arcgis_parcels import fetch_parcel_coords
+
+KEY_FIELD = "PIN"
+IDS = [f"{i:010d}" for i in range(40)]
+
+
+def requested_ids(path):
+    where = parse_qs(urlparse(path).query)["where"][0]
+    return re.findall(r"'([^']*)'", where)
+
+
+def parcel_features(ids):
+    """A small square parcel per ID, centered on a point derived from the ID."""
+    features = []
+    for pid in ids:
+        lat, lng = 47.5 + int(pid) / 1000, -122.3
+        ring = [[lng, lat], [lng + 0.001, lat], [lng + 0.001, lat + 0.001], [lng, lat + 0.001], [lng, lat]]
+        features.append({"attributes": {KEY_FIELD: pid}, "geometry": {"rings": [ring]}})
+    return features
+
+
+def arcgis_stub(max_ids=None, failing=()):
+    """Respond like an ArcGIS query endpoint.
+
+    Batches of more than max_ids IDs get a 414; batches containing an ID in
+    `failing` get a 500.
+    """
+    def respond(handler):
+        ids = requested_ids(handler.path)
+        if max_ids is not None and len(ids) > max_ids:
+            return 414, {}, b"URI too long"
+        if set(ids) & set(failing):
+            return 500, {}, b"error"
+        body = json.dumps({"features": parcel_features(ids)}).encode()
+        return 200, {"Content-Type": "application/json"}, body
+
+    return respond
+
+
+@pytest.fixture(autouse=True)
+def no_retry_sleep(monkeypatch):
+    monkeypatch.setattr(arcgis_parcels.time, "sleep", lambda s: None)
+
+
+def test_too_large_batches_are_split_and_shrink(fake_server):
+    fake_server.respond = arcgis_stub(max_ids=12)
+    coords, failed = fetch_parcel_coords(
+        IDS, fake_server.url, KEY_FIELD, batch_size=20, max_workers=2, rate_limit=0
+    )
+    assert failed == []
+    assert sorted(c[0] for c in coords) == IDS
+    lat = dict((pid, lat) for pid, lat, _ in coords)["0000000007"]
+    assert lat == pytest.approx(47.5 + 7 / 1000 + 0.0005)
+
+    sizes = [len(requested_ids(path)) for path, _ in fake_server.requests]
+    assert 20 in sizes  # the first batches were rejected...
+    assert max(sizes[sizes.index(10):]) <= 12  # ...then halved, and never grew back
+
+
+def test_resumes_from_checkpoint_without_duplicates(fake_server, tmp_path, monkeypatch):
+    checkpoint = str(tmp_path / "coords.jsonl")
+    monkeypatch.setattr(arcgis_parcels, "MAX_RETRIES", 1)
+
+    # First run: every batch touching the last 15 IDs fails
+    fake_server.respond = arcgis_stub(failing=IDS[25:])
+    coords, failed = fetch_parcel_coords(
+        IDS, fake_server.url, KEY_FIELD, batch_size=5, checkpoint_path=checkpoint,
+        max_workers=3, rate_limit=0,
+    )
+    assert sorted(failed) == IDS[25:]
+    assert sorted(c[0] for c in coords) == IDS[:25]
+
+    # The run was killed while writing the next checkpoint line
+    with open(checkpoint, "a") as f:
+        f.write('{"ids": ["0000000030", "00000')
+
+    fake_server.requests.clear()
+    fake_server.respond = arcgis_stub()
+    coords, failed = fetch_parcel_coords(
+        IDS, fake_server.url, KEY_FIELD, batch_size=5, checkpoint_path=checkpoint,
+        max_workers=3, rate_limit=0,
+    )
+    assert failed == []
+    found = [c[0] for c in coords]
+    assert sorted(found) == IDS  # every ID exactly once
+    rerequested = sorted(i for path, _ in fake_server.requests for i in requested_ids(path))
+    assert rerequested == IDS[25:]  # only the unfinished IDs were queried again
+
+    # A third run finds everything in the checkpoint
+    fake_server.requests.clear()
+    coords, failed = fetch_parcel_coords(
+        IDS, fake_server.url, KEY_FIELD, batch_size=5, checkpoint_path=checkpoint, rate_limit=0
+    )
+    assert fake_server.requests == []
+    assert sorted(c[0] for c in coords) == IDS
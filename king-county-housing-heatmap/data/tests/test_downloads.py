@@ -0,0 +1,98 @@
+import multiprocessing
+
+import pytest
+import requests
+
+import downloads
+
+CONTENT = b"0123456789" * 1000
+ETAG = '"v1"'
+
+
+def file_server(handler):
+    """Serve CONTENT with an ETag, honouring Range/If-Range like a static file server."""
+    range_header = handler.headers.get("Range")
+    if range_header and handler.headers.get("If-Range") == ETAG:
+        start = int(range_header.split("=")[1].rstrip("-"))
+        if start >= len(CONTENT):
+            return 416, {"Content-Range": f"bytes */{len(CONTENT)}"}, b""
+        return 206, {"ETag": ETAG}, CONTENT[start:]
+    return 200, {"ETag": ETAG}, CONTENT
+
+
+@pytest.fixture
+def raw_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloads, "RAW_DIR", str(tmp_path))
+    monkeypatch.setattr(downloads, "MANIFEST_PATH", str(tmp_path / "downloads_manifest.json"))
+    return tmp_path
+
+
+def leave_partial(url, dest, data):
+    """State after a crash: a .part file and its validators in the manifest."""
+    with open(str(dest) + ".part", "wb") as f:
+        f.write(data)
+    manifest = downloads.load_manifest()
+    manifest["partial"] = {dest.name: {"url": url, "etag": ETAG, "last_modified": None}}
+    downloads.save_manifest(manifest)
+
+
+def test_resumes_partial_download(fake_server, raw_dir):
+    fake_server.respond = file_server
+    dest = raw_dir / "sales.zip"
+    leave_partial(fake_server.url, dest, CONTENT[:4000])
+
+    assert downloads.fetch(fake_server.url, str(dest)) is True
+    assert dest.read_bytes() == CONTENT
+    assert fake_server.requests[0][1]["Range"] == "bytes=4000-"
+
+
+def test_complete_partial_restarts_after_416(fake_server, raw_dir):
+    fake_server.respond = file_server
+    dest = raw_dir / "sales.zip"
+    leave_partial(fake_server.url, dest, CONTENT)  # crashed between download and rename
+
+    assert downloads.fetch(fake_server.url, str(dest)) is True
+    assert dest.read_bytes() == CONTENT
+    assert not (raw_dir / "sales.zip.part").exists()
+    assert len(fake_server.requests) == 2
+    assert "Range" not in fake_server.requests[1][1]
+
+    # Later runs are plain conditional GETs again
+    fake_server.respond = lambda handler: (
+        (304, {}, b"") if handler.headers.get("If-None-Match") == ETAG else file_server(handler)
+    )
+    assert downloads.fetch(fake_server.url, str(dest)) is False
+
+
+def record_outputs(worker, n):
+    for i in range(n):
+        downloads.record_output(f"output_{worker}_{i}.csv", {"run": i})
+
+
+def test_parallel_record_output_keeps_every_entry(raw_dir):
+    # The pipeline's fetch steps are separate processes sharing one manifest
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=record_outputs, args=(w, 20)) for w in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    assert [p.exitcode for p in workers] == [0, 0, 0]
+
+    outputs = downloads.load_manifest()["outputs"]
+    assert len(outputs) == 60
+    assert not list(raw_dir.glob("*.tmp"))
+
+
+def test_keeps_cached_copy_when_server_unreachable(fake_server, raw_dir):
+    fake_server.respond = file_server
+    dest = raw_dir / "sales.zip"
+    assert downloads.fetch(fake_server.url, str(dest)) is True
+
+    fake_server.respond = lambda handler: (503, {}, b"")
+    assert downloads.fetch(fake_server.url, str(dest)) is False
+    assert dest.read_bytes() == CONTENT
+
+    # Nothing cached: the error still surfaces
+    with pytest.raises(requests.RequestException):
+        downloads.fetch(fake_server.url, str(raw_dir / "other.zip"))
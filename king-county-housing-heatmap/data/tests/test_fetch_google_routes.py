@@ -0,0 +1,136 @@
+import argparse
+import functools
+import threading
+
+import h3
+import pytest
+
+import fetch_google_routes
+from fetch_google_routes import MAX_ELEMENTS, MAX_ORIGINS, route_hexes
+from poi_registry import output_fields
+from routes_cache import RoutesCache
+
+CATEGORIES = [
+    {
+        "id": "gym", "kind": "nearest", "column": "driveGym", "nameColumn": "nearestGymName",
+        "pois": [
+            {"name": f"Gym {i}", "lat": 47.45 + i / 40, "lng": -122.35 + (i % 3) / 20}
+            for i in range(8)
+        ],
+    },
+    {
+        "id": "office", "kind": "destination", "column": "driveOffice",
+        "pois": [{"name": "Office", "lat": 47.61, "lng": -122.33}],
+    },
+]
+
+
+class FakeDistanceMatrix:
+    """Stands in for googlemaps.Client: 10 minutes per element, optional failures."""
+
+    def __init__(self, fail_origins=()):
+        self.calls = []
+        self.fail_origins = set(fail_origins)
+        self.lock = threading.Lock()
+
+    def distance_matrix(self, origins, destinations, mode, departure_time):
+        with self.lock:
+            self.calls.append((list(origins), list(destinations), departure_time))
+        if self.fail_origins & set(origins):
+            raise RuntimeError("HTTP 500")
+        element = {"status": "OK", "duration_in_traffic": {"value": 600}}
+        return {"rows": [{"elements": [element] * len(destinations)} for _ in origins]}
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(
+        fetch_google_routes, "fetch_matrices",
+        functools.partial(fetch_google_routes.fetch_matrices, rate=0),
+    )
+
+
+@pytest.fixture
+def centroids():
+    center = h3.latlng_to_cell(47.6, -122.3, 7)
+    hexes = sorted(h3.grid_disk(center, 4))  # 61 hexes
+    return {h: dict(zip(("lat", "lng"), h3.cell_to_latlng(h))) for h in hexes}
+
+
+def run(client, cache_path, centroids, slots, budget=None):
+    args = argparse.Namespace(top_k=3, validate=False, budget=budget)
+    with RoutesCache(cache_path, output_fields(CATEGORIES)) as cache:
+        route_hexes(client, cache, centroids, CATEGORIES, slots, args)
+
+
+def routed_hexes(cache_path, centroids, slot):
+    with RoutesCache(cache_path, output_fields(CATEGORIES)) as cache:
+        hexes = list(centroids)
+        mask = cache.routed(hexes, "driveGym", slot) & cache.routed(hexes, "driveOffice", slot)
+        return {h for h, done in zip(hexes, mask) if done}
+
+
+def test_requests_respect_distance_matrix_limits(tmp_path, centroids):
+    client = FakeDistanceMatrix()
+    cache_path = str(tmp_path / "routes.npz")
+    run(client, cache_path, centroids, ["weekday_am"])
+
+    assert client.calls
+    for origins, destinations, _ in client.calls:
+        assert len(origins) <= MAX_ORIGINS
+        assert len(origins) * len(destinations) <= MAX_ELEMENTS
+    assert routed_hexes(cache_path, centroids, "weekday_am") == set(centroids)
+    with RoutesCache(cache_path, output_fields(CATEGORIES)) as cache:
+        entry = cache.get(next(iter(centroids)), "weekday_am")
+    assert entry["driveGym"] == 10 and entry["driveOffice"] == 10
+    assert entry["nearestGymName"].startswith("Gym")
+
+
+def test_budget_stops_within_a_slot_and_rerun_continues(tmp_path, centroids):
+    cache_path = str(tmp_path / "routes.npz")
+    slots = ["weekday_am", "weekday_pm"]
+    first = FakeDistanceMatrix()
+    run(first, cache_path, centroids, slots, budget=100)
+
+    done_am = routed_hexes(cache_path, centroids, "weekday_am")
+    assert 0 < len(done_am) < len(centroids)  # stopped partway through the first slot
+    assert routed_hexes(cache_path, centroids, "weekday_pm") == set()
+    assert sum(len(o) * len(d) for o, d, _ in first.calls) <= 100
+
+    second = FakeDistanceMatrix()
+    run(second, cache_path, centroids, slots)
+    assert routed_hexes(cache_path, centroids, "weekday_am") == set(centroids)
+    assert routed_hexes(cache_path, centroids, "weekday_pm") == set(centroids)
+
+    # The rerun routed only what the first run had not, at the first slot
+    am_hour = fetch_google_routes.SLOTS["weekday_am"][1]
+    rerouted = {
+        origin for origins, _, departure in second.calls if departure.hour == am_hour
+        for origin in origins
+    }
+    first_done = {(centroids[h]["lat"], centroids[h]["lng"]) for h in done_am}
+    assert not rerouted & first_done
+
+
+def test_failed_batch_leaves_hexes_unrouted(tmp_path, centroids):
+    cache_path = str(tmp_path / "routes.npz")
+    failing_hex = next(iter(centroids))
+    failing = (centroids[failing_hex]["lat"], centroids[failing_hex]["lng"])
+    client = FakeDistanceMatrix(fail_origins=[failing])
+    run(client, cache_path, centroids, ["weekday_am"])
+
+    failed_batches = [o for o, _, _ in client.calls if failing in o]
+    assert failed_batches
+    with RoutesCache(cache_path, output_fields(CATEGORIES)) as cache:
+        # Not recorded at all -- in particular not as unroutable (None)
+        assert cache.get(failing_hex, "weekday_am").get("driveGym", "missing") == "missing"
+    done = routed_hexes(cache_path, centroids, "weekday_am")
+    assert failing_hex not in done
+    assert done  # the other batches were stored
+
+    retry = FakeDistanceMatrix()
+    run(retry, cache_path, centroids, ["weekday_am"])
+    assert routed_hexes(cache_path, centroids, "weekday_am") == set(centroids)
+    retried = {origin for origins, _, _ in retry.calls for origin in origins}
+    assert failing in retried
+    assert not retried & {(centroids[h]["lat"], centroids[h]["lng"]) for h in done}
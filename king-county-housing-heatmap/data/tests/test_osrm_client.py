@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+import osrm_client
+from osrm_client import OSRMTableClient, TokenBucket
+
+DESTINATIONS = [(47.62, -122.13), (47.67, -122.40)]
+
+
+def table_response(handler):
+    """An Ok response with one row of durations per source in the URL."""
+    n_src = len(parse_qs(urlparse(handler.path).query)["sources"][0].split(";"))
+    body = {"code": "Ok", "durations": [[60.0 * (i + 1), None] for i in range(n_src)]}
+    return 200, {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+
+def flaky(failures):
+    """Answer 503 to the first `failures` requests for each URL, then succeed."""
+    seen = {}
+    lock = threading.Lock()
+
+    def respond(handler):
+        with lock:
+            seen[handler.path] = seen.get(handler.path, 0) + 1
+            attempt = seen[handler.path]
+        if attempt <= failures:
+            return 503, {}, b"busy"
+        return table_response(handler)
+
+    return respond
+
+
+def client_for(server, **kwargs):
+    kwargs = {"rate": 0, "backoff": 0.01, **kwargs}
+    return OSRMTableClient(base_url=server.url + "/table/v1/driving", **kwargs)
+
+
+def test_table_retries_503_then_succeeds(fake_server):
+    fake_server.respond = flaky(2)
+    with client_for(fake_server, max_retries=3) as client:
+        durations = client.table([(47.6, -122.3)], DESTINATIONS)
+    assert durations == [[60.0, None]]
+    assert len(fake_server.requests) == 3
+
+
+def test_table_gives_up_after_max_retries(fake_server):
+    fake_server.respond = flaky(5)
+    with client_for(fake_server, max_retries=3) as client:
+        with pytest.raises(requests.HTTPError):
+            client.table([(47.6, -122.3)], DESTINATIONS)
+    assert len(fake_server.requests) == 3
+
+
+def test_retry_backoff_uses_full_jitter(fake_server, monkeypatch):
+    bounds = []
+    monkeypatch.setattr(
+        osrm_client.random, "uniform", lambda lo, hi: bounds.append((lo, hi)) or 0.0
+    )
+    fake_server.respond = flaky(2)
+    with client_for(fake_server, max_retries=3, backoff=0.5) as client:
+        client.table([(47.6, -122.3)], DESTINATIONS)
+    # Sleep is drawn from [0, backoff * 2^attempt] before each retry
+    assert bounds == [(0, 1.0), (0, 2.0)]
+
+
+def test_table_many_bounds_in_flight_requests(fake_server):
+    def slow(handler):
+        time.sleep(0.05)
+        return table_response(handler)
+
+    fake_server.respond = slow
+    batches = [[(47.0 + i / 100, -122.3)] for i in range(24)]
+    with client_for(fake_server, max_in_flight=3) as client:
+        results = dict(client.table_many([(b, DESTINATIONS) for b in batches]))
+    assert sorted(results) == list(range(24))
+    assert all(r == [[60.0, None]] for r in results.values())
+    assert fake_server.max_in_flight == 3
+
+
+def test_table_many_retries_each_batch(fake_server):
+    fake_server.respond = flaky(1)
+    batches = [[(47.0 + i / 100, -122.3)] for i in range(8)]
+    with client_for(fake_server, max_in_flight=4) as client:
+        results = dict(client.table_many([(b, DESTINATIONS) for b in batches]))
+    assert all(results[i] == [[60.0, None]] for i in range(8))
+    assert len(fake_server.requests) == 16
+    assert fake_server.max_in_flight <= 4
+
+
+def test_table_many_reports_failed_batch_as_none(fake_server):
+    fake_server.respond = flaky(10)
+    with client_for(fake_server, max_retries=2) as client:
+        results = dict(client.table_many([([(47.6, -122.3)], DESTINATIONS)]))
+    assert results == {0: None}
+
+
+def test_rate_limit_spaces_requests(fake_server):
+    fake_server.respond = table_response
+    batches = [[(47.0 + i / 100, -122.3)] for i in range(6)]
+    with client_for(fake_server, max_in_flight=4, rate=20, burst=1) as client:
+        start = time.monotonic()
+        list(client.table_many([(b, DESTINATIONS) for b in batches]))
+        elapsed = time.monotonic() - start
+    # One token up front, then one every 1/20 s
+    assert elapsed >= 5 / 20 * 0.9
+
+
+def test_token_bucket_allows_burst_then_rate():
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
@@ -0,0 +1,21 @@
+from routes_cache import RoutesCache, journal_path, read_routes_cache
+
+FIELDS = [("driveOffice", "int")]
+
+
+def test_partial_journal_line_is_cut_before_appending(tmp_path):
+    cache_path = str(tmp_path / "google_routes_cache.npz")
+    with open(journal_path(cache_path), "w") as f:
+        f.write('{"hex": "a", "slot": "weekday_am", "driveOffice": 10}\n')
+        f.write('{"hex": "b", "slot": "weekday_am", "drive')  # killed mid-write
+
+    cache = RoutesCache(cache_path, FIELDS)
+    assert cache.journal_lines == 1
+    cache.append({"c": {"driveOffice": 12}})
+    cache.append({"d": {"driveOffice": 14}})
+    cache._journal.close()  # interrupted again, before close() compacts
+
+    profiles = read_routes_cache(cache_path, FIELDS)
+    assert {h: profiles.get(h, "weekday_am")["driveOffice"] for h in "acd"} == {
+        "a": 10, "c": 12, "d": 14,
+    }
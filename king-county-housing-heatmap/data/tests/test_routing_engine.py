@@ -0,0 +1,87 @@
+import json
+import time
+from urllib.parse import parse_qs, urlparse
+
+import h3
+import numpy as np
+
+from drive_cache import DriveTimeCache
+from osrm_client import OSRMTableClient
+from routing_engine import cached_route_cells, plan_route_batches
+
+POIS = [
+    {"name": f"POI {i}", "lat": 47.5 + i / 50, "lng": -122.3 + i / 50} for i in range(4)
+]
+
+
+def table_response(handler):
+    """Ok response: 60 s to every destination of every source."""
+    query = parse_qs(urlparse(handler.path).query)
+    n_src = len(query["sources"][0].split(";"))
+    n_dst = len(query["destinations"][0].split(";"))
+    time.sleep(0.02)
+    body = {"code": "Ok", "durations": [[60.0] * n_dst for _ in range(n_src)]}
+    return 200, {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+
+def make_cells(n):
+    """`n` distinct res-7 cells around Seattle."""
+    center = h3.latlng_to_cell(47.6, -122.3, 7)
+    return np.array(sorted(h3.grid_disk(center, 10))[:n], dtype=object)
+
+
+def test_plan_groups_cells_by_missing_pois():
+    missing = np.array([
+        [True, True, False],
+        [False, False, False],
+        [True, True, False],
+        [False, False, True],
+    ])
+    batches = plan_route_batches(missing, batch_size=1)
+    planned = sorted((r.tolist(), c.tolist()) for r, c in batches)
+    assert planned == [([0], [0, 1]), ([2], [0, 1]), ([3], [2])]
+
+
+def test_plan_packs_small_groups_into_shared_batches():
+    rng = np.random.default_rng(0)
+    n_pois = 9
+    missing = np.zeros((250, n_pois), dtype=bool)
+    for row in missing:  # top-3 style candidate sets
+        row[rng.choice(n_pois, 3, replace=False)] = True
+    n_sets = len(np.unique(missing, axis=0))
+
+    batches = plan_route_batches(missing, batch_size=100, max_elements=1000)
+    assert len(batches) < n_sets  # fewer requests than candidate sets
+    covered = np.zeros_like(missing)
+    for rows, cols in batches:
+        assert len(rows) <= 100 and len(rows) * len(cols) <= 1000
+        covered[np.ix_(rows, cols)] = True
+    assert np.all(covered[missing])
+    rows = np.concatenate([r for r, _ in batches])
+    assert sorted(rows.tolist()) == list(range(250))  # each cell in one batch
+
+
+def test_missing_groups_share_one_client(fake_server, tmp_path):
+    fake_server.respond = table_response
+    cells = make_cells(300)  # four POI sets of 75 cells: too big to share a batch
+    wanted = np.zeros((len(cells), len(POIS)), dtype=bool)
+    for i in range(len(cells)):
+        wanted[i, [i % 4, (i + 1) % 4]] = True  # four distinct POI sets
+
+    cache_path = str(tmp_path / "osrm.sqlite")
+    client = OSRMTableClient(base_url=fake_server.url, max_in_flight=3, rate=0)
+    with client:
+        durations = cached_route_cells(cells, POIS, cache_path, wanted=wanted, client=client)
+
+    assert np.all(durations[wanted] == 60.0)
+    assert fake_server.max_in_flight == 3  # the groups' batches overlap in one pool
+    with DriveTimeCache(cache_path) as cache:
+        _, known = cache.lookup(cells, POIS)
+    assert np.array_equal(known, wanted)
+
+    # Everything is cached now: a rerun sends no requests
+    n_requests = len(fake_server.requests)
+    with OSRMTableClient(base_url=fake_server.url, rate=0) as client:
+        again = cached_route_cells(cells, POIS, cache_path, wanted=wanted, client=client)
+    assert len(fake_server.requests) == n_requests
+    assert np.array_equal(again[wanted], durations[wanted])
@@ -0,0 +1,17 @@
+import json
+
+from run_report import RunReport
+
+
+def test_write_to_bare_filename(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = RunReport("process_data", ["--report", "report.json"])
+    with report.stage("combine") as stage:
+        stage["rows"] = 3
+
+    report.write("report.json", "reports.jsonl")
+
+    saved = json.loads((tmp_path / "report.json").read_text())
+    assert [s["stage"] for s in saved["stages"]] == ["combine"]
+    assert saved["stages"][0]["rows"] == 3
+    assert len((tmp_path / "reports.jsonl").read_text().splitlines()) == 1
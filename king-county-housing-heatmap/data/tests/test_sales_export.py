@@ -0,0 +1,36 @@
+import pandas as pd
+
+from sales_export import read_sales_bin, write_sales_bin
+
+
+def sales(dates):
+    n = len(dates)
+    return pd.DataFrame({
+        "lat": [47.6] * n,
+        "lng": [-122.3] * n,
+        "price": [500_000] * n,
+        "date": dates,
+        "county": ["King"] * n,
+        "h3": ["872a10000ffffff"] * n,
+    })
+
+
+def test_bin_dates_round_trip_beyond_int16_span(tmp_path):
+    dates = ["1905-03-01", "2024-06-15", "2025-01-31"]
+    path = tmp_path / "sales_data.bin"
+    write_sales_bin(sales(dates), path, "2025-02-01", {})
+
+    header, df = read_sales_bin(path)
+    date_col = next(c for c in header["columns"] if c["name"] == "date")
+    assert date_col["dtype"] == "<i4"
+    assert df["date"].tolist() == dates
+
+
+def test_bin_dates_stay_int16_for_recent_sales(tmp_path):
+    dates = ["2024-06-15", "2025-01-31"]
+    path = tmp_path / "sales_data.bin"
+    write_sales_bin(sales(dates), path, "2025-02-01", {})
+
+    header, df = read_sales_bin(path)
+    assert next(c for c in header["columns"] if c["name"] == "date")["dtype"] == "<i2"
+    assert df["date"].tolist() == dates
@@ -170,7 +170,9 @@ export default function FilterPanel({ filters, onChange, ranges }) {
 
   if (!ranges) return null;
 
-  const hasDriveTimes = ranges.driveGym != null;
+  // A category with no routed sales has no range in the data
+  const hasDriveGym = ranges.driveGym != null;
+  const hasDriveOffice = ranges.driveOffice != null;
 
   const isDefault =
     filters.beds.length === 0 &&
@@ -180,8 +182,8 @@ export default function FilterPanel({ filters, onChange, ranges }) {
     filters.sqft[1] === ranges.sqft.max &&
     filters.yrBuilt[0] === ranges.yrBuilt.min &&
     filters.yrBuilt[1] === ranges.yrBuilt.max &&
-    (!hasDriveTimes || filters.maxDriveGym === ranges.driveGym.max) &&
-    (!hasDriveTimes || filters.maxDriveOffice === ranges.driveOffice.max);
+    (!hasDriveGym || filters.maxDriveGym === ranges.driveGym.max) &&
+    (!hasDriveOffice || filters.maxDriveOffice === ranges.driveOffice.max);
 
   const handleReset = () => {
     onChange({
@@ -189,8 +191,8 @@ export default function FilterPanel({ filters, onChange, ranges }) {
       price: [ranges.price.min, ranges.price.max],
       sqft: [ranges.sqft.min, ranges.sqft.max],
       yrBuilt: [ranges.yrBuilt.min, ranges.yrBuilt.max],
-      maxDriveGym: hasDriveTimes ? ranges.driveGym.max : null,
-      maxDriveOffice: hasDriveTimes ? ranges.driveOffice.max : null,
+      maxDriveGym: hasDriveGym ? ranges.driveGym.max : null,
+      maxDriveOffice: hasDriveOffice ? ranges.driveOffice.max : null,
     });
   };
 
@@ -269,23 +271,23 @@ export default function FilterPanel({ filters, onChange, ranges }) {
             onChange={(yrBuilt) => onChange({ ...filters, yrBuilt })}
           />
 
-          {hasDriveTimes && (
-            <>
-              <MaxDriveInput
-                label="Drive to closest gym"
-                emoji="&#x1F9D7;"
-                max={ranges.driveGym.max}
-                value={filters.maxDriveGym}
-                onChange={(v) => onChange({ ...filters, maxDriveGym: v })}
-              />
-              <MaxDriveInput
-                label="Drive to Building 43"
-                emoji="&#x1F3E2;"
-                max={ranges.driveOffice.max}
-                value={filters.maxDriveOffice}
-                onChange={(v) => onChange({ ...filters, maxDriveOffice: v })}
-              />
-            </>
+          {hasDriveGym && (
+            <MaxDriveInput
+              label="Drive to closest gym"
+              emoji="&#x1F9D7;"
+              max={ranges.driveGym.max}
+              value={filters.maxDriveGym}
+              onChange={(v) => onChange({ ...filters, maxDriveGym: v })}
+            />
+          )}
+          {hasDriveOffice && (
+            <MaxDriveInput
+              label="Drive to Building 43"
+              emoji="&#x1F3E2;"
+              max={ranges.driveOffice.max}
+              value={filters.maxDriveOffice}
+              onChange={(v) => onChange({ ...filters, maxDriveOffice: v })}
+            />
           )}
 
           {!isDefault && (
@@ -2,6 +2,7 @@ import { useMemo, useState } from "react";
 import { Polygon, Tooltip, Popup } from "react-leaflet";
 import { cellToBoundary } from "h3-js";
 import { formatPrice } from "../utils/colorScale";
+import { CATEGORIES } from "../data/pois";
 
 function computeMedian(values) {
   if (values.length === 0) return 0;
@@ -39,10 +40,12 @@ function HexPopup({ hexId, sales }) {
   // Year built range
   const years = sales.filter((s) => s.yrBuilt != null).map((s) => s.yrBuilt).sort((a, b) => a - b);
 
-  // Drive times (from first sale -- all in same hex should be similar)
-  const driveGym = sales.find((s) => s.driveGym != null)?.driveGym;
-  const driveOffice = sales.find((s) => s.driveOffice != null)?.driveOffice;
-  const nearestGymName = sales.find((s) => s.nearestGymName)?.nearestGymName;
+  // Drive times per POI category (from first sale -- all in same hex should be similar)
+  const driveTimes = CATEGORIES.map((c) => ({
+    category: c,
+    minutes: sales.find((s) => s[c.column] != null)?.[c.column],
+    name: c.nameColumn ? sales.find((s) => s[c.nameColumn])?.[c.nameColumn] : c.label,
+  })).filter((d) => d.minutes != null);
 
   // Sort by date descending for recent sales
   const recentSales = [...sales].sort((a, b) => b.date.localeCompare(a.date));
@@ -90,21 +93,15 @@ function HexPopup({ hexId, sales }) {
         </div>
       )}
 
-      {(driveGym != null || driveOffice != null) && (
+      {driveTimes.length > 0 && (
         <div style={{ marginBottom: 6 }}>
-          {driveGym != null && (
-            <div>
-              <span role="img" aria-label="climbing">&#x1F9D7;</span>{" "}
-              <strong>{driveGym} min</strong>
-              {nearestGymName && <> to {nearestGymName}</>}
+          {driveTimes.map(({ category, minutes, name }) => (
+            <div key={category.id}>
+              <span role="img" aria-label={category.id}>{category.emoji}</span>{" "}
+              <strong>{minutes} min</strong>
+              {name && <> to {name}</>}
             </div>
-          )}
-          {driveOffice != null && (
-            <div>
-              <span role="img" aria-label="office">&#x1F3E2;</span>{" "}
-              <strong>{driveOffice} min</strong> to Building 43
-            </div>
-          )}
+          ))}
         </div>
       )}
 
@@ -1,10 +1,7 @@
 import { CircleMarker, Tooltip } from "react-leaflet";
-import { ALL_POIS } from "../data/pois";
+import { ALL_POIS, CATEGORIES } from "../data/pois";
 
-const STYLES = {
-  gym: { fillColor: "#16a34a", color: "#15803d", emoji: "\u{1F9D7}" },
-  office: { fillColor: "#7c3aed", color: "#6d28d9", emoji: "\u{1F3E2}" },
-};
+const STYLES = Object.fromEntries(CATEGORIES.map((c) => [c.id, c]));
 
 export default function POILayer() {
   return (
@@ -13,7 +10,7 @@ export default function POILayer() {
         const s = STYLES[poi.type];
         return (
           <CircleMarker
-            key={poi.name}
+            key={`${poi.type}:${poi.name}`}
             center={[poi.lat, poi.lng]}
             radius={8}
             pathOptions={{